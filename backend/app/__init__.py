@@ -14,8 +14,9 @@ from sqlalchemy import inspect, text
 # 导入配置和模型
 from .core.config import get_config
 from .models import db
-from .utils.auth_manager import auth_manager
+from .utils.auth_manager import auth_manager, metrics_access_required
 from .utils.cache_manager import cache_manager
+from .utils.compression import response_compressor
 
 class CustomJSONEncoder(json.JSONEncoder):
     """自定义JSON编码器，确保中文字符正确显示"""
@@ -48,6 +49,7 @@ def apply_config_dict(app, config_dict):
     security_config = config_dict.get('security', {})
     app.config['SECRET_KEY'] = security_config.get('secret_key', 'unicom-monitor-v3-default-secret')
     app.config['JWT_SECRET_KEY'] = security_config.get('jwt_secret', 'unicom-monitor-v3-default-jwt')
+    app.config['AUTH_PRINCIPAL_CACHE_TTL'] = security_config.get('principal_cache_ttl', 60)
 
     # Redis缓存配置（简化版）
     cache_config = config_dict.get('cache', {})
@@ -61,6 +63,9 @@ def apply_config_dict(app, config_dict):
             f"{cache_config.get('port', 6379)}/"
             f"{cache_config.get('db', 0)}"
         )
+    app.config['REDIS_SENTINELS'] = cache_config.get('sentinels', '')
+    app.config['REDIS_SENTINEL_MASTER'] = cache_config.get('sentinel_master', 'mymaster')
+    app.config['REDIS_CLUSTER'] = bool(cache_config.get('cluster', False))
 
     # WxPusher配置
     wxpusher_config = config_dict.get('wxpusher', {})
@@ -73,7 +78,61 @@ def apply_config_dict(app, config_dict):
     app.config['MAX_UNICOM_ACCOUNTS_PER_USER'] = 5
     app.config['MANUAL_REFRESH_INTERVAL'] = 60
     app.config['AUTO_CACHE_REFRESH_INTERVAL'] = 600
+    app.config['QUERY_ALL_ACCOUNT_TIMEOUT'] = server_config.get('query_all_timeout', 20)
     app.config['FLOW_CACHE_EXPIRE'] = 600
+    app.config['FLOW_CACHE_STALE_TTL'] = cache_config.get('stale_ttl', 1800)
+    app.config['FLOW_REFRESH_LOCK_TTL'] = 60
+
+    # 流量记录写缓冲
+    write_config = config_dict.get('flow_write', {})
+    app.config['FLOW_WRITE_BEHIND'] = write_config.get('enabled', True)
+    app.config['FLOW_WRITE_BATCH_SIZE'] = write_config.get('batch_size', 500)
+    app.config['FLOW_WRITE_FLUSH_INTERVAL'] = write_config.get('flush_interval', 2.0)
+    app.config['FLOW_WRITE_FSYNC'] = write_config.get('fsync', False)
+    app.config['FLOW_WRITE_JOURNAL_DIR'] = write_config.get('journal_dir', '')
+    app.config['FLOW_WRITE_MAX_RETRIES'] = write_config.get('max_retries', 3)
+    app.config['FLOW_WRITE_MAX_BUFFER'] = write_config.get('max_buffer', 100000)
+
+    # 系统日志异步写入
+    audit_config = config_dict.get('system_log', {})
+    app.config['SYSTEM_LOG_ASYNC'] = audit_config.get('async', True)
+    app.config['SYSTEM_LOG_QUEUE_SIZE'] = audit_config.get('queue_size', 10000)
+    app.config['SYSTEM_LOG_BATCH_SIZE'] = audit_config.get('batch_size', 200)
+    app.config['SYSTEM_LOG_FLUSH_INTERVAL'] = audit_config.get('flush_interval', 1.0)
+    app.config['SYSTEM_LOG_OVERFLOW'] = audit_config.get('overflow', 'drop_oldest')
+    app.config['SYSTEM_LOG_BLOCK_TIMEOUT'] = audit_config.get('block_timeout', 0.05)
+    app.config['SYSTEM_LOG_MAX_RETRIES'] = audit_config.get('max_retries', 3)
+    app.config['SYSTEM_LOG_POLICIES'] = audit_config.get('policies', '')
+
+    # 代理使用统计缓冲
+    proxy_config = config_dict.get('proxy_stats', {})
+    app.config['PROXY_STATS_BUFFERED'] = proxy_config.get('buffered', True)
+    app.config['PROXY_STATS_FLUSH_INTERVAL'] = proxy_config.get('flush_interval', 10.0)
+    app.config['PROXY_STATS_MAX_PENDING'] = proxy_config.get('max_pending', 1000)
+
+    # 流量历史导出与曲线
+    export_config = config_dict.get('flow_export', {})
+    app.config['FLOW_EXPORT_BATCH_SIZE'] = export_config.get('batch_size', 5000)
+    app.config['FLOW_SERIES_MAX_POINTS'] = export_config.get('series_max_points', 1000)
+
+    # 响应压缩
+    compression_config = config_dict.get('compression', {})
+    app.config['RESPONSE_COMPRESSION'] = compression_config.get('enabled', True)
+    app.config['RESPONSE_COMPRESSION_MIN_SIZE'] = compression_config.get('min_size', 1024)
+    app.config['RESPONSE_COMPRESSION_GZIP_LEVEL'] = compression_config.get('gzip_level', 6)
+    app.config['RESPONSE_COMPRESSION_BROTLI_QUALITY'] = compression_config.get('brotli_quality', 5)
+
+    # 数据保留配置
+    retention_config = config_dict.get('retention', {})
+    app.config['FLOW_RECORD_RETENTION_DAYS'] = retention_config.get('flow_record_days', 0)
+    app.config['SYSTEM_LOG_RETENTION_DAYS'] = retention_config.get('system_log_days', 0)
+    app.config['PARTITION_PRECREATE_MONTHS'] = 2
+    app.config['RETENTION_MAINTENANCE_HOUR'] = retention_config.get('maintenance_hour', 3)
+
+    # 指标接口访问控制
+    metrics_config = config_dict.get('metrics', {})
+    app.config['METRICS_TOKEN'] = metrics_config.get('token', '')
+    app.config['METRICS_ALLOWED_IPS'] = metrics_config.get('allowed_ips', '127.0.0.1,::1')
 
 def create_app(config_dict=None):
     """应用工厂函数"""
@@ -283,6 +342,27 @@ def create_app(config_dict=None):
     #
     #
     #
+    # 流量记录写缓冲（回放上次异常退出遗留的日志）
+    from .services.flow_writer import flow_writer
+    try:
+        flow_writer.init_app(app)
+    except Exception as e:
+        app.logger.warning(f"初始化流量记录写缓冲失败: {e}")
+
+    # 系统日志异步写入
+    from .services.audit_writer import audit_writer
+    try:
+        audit_writer.init_app(app)
+    except Exception as e:
+        app.logger.warning(f"初始化系统日志写入队列失败: {e}")
+
+    # 代理使用统计缓冲
+    from .services.proxy_stats import proxy_stats
+    try:
+        proxy_stats.init_app(app)
+    except Exception as e:
+        app.logger.warning(f"初始化代理统计缓冲失败: {e}")
+
     from .services.monitor_runner import init_monitor_scheduler
     try:
         init_monitor_scheduler(app)
@@ -638,6 +718,9 @@ def init_extensions(app):
     # 缓存管理器
     cache_manager.init_app(app)
 
+    # 响应压缩（gzip / brotli）
+    response_compressor.init_app(app)
+
     # CORS - 更灵活的配置
     cors_origins = app.config.get('CORS_ORIGINS', [])
 
@@ -705,6 +788,15 @@ def register_blueprints(app):
                 'error': str(e)
             }, 500
 
+    # 指标（Prometheus文本格式），仅限 METRICS_TOKEN 或 METRICS_ALLOWED_IPS 访问
+    @app.route('/metrics')
+    @metrics_access_required
+    def metrics():
+        return app.response_class(
+            cache_manager.stats.render_prometheus(),
+            mimetype='text/plain; version=0.0.4'
+        )
+
 def register_error_handlers(app):
     """注册错误处理"""
 
@@ -7,9 +7,10 @@ from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime, timedelta
 from sqlalchemy import func
 
-from ..utils.auth_manager import login_required, admin_required
+from ..utils.auth_manager import login_required, admin_required, invalidate_principal
 from ..utils.cache_manager import cache_manager
-from ..models import db, User, UnicomAccount, FlowRecord, SystemLog, ProxyPool
+from ..utils.pagination import keyset_paginate, approximate_total, InvalidCursor
+from ..models import db, User, UnicomAccount, FlowRecord, SystemLog, SystemLogCounter, ProxyPool
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -47,6 +48,10 @@ def get_dashboard_stats(current_user):
         logs_today = SystemLog.query.filter(
             SystemLog.created_at >= today_start
         ).count()
+        # 按分钟聚合计数的例行操作
+        aggregated_today = db.session.query(func.coalesce(func.sum(SystemLogCounter.count), 0)).filter(
+            SystemLogCounter.bucket_start >= today_start
+        ).scalar()
         
         # 代理池统计
         total_proxies = ProxyPool.query.count()
@@ -69,7 +74,8 @@ def get_dashboard_stats(current_user):
                     'this_week': queries_this_week
                 },
                 'logs': {
-                    'today': logs_today
+                    'today': logs_today,
+                    'aggregated_today': int(aggregated_today)
                 },
                 'proxies': {
                     'total': total_proxies,
@@ -109,13 +115,19 @@ def get_users(current_user):
             error_out=False
         )
         
+        # 整页用户的账号统计一次分组查询得到
+        from ..utils.timezone_helper import from_db_time
+        stats = User.account_stats([user.id for user in pagination.items])
+        empty = {'unicom_account_count': 0, 'monitored_account_count': 0, 'last_query_at': None}
         users = []
         for user in pagination.items:
-            user_data = user.to_dict()
+            user_stats = stats.get(user.id, empty)
+            user_data = user.to_dict(account_count=user_stats['unicom_account_count'])
             # 添加统计信息
-            user_data['unicom_accounts_count'] = UnicomAccount.query.filter_by(
-                user_id=user.id, status=1
-            ).count()
+            user_data['unicom_accounts_count'] = user_stats['unicom_account_count']
+            user_data['monitored_accounts_count'] = user_stats['monitored_account_count']
+            user_data['last_query_at'] = from_db_time(user_stats['last_query_at']).isoformat() \
+                if user_stats['last_query_at'] else None
             users.append(user_data)
         
         return jsonify({
@@ -159,13 +171,14 @@ def update_user_status(current_user, user_id):
         
         user.status = status
         db.session.commit()
+        invalidate_principal(user.id)
         
         # 记录操作日志
         SystemLog.log_action(
             action='user_status_update',
             description=f'{"启用" if status else "禁用"}用户 {user.username}',
             user_id=current_user.id,
-            target_user_id=user_id,
+            extra_data={'target_user_id': user_id},
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent'),
             module='admin'
@@ -185,14 +198,22 @@ def update_user_status(current_user, user_id):
 @admin_bp.route('/logs', methods=['GET'])
 @admin_required
 def get_system_logs(current_user):
-    """获取系统日志"""
+    """获取系统日志
+
+    默认按 page/per_page 页码分页；传 paging=cursor（首页）或 cursor=<上次返回的游标> 时
+    使用游标分页，with_total=true 时附带近似总数
+    """
     try:
         page = request.args.get('page', 1, type=int)
+        cursor = request.args.get('cursor', '').strip() or None
+        # 游标分页需显式启用（传 cursor 或 paging=cursor），默认仍为页码分页
+        use_cursor = bool(cursor) or request.args.get('paging', '').strip().lower() == 'cursor'
         per_page = min(request.args.get('per_page', 50, type=int), 200)
         action = request.args.get('action', '').strip()
         module = request.args.get('module', '').strip()
         user_id = request.args.get('user_id', type=int)
         days = request.args.get('days', 7, type=int)
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
         
         query = SystemLog.query
         
@@ -214,26 +235,47 @@ def get_system_logs(current_user):
         if user_id:
             query = query.filter(SystemLog.user_id == user_id)
         
-        pagination = query.order_by(SystemLog.created_at.desc()).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        if not use_cursor:
+            # 页码分页（默认）
+            pagination = query.order_by(SystemLog.created_at.desc()).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+            items = pagination.items
+            pagination_info = {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_prev': pagination.has_prev,
+                'has_next': pagination.has_next
+            }
+        else:
+            try:
+                result = keyset_paginate(query, SystemLog, cursor=cursor, per_page=per_page)
+            except InvalidCursor as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            items = result['items']
+            pagination_info = {
+                'per_page': per_page,
+                'has_prev': result['has_prev'],
+                'has_next': result['has_next'],
+                'next_cursor': result['next_cursor'],
+                'prev_cursor': result['prev_cursor']
+            }
+            if with_total:
+                scope = f"admin_logs:{days}:{action}:{module}:{user_id}"
+                pagination_info['total'] = approximate_total(query, scope)
+                pagination_info['total_is_approximate'] = True
         
-        logs = [log.to_dict() for log in pagination.items]
+        logs = [log.to_dict() for log in items]
         
         return jsonify({
             'success': True,
             'data': {
                 'logs': logs,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_prev': pagination.has_prev,
-                    'has_next': pagination.has_next
-                }
+                'pagination': pagination_info
             }
         })
         
@@ -241,6 +283,54 @@ def get_system_logs(current_user):
         current_app.logger.error(f"获取系统日志异常: {e}")
         return jsonify({'success': False, 'message': '获取系统日志失败'}), 500
 
+@admin_bp.route('/logs/counters', methods=['GET'])
+@admin_required
+def get_log_counters(current_user):
+    """获取按分钟聚合的操作计数（按操作、结果汇总，可选按用户过滤）"""
+    try:
+        action = request.args.get('action', '').strip()
+        user_id = request.args.get('user_id', type=int)
+        days = request.args.get('days', 1, type=int)
+
+        query = db.session.query(
+            SystemLogCounter.action,
+            SystemLogCounter.result,
+            func.sum(SystemLogCounter.count).label('count'),
+            func.sum(SystemLogCounter.response_time_sum).label('response_time_sum'),
+            func.sum(SystemLogCounter.response_time_count).label('response_time_count'),
+            func.max(SystemLogCounter.response_time_max).label('response_time_max'),
+            func.max(SystemLogCounter.bucket_start).label('last_at'),
+        )
+        if days > 0:
+            from ..utils.timezone_helper import get_db_time
+            query = query.filter(SystemLogCounter.bucket_start >= get_db_time() - timedelta(days=days))
+        if action:
+            query = query.filter(SystemLogCounter.action == action)
+        if user_id:
+            query = query.filter(SystemLogCounter.user_id == user_id)
+
+        from ..utils.timezone_helper import from_db_time
+        counters = [{
+            'action': row.action,
+            'result': row.result,
+            'count': int(row.count or 0),
+            'avg_response_time': (round(row.response_time_sum / row.response_time_count, 4)
+                                  if row.response_time_count else None),
+            'response_time_max': row.response_time_max,
+            'last_at': from_db_time(row.last_at).isoformat() if row.last_at else None,
+        } for row in query.group_by(SystemLogCounter.action, SystemLogCounter.result).all()]
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'counters': counters
+            }
+        })
+
+    except Exception as e:
+        current_app.logger.error(f"获取操作计数异常: {e}")
+        return jsonify({'success': False, 'message': '获取操作计数失败'}), 500
+
 @admin_bp.route('/proxies', methods=['GET'])
 @admin_required
 def get_proxies(current_user):
@@ -420,3 +510,25 @@ def clear_cache(current_user):
     except Exception as e:
         current_app.logger.error(f"清理缓存异常: {e}")
         return jsonify({'success': False, 'message': '清理缓存失败'}), 500
+
+@admin_bp.route('/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats(current_user):
+    """获取缓存统计（按键命名空间，当前进程）"""
+    try:
+        data = cache_manager.stats.snapshot()
+        data['backend'] = 'redis' if cache_manager.redis_client else 'memory'
+        data['memory_keys'] = len(cache_manager.memory_cache)
+        data['redis'] = cache_manager.get_redis_status()
+
+        if request.args.get('reset', 'false').lower() == 'true':
+            cache_manager.stats.reset()
+
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+
+    except Exception as e:
+        current_app.logger.error(f"获取缓存统计异常: {e}")
+        return jsonify({'success': False, 'message': '获取缓存统计失败'}), 500
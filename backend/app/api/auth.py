@@ -6,7 +6,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from ..utils.auth_manager import AuthManager, login_required
+from ..utils.auth_manager import AuthManager, login_required, invalidate_principal
 from ..models import db, User, SystemLog
 
 auth_bp = Blueprint('auth', __name__)
@@ -203,6 +203,7 @@ def logout(current_user):
             user_agent=request.headers.get('User-Agent'),
             module='auth'
         )
+        invalidate_principal(current_user.id)
         
         return jsonify({
             'success': True,
@@ -217,7 +218,7 @@ def logout(current_user):
 def delete_account(current_user):
     """注销账号 - 彻底删除用户及所有相关数据"""
     try:
-        from ..models import UnicomAccount, FlowRecord, FlowBaseline, MonitorConfig, UserSettings, DeviceFingerprint
+        from ..models import UnicomAccount, FlowRecord, FlowBaseline, FlowUsageRollup, FlowForecast, MonitorConfig, UserSettings, DeviceFingerprint
 
         user_id = current_user.id
         username = current_user.username
@@ -240,6 +241,11 @@ def delete_account(current_user):
             FlowRecord.query.filter_by(unicom_account_id=account.id).delete()
             # 删除流量基准
             FlowBaseline.query.filter_by(unicom_account_id=account.id).delete()
+            FlowBaseline.invalidate_latest(account.id)
+            # 删除用量汇总
+            FlowUsageRollup.query.filter_by(unicom_account_id=account.id).delete()
+            # 删除耗尽预测
+            FlowForecast.query.filter_by(unicom_account_id=account.id).delete()
             # 删除监控配置
             MonitorConfig.query.filter_by(unicom_account_id=account.id).delete()
             # 删除设备指纹
@@ -255,10 +261,12 @@ def delete_account(current_user):
         # SystemLog.query.filter_by(user_id=user_id).delete()
 
         # 5. 最后删除用户本身
-        db.session.delete(current_user)
+        db.session.delete(current_user.user)
 
         # 提交所有删除操作
         db.session.commit()
+        UserSettings.invalidate_cache(user_id)
+        invalidate_principal(user_id)
 
         return jsonify({
             'success': True,
@@ -3,7 +3,8 @@
 """
 流量查询API蓝图
 """
-from flask import Blueprint, request, jsonify, current_app, session
+from flask import Blueprint, Response, request, jsonify, current_app, session, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
 import time
 import json
@@ -12,16 +13,88 @@ import logging
 from ..utils.auth_manager import login_required
 from ..utils.unicom_api import unicom_api
 from ..utils.cache_manager import cache_manager
-from ..models import db, UnicomAccount, FlowRecord, FlowBaseline, SystemLog, User
+from ..utils.pagination import keyset_paginate, approximate_total, InvalidCursor
+from ..utils.http_cache import etag_for, not_modified, conditional
+from ..utils.flow_parser import parse_flow_response
+from ..utils import downsample
+from ..models import db, UnicomAccount, FlowRecord, FlowPayload, FlowUsageRollup, FlowForecast, FlowBaseline, SystemLog, User
+from ..models.flow_rollup import PERIODS, PERIOD_DAY, bucket_start
+from ..models.flow_record import NUMERIC_FIELDS
+from ..services import flow_export
+from ..services.flow_writer import flow_writer
 
 flow_bp = Blueprint('flow', __name__)
 logger = logging.getLogger(__name__)
 
+# 流量查询响应的可选部分；view=compact 省略与 flow_info 重复的原始响应和分类汇总
+QUERY_SECTIONS = ('account_info', 'flow_info', 'raw_data', 'comparison', 'baseline_changes', 'forecast', 'flow_summary')
+QUERY_VIEWS = {
+    'full': QUERY_SECTIONS,
+    'compact': ('account_info', 'flow_info', 'comparison', 'baseline_changes', 'forecast'),
+}
+
+
+def _query_sections():
+    """解析 fields=（逗号分隔）或 view=compact|full，返回需要构建的部分
+
+    Raises:
+        ValueError: 参数无效
+    """
+    fields = request.args.get('fields')
+    if fields:
+        sections = tuple(f.strip() for f in fields.split(',') if f.strip())
+        invalid = [f for f in sections if f not in QUERY_SECTIONS]
+        if invalid:
+            raise ValueError(f"不支持的字段: {', '.join(invalid)}")
+        return sections
+    view = request.args.get('view', 'full')
+    if view not in QUERY_VIEWS:
+        raise ValueError('view 仅支持 compact/full')
+    return QUERY_VIEWS[view]
+
+
+def _flow_query_etag(account_id, result, sections, record_marker, baseline_id, forecast):
+    """缓存命中时的（弱）ETag：由缓存时间戳与耗时、最新记录、最新基准、预测版本与返回的部分决定
+
+    304 时不写新记录，客户端持有的 record_id 与对比数据仍对应最新记录；
+    正文中的剩余小时数、本地查询时间随当前时间变化，因此只保证语义等价
+    """
+    forecast_marker = (forecast['updated_at'], forecast['samples']) if forecast and 'forecast' in sections else None
+    return etag_for('flow', account_id, result.get('cached_at'), result.get('is_stale'), result.get('query_time'),
+                    record_marker, baseline_id, forecast_marker, ','.join(sections))
+
+
+def _current_flow_query_etag(account_id, result, sections):
+    """写入记录前按当前最新记录、基准与预测计算 ETag（与响应后返回的 ETag 一致）"""
+    from ..utils.timezone_helper import from_db_time
+    baseline_values = FlowBaseline.get_latest_values(account_id)
+    last_record = flow_writer.last_record(account_id)
+    forecast = None
+    if 'forecast' in sections:
+        row = db.session.query(FlowForecast.last_at, FlowForecast.samples).filter_by(
+            unicom_account_id=account_id).first()
+        if row is not None:
+            forecast = {'updated_at': from_db_time(row.last_at).isoformat() if row.last_at else None,
+                        'samples': row.samples}
+    return _flow_query_etag(account_id, result, sections,
+                            (last_record.id or last_record.created_at) if last_record else None,
+                            baseline_values['id'] if baseline_values else None, forecast)
+
+
 @flow_bp.route('/query/<int:account_id>', methods=['GET'])
 @login_required
 def query_flow(current_user, account_id):
-    """查询指定账号的流量信息"""
+    """查询指定账号的流量信息
+
+    fields=account_info,flow_info,... 或 view=compact|full（默认 full）控制返回哪些部分，
+    未请求的部分不构建
+    """
     try:
+        try:
+            sections = _query_sections()
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
         # 查找账号
         unicom_account = UnicomAccount.query.filter_by(
             id=account_id,
@@ -44,26 +117,17 @@ def query_flow(current_user, account_id):
         use_cache = request.args.get('use_cache', 'true').lower() == 'true'
         force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
 
-        if force_refresh and not cache_manager.can_manual_refresh(account_id, current_user.id):
-            # 获取用户的刷新冷却配置来显示准确的等待时间
-            try:
-                from ..models.user_settings import UserSettings
-                user_settings = UserSettings.get_or_create(current_user.id)
-                settings_dict = user_settings.to_dict()
-                cooldown_seconds = settings_dict.get('cache', {}).get('refreshCooldownSeconds', 60)
-            except Exception:
-                cooldown_seconds = current_app.config.get('MANUAL_REFRESH_INTERVAL', 60)
-
-            return jsonify({
-                'success': False,
-                'message': f'手动刷新限制：{cooldown_seconds}秒内只能刷新1次',
-                'code': 'RATE_LIMITED'
-            }), 429
-
-        # 如果强制刷新，则不使用缓存
+        # 如果强制刷新，则不使用缓存（冷却检查与占用一次完成）
         if force_refresh:
+            refresh_limit = cache_manager.acquire_manual_refresh(account_id, current_user.id)
+            if not refresh_limit.allowed:
+                return jsonify({
+                    'success': False,
+                    'message': f'手动刷新限制：{refresh_limit.window}秒内只能刷新1次',
+                    'code': 'RATE_LIMITED',
+                    'retry_after': refresh_limit.retry_after
+                }), 429
             use_cache = False
-            cache_manager.set_manual_refresh_time(account_id, current_user.id)
         
         # 调用联通API查询
         result = unicom_api.query_flow(unicom_account, use_cache=use_cache, user_id=current_user.id)
@@ -93,11 +157,15 @@ def query_flow(current_user, account_id):
                 # 自动刷新成功，使用重试结果
                 result = auth_result if 'data' in auth_result else retry_query()
         
+        # 缓存命中且客户端已持有同一版本：直接返回304，不写记录、不构建响应
+        if result['success'] and result.get('is_cached'):
+            cached_response = not_modified(_current_flow_query_etag(account_id, result, sections), weak=True)
+            if cached_response is not None:
+                return cached_response
+
         if result['success']:
             # 获取上次查询记录用于对比（排除当前可能正在创建的记录）
-            last_record = FlowRecord.query.filter_by(
-                unicom_account_id=account_id
-            ).order_by(FlowRecord.created_at.desc()).first()
+            last_record = flow_writer.last_record(account_id)
 
             from ..utils.timezone_helper import from_db_time
             last_record_time = from_db_time(last_record.created_at) if last_record else None
@@ -106,25 +174,13 @@ def query_flow(current_user, account_id):
             # 保存流量记录
             flow_data = result['data']
 
-            # 解析流量信息
-            flow_info = _parse_flow_data(flow_data)
+            # 解析流量信息（一次解析，记录/基准/返回共用）
+            snapshot = parse_flow_response(flow_data)
 
             # 创建流量记录（使用新的解析结果）
             flow_record = FlowRecord(
                 unicom_account_id=account_id,
-                total_data=flow_info.get('total_flow', '0'),
-                used_data=flow_info.get('used_flow', '0'),  # 使用总已用流量
-                remain_data=flow_info.get('remaining_flow', '0'),
-                free_data=flow_info.get('used_special', '0'),  # 专属流量使用量
-                package_name=flow_info.get('package_name', ''),
-                # 新增分类流量字段
-                used_general=flow_info.get('used_general', '0'),
-                used_special=flow_info.get('used_special', '0'),
-                used_other=flow_info.get('used_other', '0'),
-                remain_general=flow_info.get('remain_general', '0'),
-                remain_special=flow_info.get('remain_special', '0'),
-                remain_other=flow_info.get('remain_other', '0'),
-                raw_response=json.dumps(flow_data, ensure_ascii=False, separators=(',', ':')) if flow_data else None,
+                **snapshot.record_fields(),
                 is_cached=result.get('is_cached', False),
                 query_time=result.get('query_time', 0),
                 # 记录上次查询的数据用于对比
@@ -133,6 +189,8 @@ def query_flow(current_user, account_id):
                 last_total_data=last_record.total_data if last_record else None
             )
 
+            flow_record.set_raw_data(snapshot)
+
             # 计算流量变化
             if last_record:
                 change = flow_record.calculate_data_change(last_record)
@@ -143,40 +201,23 @@ def query_flow(current_user, account_id):
             db.session.add(flow_record)
             db.session.commit()
 
-            # 获取基准数据并计算基准变化
-            baseline = FlowBaseline.get_latest_baseline(account_id)
-            baseline_changes = None
+            # 获取基准数据并计算基准变化（最新基准数值走缓存）
+            baseline_values = FlowBaseline.get_latest_values(account_id)
 
-            if baseline:
-                baseline_changes = baseline.calculate_changes(flow_data)
-                from ..utils.timezone_helper import from_db_time
-                baseline_local_time = from_db_time(baseline.baseline_time)
-                logger.info(f"基准变化计算 - 基准时间: {baseline_local_time}, 变化: {baseline_changes}")
+            if baseline_values:
+                if 'baseline_changes' in sections:
+                    baseline_changes = FlowBaseline.changes_from_values(baseline_values, snapshot)
+                    logger.info(f"基准变化计算 - 基准时间: {baseline_values['baseline_time']}, 变化: {baseline_changes}")
             else:
-                # 首次查询，自动创建基准
+                # 首次查询，自动创建基准（以本次数据为基准，变化量为0）
                 baseline = FlowBaseline.create_baseline(
                     unicom_account_id=account_id,
-                    flow_data=flow_data,
+                    flow_data=snapshot,
                     reason='auto',
                     note='首次查询自动创建基准'
                 )
-                # 首次创建基准时，变化量应该为0
-                baseline_changes = {
-                    'general_change': 0.0,
-                    'free_change': 0.0,
-                    'total_change': 0.0,
-                    'baseline_time': baseline.baseline_time.isoformat(),
-                    'baseline_data': {
-                        'general': float(baseline.baseline_general_data or 0),
-                        'free': float(baseline.baseline_free_data or 0),
-                        'total': float(baseline.baseline_used_data or 0)
-                    },
-                    'current_data': {
-                        'general': float(baseline.baseline_general_data or 0),
-                        'free': float(baseline.baseline_free_data or 0),
-                        'total': float(baseline.baseline_used_data or 0)
-                    }
-                }
+                baseline_values = baseline.numeric_values()
+                baseline_changes = FlowBaseline.changes_from_values(baseline_values, snapshot)
                 logger.info(f"首次查询创建基准 - 基准ID: {baseline.id}, 所有变化设为0")
 
             # 记录查询日志
@@ -190,51 +231,71 @@ def query_flow(current_user, account_id):
                 module='flow'
             )
             
-            # 添加正确的查询时间到raw_data
-            from ..utils.timezone_helper import now, format_local
-            current_time = now()
-            if flow_data:
-                flow_data['query_time_local'] = format_local(current_time)
-                flow_data['query_time_iso'] = current_time.isoformat()
+            data = {
+                'is_cached': result.get('is_cached', False),
+                'is_stale': result.get('is_stale', False),
+                'cached_at': result.get('cached_at'),
+                'query_time': result.get('query_time', 0),
+                'record_id': flow_record.id,
+            }
+            # 只构建请求的部分
+            if 'account_info' in sections:
+                data['account_info'] = {
+                    'id': unicom_account.id,
+                    'phone': unicom_account.phone,
+                    'phone_alias': unicom_account.phone_alias
+                }
+            if 'flow_info' in sections or 'flow_summary' in sections:
+                flow_info = snapshot.to_flow_info()
+                if 'flow_info' in sections:
+                    data['flow_info'] = flow_info
+            if 'raw_data' in sections:
+                # 添加正确的查询时间到raw_data
+                from ..utils.timezone_helper import now, format_local
+                current_time = now()
+                if flow_data:
+                    flow_data['query_time_local'] = format_local(current_time)
+                    flow_data['query_time_iso'] = current_time.isoformat()
+                data['raw_data'] = flow_data
+            if 'comparison' in sections:
+                # 添加对比数据
+                data['comparison'] = {
+                    'last_used_data': flow_record.last_used_data,
+                    'last_free_data': flow_record.last_free_data,
+                    'last_total_data': flow_record.last_total_data,
+                    'data_change': flow_record.data_change,
+                    'last_query_time': from_db_time(last_record.created_at).isoformat() if last_record else None,
+                    'has_previous_data': last_record is not None
+                }
+            if 'baseline_changes' in sections:
+                # 添加基准变化数据
+                data['baseline_changes'] = baseline_changes
+            forecast = None
+            if 'forecast' in sections:
+                # 消耗速率与预计耗尽时间（随记录增量维护）
+                forecast = data['forecast'] = FlowForecast.get_for(account_id)
+            if 'flow_summary' in sections:
+                # 新增分类流量数据供前端使用
+                data['flow_summary'] = {
+                    'used_general': flow_info.get('used_general', '0'),
+                    'used_special': flow_info.get('used_special', '0'),
+                    'used_other': flow_info.get('used_other', '0'),
+                    'remain_general': flow_info.get('remain_general', '0'),
+                    'remain_special': flow_info.get('remain_special', '0'),
+                    'remain_other': flow_info.get('remain_other', '0'),
+                    'extra_packages': flow_info.get('extra_packages', [])
+                }
 
-            return jsonify({
+            response = jsonify({
                 'success': True,
                 'message': '流量查询成功',
-                'data': {
-                    'account_info': {
-                        'id': unicom_account.id,
-                        'phone': unicom_account.phone,
-                        'phone_alias': unicom_account.phone_alias
-                    },
-                    'flow_info': flow_info,
-                    'raw_data': flow_data,
-                    'is_cached': result.get('is_cached', False),
-                    'cached_at': result.get('cached_at'),
-                    'query_time': result.get('query_time', 0),
-                    'record_id': flow_record.id,
-                    # 添加对比数据
-                    'comparison': {
-                        'last_used_data': flow_record.last_used_data,
-                        'last_free_data': flow_record.last_free_data,
-                        'last_total_data': flow_record.last_total_data,
-                        'data_change': flow_record.data_change,
-                        'last_query_time': from_db_time(last_record.created_at).isoformat() if last_record else None,
-                        'has_previous_data': last_record is not None
-                    },
-                    # 添加基准变化数据
-                    'baseline_changes': baseline_changes,
-                    # 新增分类流量数据供前端使用
-                    'flow_summary': {
-                        'used_general': flow_info.get('used_general', '0'),
-                        'used_special': flow_info.get('used_special', '0'),
-                        'used_other': flow_info.get('used_other', '0'),
-                        'remain_general': flow_info.get('remain_general', '0'),
-                        'remain_special': flow_info.get('remain_special', '0'),
-                        'remain_other': flow_info.get('remain_other', '0'),
-                        'extra_packages': flow_info.get('extra_packages', [])
-                    }
-                }
+                'data': data
             })
+            if result.get('is_cached'):
+                # 由本次已取得的记录、基准与预测生成，不再重复查询
+                etag = _flow_query_etag(account_id, result, sections, flow_record.id, baseline_values['id'], forecast)
+                return conditional(response, etag, weak=True)
+            return response
 
             # 记录对比数据日志
             comparison_data = {
@@ -261,139 +322,224 @@ def query_flow(current_user, account_id):
         current_app.logger.error(f"查询流量异常: {e}")
         return jsonify({'success': False, 'message': '查询流量失败'}), 500
 
+def _query_flow_worker(app, account_id, user_id, use_cache):
+    """在独立线程中查询单个账号（使用独立的应用上下文与数据库会话）"""
+    with app.app_context():
+        try:
+            account = db.session.get(UnicomAccount, account_id)
+            if not account:
+                return {'success': False, 'message': '联通账号不存在'}
+            return unicom_api.query_flow(account, use_cache=use_cache, user_id=user_id)
+        finally:
+            db.session.remove()
+
+
+def _account_brief(account):
+    return {
+        'account_id': account.id,
+        'phone': account.phone,
+        'phone_alias': account.phone_alias
+    }
+
+
+def _build_query_all_result(account, result):
+    """保存单个账号的查询结果并生成返回项"""
+    if not result.get('success'):
+        item = _account_brief(account)
+        item.update({
+            'success': False,
+            'message': result.get('message'),
+            'need_refresh': result.get('need_refresh', False),
+            'code': result.get('code')
+        })
+        return item
+
+    # 获取上次查询记录用于对比
+    last_record = flow_writer.last_record(account.id)
+
+    flow_data = result['data']
+    snapshot = parse_flow_response(flow_data)
+    flow_info = snapshot.to_flow_info()
+
+    # 创建流量记录（使用新的解析结果）
+    flow_record = FlowRecord(
+        unicom_account_id=account.id,
+        **snapshot.record_fields(),
+        is_cached=result.get('is_cached', False),
+        query_time=result.get('query_time', 0),
+        # 记录上次查询的数据用于对比
+        last_used_data=last_record.used_data if last_record else None,
+        last_free_data=last_record.free_data if last_record else None,
+        last_total_data=last_record.total_data if last_record else None
+    )
+
+    flow_record.set_raw_data(snapshot)
+
+    # 计算流量变化
+    if last_record:
+        flow_record.calculate_data_change(last_record)
+
+    db.session.add(flow_record)
+    db.session.commit()
+
+    item = _account_brief(account)
+    item.update({
+        'success': True,
+        'flow_info': flow_info,
+        'is_cached': result.get('is_cached', False),
+        'is_stale': result.get('is_stale', False),
+        'cached_at': result.get('cached_at'),
+        'query_time': result.get('query_time', 0),
+        'record_id': flow_record.id,
+        # 添加对比数据
+        'comparison': {
+            'last_used_data': flow_record.last_used_data,
+            'last_free_data': flow_record.last_free_data,
+            'last_total_data': flow_record.last_total_data,
+            'data_change': flow_record.data_change,
+            'last_query_time': last_record.created_at.isoformat() if last_record else None,
+            'has_previous_data': last_record is not None
+        },
+        'forecast': FlowForecast.get_for(account.id)
+    })
+    return item
+
+
+def _iter_query_all_results(app, accounts, user_id, use_cache, timeout):
+    """并发查询所有账号，按完成顺序逐个产出结果；超过截止时间的账号返回超时"""
+    pending = {}
+    valid_accounts = []
+    for account in accounts:
+        if account.is_auth_valid():
+            valid_accounts.append(account)
+            continue
+        item = _account_brief(account)
+        item.update({'success': False, 'message': '认证已过期', 'need_refresh': True})
+        yield item
+
+    if not valid_accounts:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=len(valid_accounts), thread_name_prefix='flow-query-all')
+    try:
+        for account in valid_accounts:
+            future = executor.submit(_query_flow_worker, app, account.id, user_id, use_cache)
+            pending[future] = account
+
+        done = set()
+
+        def handle(future):
+            account = pending[future]
+            done.add(future)
+            try:
+                return _build_query_all_result(account, future.result())
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"查询账号 {account.phone} 流量异常: {e}")
+                item = _account_brief(account)
+                item.update({'success': False, 'message': f'查询失败: {str(e)}'})
+                return item
+
+        try:
+            for future in as_completed(pending, timeout=timeout):
+                yield handle(future)
+        except FuturesTimeoutError:
+            for future, account in pending.items():
+                if future in done:
+                    continue
+                if future.done():
+                    yield handle(future)
+                    continue
+                future.cancel()
+                current_app.logger.warning(f"查询账号 {account.phone} 流量超时({timeout}秒)")
+                item = _account_brief(account)
+                item.update({'success': False, 'message': f'查询超时({timeout}秒)', 'timeout': True})
+                yield item
+    finally:
+        # 超时的上游请求在后台自然结束，不阻塞响应
+        executor.shutdown(wait=False)
+
+
+def _query_all_summary(results):
+    success_count = sum(1 for r in results if r['success'])
+    total_count = len(results)
+    return {
+        'total_count': total_count,
+        'success_count': success_count,
+        'failed_count': total_count - success_count
+    }
+
+
 @flow_bp.route('/query-all', methods=['GET'])
 @login_required
 def query_all_flows(current_user):
-    """查询用户所有账号的流量信息"""
+    """查询用户所有账号的流量信息
+
+    各账号并发查询。stream=ndjson / stream=sse（或对应的 Accept 头）时按完成顺序流式返回，
+    否则等待全部完成后按原JSON格式返回。
+    """
     try:
         # 获取用户所有有效的联通账号
         accounts = UnicomAccount.query.filter_by(
             user_id=current_user.id,
             status=1
         ).all()
-        
-        if not accounts:
+
+        stream = request.args.get('stream', '').lower()
+        if not stream:
+            accept = request.headers.get('Accept', '')
+            if 'text/event-stream' in accept:
+                stream = 'sse'
+            elif 'application/x-ndjson' in accept:
+                stream = 'ndjson'
+
+        if not accounts and stream not in ('ndjson', 'sse'):
             return jsonify({
                 'success': True,
                 'message': '暂无联通账号',
                 'data': []
             })
-        
-        results = []
+
         use_cache = request.args.get('use_cache', 'true').lower() == 'true'
-        
-        for account in accounts:
-            try:
-                # 检查认证状态
-                if not account.is_auth_valid():
-                    results.append({
-                        'account_id': account.id,
-                        'phone': account.phone,
-                        'phone_alias': account.phone_alias,
-                        'success': False,
-                        'message': '认证已过期',
-                        'need_refresh': True
-                    })
-                    continue
-                
-                # 查询流量
-                result = unicom_api.query_flow(account, use_cache=use_cache, user_id=current_user.id)
-                
-                if result['success']:
-                    # 获取上次查询记录用于对比
-                    last_record = FlowRecord.query.filter_by(
-                        unicom_account_id=account.id
-                    ).order_by(FlowRecord.created_at.desc()).first()
-
-                    flow_data = result['data']
-                    flow_info = _parse_flow_data(flow_data)
-
-                    # 创建流量记录（使用新的解析结果）
-                    flow_record = FlowRecord(
-                        unicom_account_id=account.id,
-                        total_data=flow_info.get('total_flow', '0'),
-                        used_data=flow_info.get('used_flow', '0'),  # 使用总已用流量
-                        remain_data=flow_info.get('remaining_flow', '0'),
-                        free_data=flow_info.get('used_special', '0'),  # 专属流量使用量
-                        package_name=flow_info.get('package_name', ''),
-                        # 新增分类流量字段
-                        used_general=flow_info.get('used_general', '0'),
-                        used_special=flow_info.get('used_special', '0'),
-                        used_other=flow_info.get('used_other', '0'),
-                        remain_general=flow_info.get('remain_general', '0'),
-                        remain_special=flow_info.get('remain_special', '0'),
-                        remain_other=flow_info.get('remain_other', '0'),
-                        raw_response=json.dumps(flow_data, ensure_ascii=False, separators=(',', ':')) if flow_data else None,
-                        is_cached=result.get('is_cached', False),
-                        query_time=result.get('query_time', 0),
-                        # 记录上次查询的数据用于对比
-                        last_used_data=last_record.used_data if last_record else None,
-                        last_free_data=last_record.free_data if last_record else None,
-                        last_total_data=last_record.total_data if last_record else None
-                    )
-
-                    # 计算流量变化
-                    if last_record:
-                        flow_record.calculate_data_change(last_record)
-
-                    db.session.add(flow_record)
-                    
-                    results.append({
-                        'account_id': account.id,
-                        'phone': account.phone,
-                        'phone_alias': account.phone_alias,
-                        'success': True,
-                        'flow_info': flow_info,
-                        'is_cached': result.get('is_cached', False),
-                        'cached_at': result.get('cached_at'),
-                        'query_time': result.get('query_time', 0),
-                        'record_id': flow_record.id,
-                        # 添加对比数据
-                        'comparison': {
-                            'last_used_data': flow_record.last_used_data,
-                            'last_free_data': flow_record.last_free_data,
-                            'last_total_data': flow_record.last_total_data,
-                            'data_change': flow_record.data_change,
-                            'last_query_time': last_record.created_at.isoformat() if last_record else None,
-                            'has_previous_data': last_record is not None
-                        }
-                    })
-                else:
-                    results.append({
-                        'account_id': account.id,
-                        'phone': account.phone,
-                        'phone_alias': account.phone_alias,
-                        'success': False,
-                        'message': result.get('message'),
-                        'need_refresh': result.get('need_refresh', False),
-                        'code': result.get('code')
-                    })
-                    
-            except Exception as e:
-                current_app.logger.error(f"查询账号 {account.phone} 流量异常: {e}")
-                results.append({
-                    'account_id': account.id,
-                    'phone': account.phone,
-                    'phone_alias': account.phone_alias,
-                    'success': False,
-                    'message': f'查询失败: {str(e)}'
-                })
-        
-        db.session.commit()
-        
-        # 统计结果
-        success_count = sum(1 for r in results if r['success'])
-        total_count = len(results)
-        
+        timeout = current_app.config.get('QUERY_ALL_ACCOUNT_TIMEOUT', 20)
+        app = current_app._get_current_object()
+        results_iter = _iter_query_all_results(app, accounts, current_user.id, use_cache, timeout)
+
+        if stream in ('ndjson', 'sse'):
+            def encode(event, payload):
+                body = json.dumps(payload, ensure_ascii=False, default=str)
+                if stream == 'sse':
+                    return f"event: {event}\ndata: {body}\n\n"
+                return json.dumps({'type': event, 'data': payload}, ensure_ascii=False, default=str) + '\n'
+
+            def generate():
+                results = []
+                try:
+                    for item in results_iter:
+                        results.append(item)
+                        yield encode('result', item)
+                    yield encode('summary', _query_all_summary(results))
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f"批量查询流量异常: {e}")
+                    yield encode('error', {'message': '批量查询流量失败'})
+
+            mimetype = 'text/event-stream' if stream == 'sse' else 'application/x-ndjson'
+            response = Response(stream_with_context(generate()), mimetype=mimetype)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
+
+        # 兼容模式：全部完成后按账号顺序返回
+        order = {account.id: index for index, account in enumerate(accounts)}
+        results = sorted(results_iter, key=lambda item: order.get(item['account_id'], 0))
+        summary = _query_all_summary(results)
+
         return jsonify({
             'success': True,
-            'message': f'批量查询完成，成功 {success_count}/{total_count}',
+            'message': f"批量查询完成，成功 {summary['success_count']}/{summary['total_count']}",
             'data': results,
-            'summary': {
-                'total_count': total_count,
-                'success_count': success_count,
-                'failed_count': total_count - success_count
-            }
+            'summary': summary
         })
         
     except Exception as e:
@@ -404,7 +550,11 @@ def query_all_flows(current_user):
 @flow_bp.route('/history/<int:account_id>', methods=['GET'])
 @login_required
 def get_flow_history(current_user, account_id):
-    """获取指定账号的流量历史记录"""
+    """获取指定账号的流量历史记录
+
+    默认按 page/per_page 页码分页；传 paging=cursor（首页）或 cursor=<上次返回的游标> 时
+    使用游标分页，with_total=true 时附带近似总数
+    """
     try:
         # 查找账号
         unicom_account = UnicomAccount.query.filter_by(
@@ -418,8 +568,12 @@ def get_flow_history(current_user, account_id):
         
         # 获取查询参数
         page = request.args.get('page', 1, type=int)
+        cursor = request.args.get('cursor', '').strip() or None
+        # 游标分页需显式启用（传 cursor 或 paging=cursor），默认仍为页码分页
+        use_cursor = bool(cursor) or request.args.get('paging', '').strip().lower() == 'cursor'
         per_page = min(request.args.get('per_page', 20, type=int), 100)
         days = request.args.get('days', 7, type=int)
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
         
         # 计算时间范围
         from ..utils.timezone_helper import get_db_time
@@ -430,28 +584,51 @@ def get_flow_history(current_user, account_id):
         query = FlowRecord.query.filter(
             FlowRecord.unicom_account_id == account_id,
             FlowRecord.created_at >= start_date
-        ).order_by(FlowRecord.created_at.desc())
-        
-        pagination = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
         )
+
+        if not use_cursor:
+            # 页码分页（默认）
+            pagination = query.order_by(FlowRecord.created_at.desc()).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+            items = pagination.items
+            pagination_info = {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_prev': pagination.has_prev,
+                'has_next': pagination.has_next
+            }
+        else:
+            # 游标分页：按 (created_at, id) 定位，翻页深度不影响耗时
+            try:
+                result = keyset_paginate(query, FlowRecord, cursor=cursor, per_page=per_page)
+            except InvalidCursor as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            items = result['items']
+            pagination_info = {
+                'per_page': per_page,
+                'has_prev': result['has_prev'],
+                'has_next': result['has_next'],
+                'next_cursor': result['next_cursor'],
+                'prev_cursor': result['prev_cursor']
+            }
+            if with_total:
+                pagination_info['total'] = approximate_total(query, f"flow_history:{account_id}:{days}")
+                pagination_info['total_is_approximate'] = True
         
-        records = [record.to_dict() for record in pagination.items]
+        # 批量预取原始响应，避免逐条查询
+        FlowPayload.load_many([record.payload_hash for record in items])
+        records = [record.to_dict() for record in items]
         
         return jsonify({
             'success': True,
             'data': {
                 'records': records,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_prev': pagination.has_prev,
-                    'has_next': pagination.has_next
-                },
+                'pagination': pagination_info,
                 'account_info': {
                     'id': unicom_account.id,
                     'phone': unicom_account.phone,
@@ -464,6 +641,45 @@ def get_flow_history(current_user, account_id):
         current_app.logger.error(f"获取流量历史异常: {e}")
         return jsonify({'success': False, 'message': '获取流量历史失败'}), 500
 
+@flow_bp.route('/export', methods=['GET'])
+@login_required
+def export_flow_history(current_user):
+    """流式导出流量历史（CSV/Parquet）
+
+    参数: format=csv|parquet，account_id（可重复或逗号分隔，默认全部账号），
+    start/end（本地时间，仅日期时 end 包含当天）
+    """
+    try:
+        fmt = request.args.get('format', flow_export.FORMAT_CSV).lower()
+        try:
+            flow_export.check_format(fmt)
+            start, end = flow_export.parse_range(request.args.get('start'), request.args.get('end'))
+            requested = {int(v) for raw in request.args.getlist('account_id') for v in raw.split(',') if v.strip()}
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except flow_export.ExportUnavailable as e:
+            return jsonify({'success': False, 'message': str(e)}), 501
+
+        query = db.session.query(UnicomAccount.id).filter(UnicomAccount.user_id == current_user.id,
+                                                           UnicomAccount.status == 1)
+        if requested:
+            query = query.filter(UnicomAccount.id.in_(requested))
+        account_ids = [row.id for row in query.all()]
+        if requested and len(account_ids) != len(requested):
+            return jsonify({'success': False, 'message': '联通账号不存在'}), 404
+
+        batch_size = current_app.config.get('FLOW_EXPORT_BATCH_SIZE', 5000)
+        filename = f"flow_history_{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+        return Response(
+            stream_with_context(flow_export.iter_export(fmt, account_ids, start, end, batch_size)),
+            mimetype=flow_export.MIMETYPES[fmt],
+            headers={'Content-Disposition': f'attachment; filename={filename}', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"导出流量历史失败: {e}")
+        return jsonify({'success': False, 'message': '导出流量历史失败'}), 500
+
 @flow_bp.route('/statistics/<int:account_id>', methods=['GET'])
 @login_required
 def get_flow_statistics(current_user, account_id):
@@ -481,19 +697,25 @@ def get_flow_statistics(current_user, account_id):
         
         # 获取查询参数
         days = request.args.get('days', 30, type=int)
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in PERIODS:
+            return jsonify({'success': False, 'message': 'granularity 仅支持 hour/day'}), 400
         
         # 计算时间范围
         from ..utils.timezone_helper import get_db_time
         end_date = get_db_time()
         start_date = end_date - timedelta(days=days)
         
-        # 查询统计数据
-        records = FlowRecord.query.filter(
-            FlowRecord.unicom_account_id == account_id,
-            FlowRecord.created_at >= start_date
-        ).order_by(FlowRecord.created_at.asc()).all()
-        
-        if not records:
+        # 读取预聚合汇总（按天汇总计算整体指标，趋势按请求粒度）
+        rollups = FlowUsageRollup.query.filter(
+            FlowUsageRollup.unicom_account_id == account_id,
+            FlowUsageRollup.period == granularity,
+            FlowUsageRollup.bucket_start >= bucket_start(start_date, granularity)
+        ).order_by(FlowUsageRollup.bucket_start.asc()).all()
+
+        total_queries = sum(r.query_count for r in rollups)
+
+        if not total_queries:
             return jsonify({
                 'success': True,
                 'data': {
@@ -511,36 +733,31 @@ def get_flow_statistics(current_user, account_id):
                     }
                 }
             })
-        
-        # 计算统计信息
-        total_queries = len(records)
-        usage_percentages = [r.usage_percentage for r in records if r.usage_percentage is not None]
-        
-        avg_usage = sum(usage_percentages) / len(usage_percentages) if usage_percentages else 0
-        max_usage = max(usage_percentages) if usage_percentages else 0
-        min_usage = min(usage_percentages) if usage_percentages else 0
-        
-        # 生成趋势数据（按天聚合）
+
+        usage_samples = sum(r.usage_samples for r in rollups)
+        avg_usage = sum(r.usage_sum for r in rollups) / usage_samples if usage_samples else 0
+        max_usage = max((r.max_usage for r in rollups if r.max_usage is not None), default=0)
+        min_usage = min((r.min_usage for r in rollups if r.min_usage is not None), default=0)
+
+        from ..utils.timezone_helper import from_db_time
         trend_data = []
-        current_date = start_date.date()
-        
-        while current_date <= end_date.date():
-            day_records = [r for r in records if r.created_at.date() == current_date]
-            
-            if day_records:
-                # 取当天最后一条记录
-                latest_record = max(day_records, key=lambda x: x.created_at)
-                trend_data.append({
-                    'date': current_date.isoformat(),
-                    'total_flow': latest_record.total_flow,
-                    'used_flow': latest_record.used_flow,
-                    'remaining_flow': latest_record.remaining_flow,
-                    'usage_percentage': latest_record.usage_percentage,
-                    'query_count': len(day_records)
-                })
-            
-            current_date += timedelta(days=1)
-        
+        for rollup in rollups:
+            usage = None
+            if rollup.last_total_mb and rollup.last_used_mb is not None:
+                usage = round(rollup.last_used_mb * 100.0 / rollup.last_total_mb, 2)
+            bucket = from_db_time(rollup.bucket_start)
+            trend_data.append({
+                'date': bucket.date().isoformat() if granularity == PERIOD_DAY else bucket.isoformat(),
+                'total_flow': rollup.last_total_mb,
+                'used_flow': rollup.last_used_mb,
+                'remaining_flow': rollup.last_remain_mb,
+                'usage_percentage': usage,
+                'used_change': rollup.delta_mb,
+                'min_used': rollup.min_used_mb,
+                'max_used': rollup.max_used_mb,
+                'query_count': rollup.query_count
+            })
+
         return jsonify({
             'success': True,
             'data': {
@@ -555,6 +772,7 @@ def get_flow_statistics(current_user, account_id):
                     'max_usage_percentage': round(max_usage, 2),
                     'min_usage_percentage': round(min_usage, 2),
                     'trend_data': trend_data,
+                    'granularity': granularity,
                     'date_range': {
                         'start_date': start_date.date().isoformat(),
                         'end_date': end_date.date().isoformat(),
@@ -568,232 +786,88 @@ def get_flow_statistics(current_user, account_id):
         current_app.logger.error(f"获取流量统计异常: {e}")
         return jsonify({'success': False, 'message': '获取流量统计失败'}), 500
 
-def _parse_flow_data(flow_data):
-    """解析流量数据 - 兼容所有联通API响应格式"""
+# 可绘制的数值列（MB）
+SERIES_METRICS = tuple(NUMERIC_FIELDS.values())
+_EPOCH = datetime(1970, 1, 1)
+
+
+@flow_bp.route('/series/<int:account_id>', methods=['GET'])
+@login_required
+def get_flow_series(current_user, account_id):
+    """获取降采样后的流量曲线
+
+    参数: metrics（逗号分隔，首个为降采样依据，默认 used_mb），points（点数预算），
+    method=lttb|minmax，days（默认30）或 start/end（本地时间）
+    """
     try:
-        # 根据联通API响应格式解析
-        if not flow_data:
-            return {
-                'total_flow': '0',
-                'used_flow': '0',
-                'remaining_flow': '0',
-                'usage_percentage': 0,
-                'flow_packages': [],
-                'extra_packages': [],
-                'package_name': '',
-                'used_general': '0',
-                'used_special': '0',
-                'used_other': '0',
-                'remain_general': '0',
-                'remain_special': '0',
-                'remain_other': '0'
-            }
+        unicom_account = UnicomAccount.query.filter_by(
+            id=account_id,
+            user_id=current_user.id,
+            status=1
+        ).first()
 
-        # 基础流量信息
-        total_flow = flow_data.get('sum', '0')  # 总流量
-        used_flow = flow_data.get('allUserFlow', '0')  # 已用流量
-
-        # 剩余流量：优先canUseFlowAll，备选canUseValueAll
-        remaining_flow = flow_data.get('canUseFlowAll') or flow_data.get('canUseValueAll', '0')
-
-        # 套餐名称：优先packageName，备选从unshared中提取
-        package_name = flow_data.get('packageName', '')
-
-        # 从flowSumList提取分类使用量和剩余量
-        used_general = '0'
-        used_special = '0'
-        used_other = '0'
-        remain_general = '0'
-        remain_special = '0'
-        remain_other = '0'
-
-        flow_sum_list = flow_data.get('flowSumList', [])
-        for item in flow_sum_list:
-            flow_type = str(item.get('flowtype', '')).strip()
-            used_value = str(item.get('xusedvalue', '0'))
-            remain_value = str(item.get('xcanusevalue', '0'))
-
-            if flow_type == '1':  # 通用流量
-                used_general = used_value
-                remain_general = remain_value
-            elif flow_type == '2':  # 专用流量
-                used_special = used_value
-                remain_special = remain_value
-            elif flow_type == '3':  # 其他流量
-                used_other = used_value
-                remain_other = remain_value
-
-        # 解析流量包详情
-        flow_packages = []
-        extra_packages = []
-
-        # 方法1：从resources提取流量包
-        resources = flow_data.get('resources', [])
-        if resources:
-            for resource in resources:
-                if resource.get('type') == 'flow' and resource.get('details'):
-                    for detail in resource['details']:
-                        # 处理无限量流量包（total为0或空的情况）
-                        total_value = detail.get('total', '0')
-                        used_value = detail.get('use', '0')
-                        remain_value = detail.get('remain', '0')
-
-                        # 识别无限量流量包
-                        is_unlimited = False
-                        try:
-                            # 情况1: total为0或空，且有使用量
-                            if (not total_value or float(total_value) == 0) and used_value and float(used_value) > 0:
-                                is_unlimited = True
-                            # 情况2: remain为负数或异常大的情况（可能是无限量）
-                            elif remain_value and float(remain_value) < 0:
-                                is_unlimited = True
-                        except (ValueError, TypeError):
-                            pass
-
-                        package_info = {
-                            'name': detail.get('addUpItemName') or detail.get('feePolicyName', '流量包'),
-                            'total': total_value if not is_unlimited else 'unlimited',
-                            'used': used_value,
-                            'remaining': remain_value if not is_unlimited else 'unlimited',
-                            'unit': 'MB',
-                            'type': detail.get('flowType', '1'),
-                            'end_date': detail.get('endDate', ''),
-                            'used_percent': detail.get('usedPercent', '0'),
-                            'source': 'resources',
-                            'is_unlimited': is_unlimited
-                        }
-                        flow_packages.append(package_info)
-
-                        # 如果没有套餐名称，从主要流量包中提取
-                        if not package_name and detail.get('feePolicyName'):
-                            package_name = detail['feePolicyName']
-
-        # 方法2：从unshared提取流量包（如果resources为空或无详情）
-        if not flow_packages:
-            unshared = flow_data.get('unshared', [])
-            for item in unshared:
-                if item.get('type') == 'unsharedFlowList' and item.get('details'):
-                    for detail in item['details']:
-                        # 处理无限量流量包（total为0或空的情况）
-                        total_value = detail.get('total', '0')
-                        used_value = detail.get('use', '0')
-                        remain_value = detail.get('remain', '0')
-
-                        # 识别无限量流量包
-                        is_unlimited = False
-                        try:
-                            # 情况1: total为0或空，且有使用量
-                            if (not total_value or float(total_value) == 0) and used_value and float(used_value) > 0:
-                                is_unlimited = True
-                            # 情况2: remain为负数或异常大的情况（可能是无限量）
-                            elif remain_value and float(remain_value) < 0:
-                                is_unlimited = True
-                        except (ValueError, TypeError):
-                            pass
-
-                        package_info = {
-                            'name': detail.get('addUpItemName') or detail.get('feePolicyName', '流量包'),
-                            'total': total_value if not is_unlimited else 'unlimited',
-                            'used': used_value,
-                            'remaining': remain_value if not is_unlimited else 'unlimited',
-                            'unit': 'MB',
-                            'type': detail.get('flowType', '1'),
-                            'end_date': detail.get('endDate', ''),
-                            'used_percent': detail.get('usedPercent', '0'),
-                            'source': 'unshared',
-                            'is_unlimited': is_unlimited
-                        }
-                        flow_packages.append(package_info)
-
-                        # 提取套餐名称（优先主套餐）
-                        if not package_name and detail.get('feePolicyName'):
-                            if '大王卡' in detail['feePolicyName'] or detail.get('flowType') == '2':
-                                package_name = detail['feePolicyName']
-
-        # 解析套外流量包 (TwResources)
-        tw_resources = flow_data.get('TwResources', [])
-        for tw_resource in tw_resources:
-            if tw_resource.get('type') == 'flow' and tw_resource.get('details'):
-                for detail in tw_resource['details']:
-                    # 处理无限量流量包（total为0或空的情况）
-                    total_value = detail.get('total', '0')
-                    used_value = detail.get('use', '0')
-                    remain_value = detail.get('remain', '0')
-
-                    # 识别无限量流量包的多种情况
-                    is_unlimited = False
-                    try:
-                        # 情况1: total为0或空，且有使用量
-                        if (not total_value or float(total_value) == 0) and used_value and float(used_value) > 0:
-                            is_unlimited = True
-                        # 情况2: 包名包含"专享"、"免费"、"大王卡"等关键词，且没有明确总量
-                        elif detail.get('addUpItemName') and any(keyword in detail.get('addUpItemName', '') for keyword in ['专享', '免费', '大王卡', '定向']):
-                            if not total_value or float(total_value) == 0:
-                                is_unlimited = True
-                        # 情况3: remain为负数或异常大的情况（可能是无限量）
-                        elif remain_value and float(remain_value) < 0:
-                            is_unlimited = True
-                    except (ValueError, TypeError):
-                        pass
-
-                    extra_info = {
-                        'name': detail.get('addUpItemName', '套外流量包'),
-                        'total': total_value if not is_unlimited else 'unlimited',
-                        'used': used_value,
-                        'remaining': remain_value if not is_unlimited else 'unlimited',
-                        'unit': 'MB',
-                        'type': detail.get('flowType', '1'),
-                        'used_percent': detail.get('usedPercent', '0'),
-                        'is_extra': True,
-                        'is_unlimited': is_unlimited,
-                        'source': 'TwResources'
-                    }
-                    extra_packages.append(extra_info)
+        if not unicom_account:
+            return jsonify({'success': False, 'message': '联通账号不存在'}), 404
+
+        metrics = [m.strip() for m in request.args.get('metrics', 'used_mb').split(',') if m.strip()]
+        invalid = [m for m in metrics if m not in SERIES_METRICS]
+        if not metrics or invalid:
+            return jsonify({'success': False, 'message': f"不支持的指标: {', '.join(invalid)}"}), 400
+        method = request.args.get('method', downsample.METHOD_LTTB)
+        if method not in downsample.METHODS:
+            return jsonify({'success': False, 'message': 'method 仅支持 lttb/minmax'}), 400
+        max_points = current_app.config.get('FLOW_SERIES_MAX_POINTS', 1000)
+        points = max(3, min(request.args.get('points', 300, type=int), max_points))
 
-        # 计算使用百分比
         try:
-            usage_percentage = float(flow_data.get('sumPercent', 0))
-        except (ValueError, AttributeError):
-            try:
-                total_num = float(str(total_flow).replace('MB', '').replace('GB', '').replace(',', ''))
-                used_num = float(str(used_flow).replace('MB', '').replace('GB', '').replace(',', ''))
-                usage_percentage = (used_num / total_num * 100) if total_num > 0 else 0
-            except (ValueError, AttributeError):
-                usage_percentage = 0
-
-        return {
-            'total_flow': total_flow,
-            'used_flow': used_flow,
-            'remaining_flow': remaining_flow,
-            'usage_percentage': round(usage_percentage, 2),
-            'flow_packages': flow_packages,
-            'extra_packages': extra_packages,
-            'package_name': package_name,
-            'used_general': used_general,
-            'used_special': used_special,
-            'used_other': used_other,
-            'remain_general': remain_general,
-            'remain_special': remain_special,
-            'remain_other': remain_other
-        }
+            start, end = flow_export.parse_range(request.args.get('start'), request.args.get('end'))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if start is None:
+            from ..utils.timezone_helper import get_db_time
+            days = request.args.get('days', 30, type=int)
+            start = (end or get_db_time().replace(tzinfo=None)) - timedelta(days=days)
+
+        # 按列读取（时间 + 所需数值列），不构造 ORM 对象
+        primary = getattr(FlowRecord, metrics[0])
+        stmt = db.select(FlowRecord.created_at, *[getattr(FlowRecord, m) for m in metrics]).where(
+            FlowRecord.unicom_account_id == account_id,
+            FlowRecord.query_status == 1,
+            FlowRecord.created_at >= start,
+            primary.isnot(None)
+        )
+        if end is not None:
+            stmt = stmt.where(FlowRecord.created_at < end)
+        rows = db.session.execute(stmt.order_by(FlowRecord.created_at.asc(), FlowRecord.id.asc())).all()
+
+        columns = list(zip(*rows)) if rows else [()] * (len(metrics) + 1)
+        times = columns[0]
+        xs = [(t - _EPOCH).total_seconds() for t in times]
+        selected = downsample.downsample(xs, columns[1], points, method)
+
+        from ..utils.timezone_helper import from_db_time
+        return jsonify({
+            'success': True,
+            'data': {
+                'account_info': {
+                    'id': unicom_account.id,
+                    'phone': unicom_account.phone,
+                    'phone_alias': unicom_account.phone_alias
+                },
+                'method': method,
+                'raw_points': len(rows),
+                'points': len(selected),
+                'timestamps': [from_db_time(times[i]).isoformat() for i in selected],
+                'series': {
+                    metric: [column[i] for i in selected]
+                    for metric, column in zip(metrics, columns[1:])
+                }
+            }
+        })
 
     except Exception as e:
-        current_app.logger.error(f"解析流量数据异常: {e}")
-        return {
-            'total_flow': '0',
-            'used_flow': '0',
-            'remaining_flow': '0',
-            'usage_percentage': 0,
-            'flow_packages': [],
-            'extra_packages': [],
-            'package_name': '',
-            'used_general': '0',
-            'used_special': '0',
-            'used_other': '0',
-            'remain_general': '0',
-            'remain_special': '0',
-            'remain_other': '0'
-        }
+        current_app.logger.error(f"获取流量曲线异常: {e}")
+        return jsonify({'success': False, 'message': '获取流量曲线失败'}), 500
 
 def _parse_flow_value(value_str):
     """解析流量值（MB）"""
@@ -69,6 +69,7 @@ def save_cache_settings(current_user):
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(us, 'settings')
         db.session.commit()
+        UserSettings.invalidate_cache(current_user.id)
 
         # 
         current_app.logger.info(f"[settings] cache saved uid={current_user.id} payload={payload} stored={cache_cfg}")
@@ -123,6 +124,7 @@ def save_monitor_settings(current_user):
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(us, 'settings')
         db.session.commit()
+        UserSettings.invalidate_cache(current_user.id)
         current_app.logger.info(f"[settings] monitor saved uid={current_user.id} payload={payload} stored={mon}")
         return jsonify({ 'success': True, 'data': mon })
     except Exception as e:
@@ -165,6 +167,7 @@ def save_alerts_settings(current_user):
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(us, 'settings')
         db.session.commit()
+        UserSettings.invalidate_cache(current_user.id)
         current_app.logger.info(f"[settings] alerts saved uid={current_user.id} payload={payload} stored={alerts}")
         return jsonify({ 'success': True, 'data': alerts })
     except Exception as e:
@@ -244,6 +247,7 @@ def save_notifications_settings(current_user):
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(us, 'settings')
         db.session.commit()
+        UserSettings.invalidate_cache(current_user.id)
         current_app.logger.info(f"[settings] notifications saved uid={current_user.id} payload={payload} stored={noti}")
         return jsonify({ 'success': True, 'data': noti })
     except Exception as e:
@@ -280,6 +284,7 @@ def save_display_settings(current_user):
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(us, 'settings')
         db.session.commit()
+        UserSettings.invalidate_cache(current_user.id)
         current_app.logger.info(f"[settings] display saved uid={current_user.id} payload={payload} stored={display}")
         return jsonify({ 'success': True, 'data': display })
     except Exception as e:
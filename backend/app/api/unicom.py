@@ -6,28 +6,65 @@
 from flask import Blueprint, request, jsonify, current_app
 import re
 
+from sqlalchemy import func
+
 from ..utils.auth_manager import login_required
 from ..utils.unicom_api import unicom_api
 from ..utils.device_generator import device_generator
 from ..utils.cache_manager import cache_manager
-from ..models import db, UnicomAccount, DeviceFingerprint, SystemLog
+from ..utils.http_cache import etag_for, not_modified, conditional
+from ..models import db, UnicomAccount, DeviceFingerprint, FlowRecord, SystemLog
 
 unicom_bp = Blueprint('unicom', __name__)
 
+def _accounts_etag(accounts):
+    """账号列表的 ETag：由各账号及其关联对象的更新时间、随时间变化的状态与最新成功记录决定，
+    在序列化之前计算，客户端已持有时不构建响应"""
+    latest = {}
+    if accounts:
+        latest = {
+            account_id: (created_at, record_id) for account_id, created_at, record_id in db.session.query(
+                FlowRecord.unicom_account_id, func.max(FlowRecord.created_at), func.max(FlowRecord.id)
+            ).filter(
+                FlowRecord.unicom_account_id.in_([account.id for account in accounts]),
+                FlowRecord.query_status == 1
+            ).group_by(FlowRecord.unicom_account_id)
+        }
+    parts = []
+    for account in accounts:
+        fingerprint, monitor = account.device_fingerprint, account.monitor_config
+        proxy = fingerprint.proxy if fingerprint else None
+        parts.append((
+            account.id, account.updated_at, latest.get(account.id),
+            fingerprint.updated_at if fingerprint else None,
+            (proxy.updated_at, proxy.is_available()) if proxy else None,
+            (monitor.updated_at, monitor.is_in_monitor_time(), monitor.should_check_now()) if monitor else None,
+        ))
+    return etag_for('accounts', *parts)
+
+
 @unicom_bp.route('/accounts', methods=['GET'])
 @login_required
 def get_accounts(current_user):
     """获取用户的联通账号列表"""
     try:
-        accounts = UnicomAccount.query.filter_by(
+        # 关联对象预加载、最新记录批量获取，查询数与账号数无关
+        accounts = UnicomAccount.query.options(*UnicomAccount.eager_options()).filter_by(
             user_id=current_user.id,
             status=1
         ).order_by(UnicomAccount.created_at.desc()).all()
 
-        return jsonify({
+        # 版本未变化时直接返回 304，不查询原始响应、不序列化
+        etag = _accounts_etag(accounts)
+        cached_response = not_modified(etag)
+        if cached_response is not None:
+            return cached_response
+
+        response = jsonify({
             'success': True,
-            'data': [account.to_dict() for account in accounts]
+            'data': UnicomAccount.to_dict_many(accounts)
         })
+        return conditional(response, etag)
 
     except Exception as e:
         current_app.logger.error(f"获取联通账号列表异常: {e}")
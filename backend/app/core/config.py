@@ -43,11 +43,27 @@ class Config:
     REDIS_DB = int(os.environ.get('REDIS_DB') or 0)
     REDIS_PASSWORD = os.environ.get('REDIS_PASSWORD') or 'redis_PDkScA'
     REDIS_URL = f'redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}' if REDIS_PASSWORD else f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2))  # 读写超时(秒)
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', 2))  # 连接超时(秒)
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))  # 空闲连接复用前的健康检查间隔(秒)
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+    REDIS_FAILURE_THRESHOLD = int(os.environ.get('REDIS_FAILURE_THRESHOLD', 3))  # 熔断：窗口内连接错误次数
+    REDIS_FAILURE_WINDOW = 10  # 熔断：错误计数窗口(秒)
+    REDIS_RECONNECT_INTERVAL = 5  # 后台重连初始间隔(秒)，失败后指数退避
+    REDIS_RECONNECT_MAX_INTERVAL = 60
+    # Sentinel：逗号分隔的 host:port 列表，设置后忽略 REDIS_URL
+    REDIS_SENTINELS = os.environ.get('REDIS_SENTINELS', '')
+    REDIS_SENTINEL_MASTER = os.environ.get('REDIS_SENTINEL_MASTER', 'mymaster')
+    REDIS_SENTINEL_PASSWORD = os.environ.get('REDIS_SENTINEL_PASSWORD') or None
+    # Cluster：REDIS_URL 指向任一集群节点
+    REDIS_CLUSTER = os.environ.get('REDIS_CLUSTER', 'false').lower() == 'true'
 
     # JWT配置
     JWT_SECRET_KEY = SECRET_KEY
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # 登录态用户信息缓存秒数（状态变更、登出、注销时主动失效）
+    AUTH_PRINCIPAL_CACHE_TTL = int(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL', 60))
 
     # 联通API配置
     UNICOM_PUBLIC_KEY = """-----BEGIN PUBLIC KEY-----
@@ -63,6 +79,7 @@ jBUxzMeQlEC2czEMSwIDAQAB
     MAX_MONITOR_INTERVAL = 7200 # 最大监控间隔(秒) - 2小时
     MANUAL_REFRESH_INTERVAL = 60  # 手动刷新间隔(秒) - 1分钟
     AUTO_CACHE_REFRESH_INTERVAL = 600  # 自动缓存刷新间隔(秒) - 10分钟
+    QUERY_ALL_ACCOUNT_TIMEOUT = int(os.environ.get('QUERY_ALL_ACCOUNT_TIMEOUT', 20))  # 批量查询单账号截止时间(秒)
 
 
     # 调度配置
@@ -71,6 +88,53 @@ jBUxzMeQlEC2czEMSwIDAQAB
 
     # 缓存配置
     FLOW_CACHE_EXPIRE = 600  # 流量缓存过期时间(秒) - 10分钟
+    FLOW_CACHE_STALE_TTL = int(os.environ.get('FLOW_CACHE_STALE_TTL', 1800))  # 过期后仍可返回旧数据的时长(秒)，0为关闭
+    FLOW_REFRESH_LOCK_TTL = 60  # 后台刷新锁超时(秒)
+
+    # 流量记录写缓冲（监控任务批量写入）
+    FLOW_WRITE_BEHIND = os.environ.get('FLOW_WRITE_BEHIND', 'true').lower() == 'true'
+    FLOW_WRITE_BATCH_SIZE = int(os.environ.get('FLOW_WRITE_BATCH_SIZE', 500))  # 达到条数立即刷写
+    FLOW_WRITE_FLUSH_INTERVAL = float(os.environ.get('FLOW_WRITE_FLUSH_INTERVAL', 2.0))  # 定时刷写间隔(秒)
+    FLOW_WRITE_FSYNC = os.environ.get('FLOW_WRITE_FSYNC', 'false').lower() == 'true'  # 日志每条 fsync（防断电）
+    FLOW_WRITE_JOURNAL_DIR = os.environ.get('FLOW_WRITE_JOURNAL_DIR', '')  # 默认 instance/flow_journal
+    FLOW_WRITE_MAX_RETRIES = int(os.environ.get('FLOW_WRITE_MAX_RETRIES', 3))  # 单条写入失败重试上限，超过后转存 dead-letter
+    FLOW_WRITE_MAX_BUFFER = int(os.environ.get('FLOW_WRITE_MAX_BUFFER', 100000))  # 缓冲上限，超出的最早记录转存 dead-letter
+
+    # 系统日志异步批量写入（队列满时 drop_oldest/drop_new/block）
+    SYSTEM_LOG_ASYNC = os.environ.get('SYSTEM_LOG_ASYNC', 'true').lower() == 'true'
+    SYSTEM_LOG_QUEUE_SIZE = int(os.environ.get('SYSTEM_LOG_QUEUE_SIZE', 10000))
+    SYSTEM_LOG_BATCH_SIZE = int(os.environ.get('SYSTEM_LOG_BATCH_SIZE', 200))  # 达到条数立即刷写
+    SYSTEM_LOG_FLUSH_INTERVAL = float(os.environ.get('SYSTEM_LOG_FLUSH_INTERVAL', 1.0))  # 定时刷写间隔(秒)
+    SYSTEM_LOG_OVERFLOW = os.environ.get('SYSTEM_LOG_OVERFLOW', 'drop_oldest')
+    SYSTEM_LOG_BLOCK_TIMEOUT = float(os.environ.get('SYSTEM_LOG_BLOCK_TIMEOUT', 0.05))  # block 策略最长等待(秒)
+    SYSTEM_LOG_MAX_RETRIES = int(os.environ.get('SYSTEM_LOG_MAX_RETRIES', 3))  # 单行写入失败重试上限，超过后放弃
+    # 按操作的记录策略：full / sample:<比例> / aggregate（按分钟计数），默认为空即全部逐条记录；失败与管理操作始终逐条记录
+    SYSTEM_LOG_POLICIES = os.environ.get('SYSTEM_LOG_POLICIES', '')
+
+    # 代理使用统计缓冲（按间隔或累计条数批量刷写到 proxy_pools）
+    PROXY_STATS_BUFFERED = os.environ.get('PROXY_STATS_BUFFERED', 'true').lower() == 'true'
+    PROXY_STATS_FLUSH_INTERVAL = float(os.environ.get('PROXY_STATS_FLUSH_INTERVAL', 10.0))  # 定时刷写间隔(秒)
+    PROXY_STATS_MAX_PENDING = int(os.environ.get('PROXY_STATS_MAX_PENDING', 1000))  # 累计条数达到后立即刷写
+
+    # 流量历史导出与曲线（导出时服务端游标每批读取条数）
+    FLOW_EXPORT_BATCH_SIZE = int(os.environ.get('FLOW_EXPORT_BATCH_SIZE', 5000))
+    FLOW_SERIES_MAX_POINTS = int(os.environ.get('FLOW_SERIES_MAX_POINTS', 1000))  # 曲线接口点数上限
+
+    # 数据保留配置（天，0为不清理；默认不清理，需显式设置天数才会删除历史数据）
+    FLOW_RECORD_RETENTION_DAYS = int(os.environ.get('FLOW_RECORD_RETENTION_DAYS', 0))
+    SYSTEM_LOG_RETENTION_DAYS = int(os.environ.get('SYSTEM_LOG_RETENTION_DAYS', 0))
+    PARTITION_PRECREATE_MONTHS = 2  # MySQL 预建未来分区月数
+    RETENTION_MAINTENANCE_HOUR = int(os.environ.get('RETENTION_MAINTENANCE_HOUR', 3))  # 每日维护时间(时)
+
+    # /metrics 访问控制：Bearer 令牌（为空则不启用）或来源 IP/网段白名单（逗号分隔），任一匹配即可
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1')
+
+    # 响应压缩（按 Accept-Encoding 选择 brotli/gzip，brotli 需安装 brotli 包）
+    RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'true').lower() == 'true'
+    RESPONSE_COMPRESSION_MIN_SIZE = int(os.environ.get('RESPONSE_COMPRESSION_MIN_SIZE', 1024))  # 小于该字节数不压缩
+    RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.environ.get('RESPONSE_COMPRESSION_GZIP_LEVEL', 6))
+    RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.environ.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', 5))
 
     # 日志配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
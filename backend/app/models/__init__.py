@@ -12,10 +12,14 @@ from .user import User
 from .unicom_account import UnicomAccount
 from .device_fingerprint import DeviceFingerprint
 from .flow_record import FlowRecord
+from .flow_payload import FlowPayload
+from .flow_rollup import FlowUsageRollup
+from .flow_forecast import FlowForecast
 from .flow_baseline import FlowBaseline
 from .monitor_config import MonitorConfig
 from .proxy_pool import ProxyPool
 from .system_log import SystemLog
+from .system_log_counter import SystemLogCounter
 from .user_settings import UserSettings
 
 __all__ = [
@@ -24,8 +28,12 @@ __all__ = [
     'UnicomAccount',
     'DeviceFingerprint',
     'FlowRecord',
+    'FlowPayload',
+    'FlowUsageRollup',
+    'FlowForecast',
     'MonitorConfig',
     'ProxyPool',
     'SystemLog',
+    'SystemLogCounter',
     'UserSettings'
 ]
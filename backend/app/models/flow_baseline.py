@@ -6,8 +6,14 @@
 from datetime import datetime
 import json
 from . import db
+from ..utils.cache_manager import cache_manager
+from ..utils.flow_parser import FlowSnapshot, parse_flow_response
 from ..utils.timezone_helper import get_db_time, from_db_time
 
+# 账号最新基准的数值缓存（创建基准时写入，删除基准时失效；读取时按 MAX(id) 校验）
+LATEST_CACHE_KEY = 'baseline:latest:{account_id}'
+LATEST_CACHE_TTL = 3600
+
 class FlowBaseline(db.Model):
     """流量统计基准模型"""
     __tablename__ = 'flow_baselines'
@@ -48,21 +54,70 @@ class FlowBaseline(db.Model):
             unicom_account_id=unicom_account_id
         ).order_by(cls.baseline_time.desc()).first()
     
+    @classmethod
+    def get_latest_values(cls, unicom_account_id):
+        """账号最新基准的数值 {'id', 'baseline_time', 'general', 'free', 'total'}，无基准返回None
+
+        缓存的基准 id 与账号当前最大基准 id（索引查询）一致时直接使用缓存，
+        否则（其他进程重置了基准、Redis 故障期间的写入未同步等）重新读取并写入缓存
+        """
+        cache_key = LATEST_CACHE_KEY.format(account_id=unicom_account_id)
+        latest_id = db.session.query(db.func.max(cls.id)).filter_by(unicom_account_id=unicom_account_id).scalar()
+        if latest_id is None:
+            return None
+        values = cache_manager.get(cache_key)
+        if values and values.get('id') == latest_id:
+            return values
+        baseline = cls.get_latest_baseline(unicom_account_id)
+        if baseline is None:
+            return None
+        values = baseline.numeric_values()
+        cache_manager.set(cache_key, values, LATEST_CACHE_TTL)
+        return values
+
+    @staticmethod
+    def invalidate_latest(unicom_account_id):
+        """删除基准后使缓存失效"""
+        cache_manager.delete(LATEST_CACHE_KEY.format(account_id=unicom_account_id))
+
+    def numeric_values(self):
+        """基准数值（供缓存与变化计算）"""
+        return {
+            'id': self.id,
+            'baseline_time': from_db_time(self.baseline_time).isoformat() if self.baseline_time else None,
+            'general': float(self.baseline_general_data or 0),
+            'free': float(self.baseline_free_data or 0),
+            'total': float(self.baseline_used_data or 0)
+        }
+
+    @staticmethod
+    def changes_from_values(values, current_flow_data):
+        """根据基准数值计算流量变化（current_flow_data 为原始响应或 FlowSnapshot）"""
+        snapshot = current_flow_data if isinstance(current_flow_data, FlowSnapshot) \
+            else parse_flow_response(current_flow_data)
+        current_general, current_free, current_total = snapshot.usage_totals()
+        return {
+            'general_change': current_general - values['general'],
+            'free_change': current_free - values['free'],
+            'total_change': current_total - values['total'],
+            'baseline_time': values['baseline_time'],
+            'baseline_data': {
+                'general': values['general'],
+                'free': values['free'],
+                'total': values['total']
+            },
+            'current_data': {
+                'general': current_general,
+                'free': current_free,
+                'total': current_total
+            }
+        }
+
     @classmethod
     def create_baseline(cls, unicom_account_id, flow_data, reason='manual', note=None):
-        """创建新的流量基准"""
-        # 解析流量数据
-        general_used = 0
-        free_used = 0
-        
-        if flow_data.get('flowSumList'):
-            for item in flow_data['flowSumList']:
-                if item.get('flowtype') == '1':  # 通用流量
-                    general_used = float(item.get('xusedvalue', 0))
-                elif item.get('flowtype') == '2':  # 专属流量
-                    free_used = float(item.get('xusedvalue', 0))
-        
-        total_used = float(flow_data.get('allUserFlow', 0))
+        """创建新的流量基准（flow_data 为原始响应或已解析的 FlowSnapshot）"""
+        snapshot = flow_data if isinstance(flow_data, FlowSnapshot) else parse_flow_response(flow_data)
+        general_used, free_used, total_used = snapshot.usage_totals()
         
         baseline = cls(
             unicom_account_id=unicom_account_id,
@@ -71,54 +126,23 @@ class FlowBaseline(db.Model):
             baseline_free_data=str(free_used),
             baseline_general_data=str(general_used),
             baseline_total_data=str(total_used),  # 这里可以根据需要调整
-            baseline_raw_data=json.dumps(flow_data, ensure_ascii=False),
+            baseline_raw_data=json.dumps(snapshot.raw or {}, ensure_ascii=False),
             reset_reason=reason,
             reset_note=note
         )
         
         db.session.add(baseline)
         db.session.commit()
+
+        # 新基准即最新基准，直接写入缓存
+        cache_manager.set(LATEST_CACHE_KEY.format(account_id=unicom_account_id),
+                          baseline.numeric_values(), LATEST_CACHE_TTL)
         
         return baseline
     
     def calculate_changes(self, current_flow_data):
         """计算相对于此基准的流量变化"""
-        # 解析当前流量数据
-        current_general = 0
-        current_free = 0
-        
-        if current_flow_data.get('flowSumList'):
-            for item in current_flow_data['flowSumList']:
-                if item.get('flowtype') == '1':  # 通用流量
-                    current_general = float(item.get('xusedvalue', 0))
-                elif item.get('flowtype') == '2':  # 专属流量
-                    current_free = float(item.get('xusedvalue', 0))
-        
-        current_total = float(current_flow_data.get('allUserFlow', 0))
-        
-        # 计算变化
-        baseline_general = float(self.baseline_general_data or 0)
-        baseline_free = float(self.baseline_free_data or 0)
-        baseline_total = float(self.baseline_used_data or 0)
-        
-        changes = {
-            'general_change': current_general - baseline_general,
-            'free_change': current_free - baseline_free,
-            'total_change': current_total - baseline_total,
-            'baseline_time': from_db_time(self.baseline_time).isoformat() if self.baseline_time else None,
-            'baseline_data': {
-                'general': baseline_general,
-                'free': baseline_free,
-                'total': baseline_total
-            },
-            'current_data': {
-                'general': current_general,
-                'free': current_free,
-                'total': current_total
-            }
-        }
-        
-        return changes
+        return self.changes_from_values(self.numeric_values(), current_flow_data)
     
     def to_dict(self):
         """转换为字典"""
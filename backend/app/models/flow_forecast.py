@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流量消耗速率与耗尽预测模型
+每个账号一行，插入 FlowRecord 时增量更新（与小时/天汇总相同的维护方式）：
+- 通用/专属流量各自维护一个按时间衰减的 EWMA 消耗速率(MB/小时)
+- 按“星期几+小时”（168 个时段）维护消耗速率画像，体现一周内的使用规律
+- 每次更新后即算出预计耗尽时间并落库，读取时只取一行，无需扫描历史
+"""
+import json
+from datetime import timedelta, timezone
+
+from sqlalchemy import bindparam, event, select
+
+from . import db
+from .flow_record import FlowRecord
+from ..utils.timezone_helper import from_db_time, get_db_time
+
+KINDS = ('general', 'special')
+WEEK_SLOTS = 7 * 24
+
+RATE_HALF_LIFE_HOURS = 24.0     # 整体速率的半衰期
+PROFILE_HALF_LIFE_HOURS = 2.0   # 时段画像：同一时段累计观测 2 小时后旧值权重减半
+MIN_INTERVAL_HOURS = 1 / 60     # 间隔过短的读数只更新当前值
+MAX_INTERVAL_HOURS = 7 * 24     # 间隔过长视为断档，不计入速率
+HORIZON_HOURS = 366 * 24        # 超出一年不给出预测
+
+
+def _naive_utc(dt):
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _slot(created_at):
+    """数据库UTC时间所在的本地“星期几+小时”时段"""
+    local = from_db_time(created_at)
+    return local.weekday() * 24 + local.hour
+
+
+class FlowForecast(db.Model):
+    """账号流量消耗速率与耗尽预测"""
+    __tablename__ = 'flow_forecasts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    unicom_account_id = db.Column(db.Integer, db.ForeignKey('unicom_accounts.id'), nullable=False, unique=True)
+    last_at = db.Column(db.DateTime, comment='最近一次读数时间')
+    samples = db.Column(db.Integer, nullable=False, default=0, comment='已计入的读数')
+
+    general_used_mb = db.Column(db.Float, comment='最近已用通用流量(MB)')
+    general_remain_mb = db.Column(db.Float, comment='最近剩余通用流量(MB)')
+    general_rate = db.Column(db.Float, comment='通用流量 EWMA 速率(MB/小时)')
+    general_profile = db.Column(db.Text, comment='通用流量168时段速率画像JSON')
+    general_depletion_at = db.Column(db.DateTime, comment='通用流量预计耗尽时间')
+
+    special_used_mb = db.Column(db.Float, comment='最近已用专属流量(MB)')
+    special_remain_mb = db.Column(db.Float, comment='最近剩余专属流量(MB)')
+    special_rate = db.Column(db.Float, comment='专属流量 EWMA 速率(MB/小时)')
+    special_profile = db.Column(db.Text, comment='专属流量168时段速率画像JSON')
+    special_depletion_at = db.Column(db.DateTime, comment='专属流量预计耗尽时间')
+
+    updated_at = db.Column(db.DateTime, default=get_db_time, onupdate=get_db_time)
+
+    # ---------------------- 增量更新 ----------------------
+
+    @staticmethod
+    def _load_state(row, account_id):
+        """数据库行 -> 可变状态（画像解析为列表）"""
+        state = dict(row) if row is not None else {'unicom_account_id': account_id, 'last_at': None, 'samples': 0}
+        for kind in KINDS:
+            for field in ('used_mb', 'remain_mb', 'rate', 'depletion_at'):
+                state.setdefault(f'{kind}_{field}', None)
+            profile = state.get(f'{kind}_profile')
+            state[f'{kind}_profile'] = json.loads(profile) if profile else [None] * WEEK_SLOTS
+        return state
+
+    @staticmethod
+    def observe(state, record):
+        """把一条读数合并进状态，早于最近读数的记录忽略"""
+        at = _naive_utc(record.created_at)
+        last_at = state['last_at']
+        if last_at is not None and at <= last_at:
+            return False
+        hours = (at - last_at).total_seconds() / 3600 if last_at is not None else None
+        counted = hours is not None and MIN_INTERVAL_HOURS <= hours <= MAX_INTERVAL_HOURS
+        if counted:
+            rate_alpha = 1 - 0.5 ** (hours / RATE_HALF_LIFE_HOURS)
+            profile_alpha = 1 - 0.5 ** (min(hours, 1.0) / PROFILE_HALF_LIFE_HOURS)
+            slot = _slot(last_at + (at - last_at) / 2)
+
+        for kind in KINDS:
+            used = getattr(record, f'used_{kind}_mb', None)
+            if used is None:
+                continue
+            previous = state[f'{kind}_used_mb']
+            # 已用减少说明进入新账期，只重置当前值
+            if counted and previous is not None and used >= previous:
+                sample = (used - previous) / hours
+                rate = state[f'{kind}_rate']
+                state[f'{kind}_rate'] = sample if rate is None else rate + rate_alpha * (sample - rate)
+                profile = state[f'{kind}_profile']
+                current = profile[slot]
+                profile[slot] = sample if current is None else current + profile_alpha * (sample - current)
+            state[f'{kind}_used_mb'] = used
+            state[f'{kind}_remain_mb'] = getattr(record, f'remain_{kind}_mb', None)
+
+        state['last_at'] = at
+        state['samples'] = (state['samples'] or 0) + 1
+        return True
+
+    @staticmethod
+    def project(state, kind):
+        """按时段画像（整体水平取 EWMA 速率）推算剩余流量耗尽时间，无法预测返回None"""
+        remain, rate, last_at = state[f'{kind}_remain_mb'], state[f'{kind}_rate'], state['last_at']
+        if remain is None or rate is None or last_at is None:
+            return None
+        if remain <= 0:
+            return last_at
+        if rate <= 0:
+            return None
+
+        profile = [rate if v is None else v for v in state[f'{kind}_profile']]
+        weekly = sum(profile)
+        if weekly <= 0:
+            return None
+        scale = rate * WEEK_SLOTS / weekly
+        weekly_usage = rate * WEEK_SLOTS
+
+        weeks = int(remain // weekly_usage)
+        hours = weeks * WEEK_SLOTS
+        left = remain - weeks * weekly_usage
+        slot = _slot(last_at)
+        for i in range(WEEK_SLOTS):
+            usage = profile[(slot + i) % WEEK_SLOTS] * scale
+            if usage > 0 and usage >= left:
+                hours += left / usage
+                break
+            left -= usage
+            hours += 1
+        if hours > HORIZON_HOURS:
+            return None
+        return last_at + timedelta(hours=hours)
+
+    @staticmethod
+    def _dump_state(state):
+        values = {
+            'last_at': state['last_at'],
+            'samples': state['samples'],
+            'updated_at': get_db_time().replace(tzinfo=None),
+        }
+        for kind in KINDS:
+            for field in ('used_mb', 'remain_mb', 'rate'):
+                values[f'{kind}_{field}'] = state[f'{kind}_{field}']
+            values[f'{kind}_profile'] = json.dumps(
+                [None if v is None else round(v, 4) for v in state[f'{kind}_profile']], separators=(',', ':')
+            )
+            values[f'{kind}_depletion_at'] = FlowForecast.project(state, kind)
+        return values
+
+    @staticmethod
+    def apply_records(connection, records):
+        """把一批流量记录按时间顺序合并进各账号的预测（在插入记录的同一事务内执行）"""
+        records = [r for r in records
+                   if r.created_at is not None and getattr(r, 'query_status', 1) == 1
+                   and any(getattr(r, f'used_{kind}_mb', None) is not None for kind in KINDS)]
+        if not records:
+            return
+        table = FlowForecast.__table__
+        account_ids = {r.unicom_account_id for r in records}
+        existing = {
+            row.unicom_account_id: row._mapping
+            for row in connection.execute(select(table).where(table.c.unicom_account_id.in_(account_ids)))
+        }
+
+        states = {}
+        for record in sorted(records, key=lambda r: (r.unicom_account_id, _naive_utc(r.created_at))):
+            account_id = record.unicom_account_id
+            if account_id not in states:
+                states[account_id] = FlowForecast._load_state(existing.get(account_id), account_id)
+            FlowForecast.observe(states[account_id], record)
+
+        updates, inserts = [], []
+        for account_id, state in states.items():
+            values = FlowForecast._dump_state(state)
+            if account_id in existing:
+                updates.append(dict(values, b_account_id=account_id))
+            else:
+                inserts.append(dict(values, unicom_account_id=account_id))
+        if updates:
+            connection.execute(
+                table.update().where(table.c.unicom_account_id == bindparam('b_account_id'))
+                .values({key: bindparam(key) for key in updates[0] if key != 'b_account_id'}),
+                updates
+            )
+        if inserts:
+            connection.execute(table.insert(), inserts)
+
+    # ---------------------- 读取 ----------------------
+
+    @classmethod
+    def get_for(cls, unicom_account_id):
+        """账号的预测字典，尚无预测返回None"""
+        forecast = cls.query.filter_by(unicom_account_id=unicom_account_id).first()
+        return forecast.to_dict() if forecast else None
+
+    @classmethod
+    def load_many(cls, account_ids):
+        """批量读取 {账号ID: 预测字典}"""
+        if not account_ids:
+            return {}
+        rows = cls.query.filter(cls.unicom_account_id.in_(list(account_ids))).all()
+        return {row.unicom_account_id: row.to_dict() for row in rows}
+
+    def to_dict(self):
+        """转换为字典（hours_left 相对当前时间）"""
+        now = get_db_time().replace(tzinfo=None)
+        data = {
+            'updated_at': from_db_time(self.last_at).isoformat() if self.last_at else None,
+            'samples': self.samples,
+        }
+        for kind in KINDS:
+            rate = getattr(self, f'{kind}_rate')
+            depletion_at = getattr(self, f'{kind}_depletion_at')
+            data[kind] = {
+                'remain_mb': getattr(self, f'{kind}_remain_mb'),
+                'rate_mb_per_hour': round(rate, 2) if rate is not None else None,
+                'rate_mb_per_day': round(rate * 24, 2) if rate is not None else None,
+                'depletion_at': from_db_time(depletion_at).isoformat() if depletion_at else None,
+                'hours_left': round(max((depletion_at - now).total_seconds() / 3600, 0), 1) if depletion_at else None,
+            }
+        return data
+
+    def __repr__(self):
+        return f'<FlowForecast {self.unicom_account_id} {self.last_at}>'
+
+
+@event.listens_for(FlowRecord, 'after_insert')
+def _apply_forecast_after_insert(mapper, connection, target):
+    """插入流量记录后增量更新预测"""
+    FlowForecast.apply_records(connection, [target])
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流量原始响应存储模型
+按内容哈希去重、zlib压缩保存联通接口原始响应，FlowRecord 仅保存哈希引用
+"""
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from ..utils.timezone_helper import get_db_time
+
+ENCODING_ZLIB = 'zlib'
+
+
+class _PayloadCache:
+    """进程内 LRU：hash -> 规范化JSON文本（相同读数被大量记录共享）"""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+_cache = _PayloadCache()
+
+
+class FlowPayload(db.Model):
+    """流量原始响应（内容寻址）"""
+    __tablename__ = 'flow_payloads'
+
+    hash = db.Column(db.String(64), primary_key=True, comment='规范化JSON的SHA-256')
+    encoding = db.Column(db.String(10), nullable=False, default=ENCODING_ZLIB, comment='压缩方式')
+    data = db.Column(db.LargeBinary(length=16777215), nullable=False, comment='压缩后的JSON')
+    size = db.Column(db.Integer, comment='原始JSON字节数')
+    created_at = db.Column(db.DateTime, default=get_db_time)
+
+    @staticmethod
+    def canonicalize(raw_data):
+        """规范化JSON文本（键排序、紧凑分隔符），保证相同内容得到相同哈希"""
+        if isinstance(raw_data, (str, bytes)):
+            raw_data = json.loads(raw_data)
+        return json.dumps(raw_data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+    @staticmethod
+    def digest(raw_data):
+        """返回 (哈希, 规范化JSON文本)"""
+        text = FlowPayload.canonicalize(raw_data)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest(), text
+
+    @staticmethod
+    def _row(digest, text):
+        encoded = text.encode('utf-8')
+        return {
+            'hash': digest,
+            'encoding': ENCODING_ZLIB,
+            'data': zlib.compress(encoded, 6),
+            'size': len(encoded),
+            'created_at': get_db_time().replace(tzinfo=None)
+        }
+
+    @staticmethod
+    def store(raw_data):
+        """保存原始响应并返回哈希（已存在则直接复用）
+
+        在当前会话中写入（随调用方事务一并提交）；并发写入同一哈希时忽略主键冲突。
+        """
+        if raw_data is None:
+            return None
+        digest, text = FlowPayload.digest(raw_data)
+        # 不能仅凭进程缓存跳过：调用方事务可能回滚，需以数据库为准（主键查询，代价很低）
+        if db.session.get(FlowPayload, digest) is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(FlowPayload(**FlowPayload._row(digest, text)))
+            except IntegrityError:
+                pass  # 其他进程已写入相同内容
+        _cache.put(digest, text)
+        return digest
+
+    @staticmethod
+    def store_many(texts):
+        """批量保存 {哈希: 规范化JSON文本}，已存在的跳过（一条 INSERT IGNORE / ON CONFLICT DO NOTHING）"""
+        if not texts:
+            return
+        existing = {row.hash for row in db.session.query(FlowPayload.hash).filter(
+            FlowPayload.hash.in_(list(texts))
+        )}
+        rows = [FlowPayload._row(digest, text) for digest, text in texts.items() if digest not in existing]
+        if rows:
+            table = FlowPayload.__table__
+            dialect_name = db.session.get_bind().dialect.name
+            if dialect_name == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+                stmt = insert(table).on_conflict_do_nothing(index_elements=['hash'])
+            elif dialect_name == 'sqlite':
+                stmt = table.insert().prefix_with('OR IGNORE')
+            else:
+                stmt = table.insert().prefix_with('IGNORE')
+            db.session.execute(stmt, rows)
+        for digest, text in texts.items():
+            _cache.put(digest, text)
+
+    @staticmethod
+    def _decode(payload):
+        if payload.encoding == ENCODING_ZLIB:
+            return zlib.decompress(payload.data).decode('utf-8')
+        raise ValueError(f"不支持的压缩方式: {payload.encoding}")
+
+    @staticmethod
+    def load_many(hashes):
+        """批量加载（一次查询），返回 {hash: dict}"""
+        result = {}
+        missing = []
+        for digest in set(h for h in hashes if h):
+            text = _cache.get(digest)
+            if text is None:
+                missing.append(digest)
+            else:
+                result[digest] = json.loads(text)
+
+        if missing:
+            for payload in FlowPayload.query.filter(FlowPayload.hash.in_(missing)).all():
+                text = FlowPayload._decode(payload)
+                _cache.put(payload.hash, text)
+                result[payload.hash] = json.loads(text)
+        return result
+
+    @staticmethod
+    def load(digest):
+        """加载单个原始响应，不存在返回None"""
+        if not digest:
+            return None
+        return FlowPayload.load_many([digest]).get(digest)
+
+    def __repr__(self):
+        return f'<FlowPayload {self.hash[:12]} {self.size}B>'
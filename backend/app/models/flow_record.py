@@ -5,9 +5,28 @@
 """
 from datetime import datetime
 import json
+from sqlalchemy import event
+from sqlalchemy.orm import deferred
 from . import db
+from .flow_payload import FlowPayload
+from ..utils.flow_parser import FlowSnapshot, parse_flow_response, parse_mb
 from ..utils.timezone_helper import get_db_time
 
+# 字符串字段 -> 数值字段(MB)
+NUMERIC_FIELDS = {
+    'total_data': 'total_mb',
+    'used_data': 'used_mb',
+    'remain_data': 'remain_mb',
+    'free_data': 'free_mb',
+    'used_general': 'used_general_mb',
+    'used_special': 'used_special_mb',
+    'used_other': 'used_other_mb',
+    'remain_general': 'remain_general_mb',
+    'remain_special': 'remain_special_mb',
+    'remain_other': 'remain_other_mb',
+    'data_change': 'data_change_mb',
+}
+
 class FlowRecord(db.Model):
     """流量查询记录模型"""
     __tablename__ = 'flow_records'
@@ -40,9 +59,23 @@ class FlowRecord(db.Model):
     last_free_data = db.Column(db.String(50), comment='上次免费流量')
     last_total_data = db.Column(db.String(50), comment='上次总流量')
     data_change = db.Column(db.String(50), comment='流量变化量')
+
+    # 数值字段(MB)，插入时由字符串字段/原始响应自动填充，供数据库内聚合
+    total_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='总流量(MB)')
+    used_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='已用流量(MB)')
+    remain_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='剩余流量(MB)')
+    free_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='免费流量(MB)')
+    used_general_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='已用通用流量(MB)')
+    used_special_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='已用专属流量(MB)')
+    used_other_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='已用其他流量(MB)')
+    remain_general_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='剩余通用流量(MB)')
+    remain_special_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='剩余专属流量(MB)')
+    remain_other_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='剩余其他流量(MB)')
+    data_change_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='流量变化量(MB)')
     
-    # 原始响应
-    raw_response = db.Column(db.Text, comment='原始响应数据')
+    # 原始响应：新记录只保存 flow_payloads 的哈希引用；raw_response 仅保留旧数据，默认不加载
+    payload_hash = db.Column(db.String(64), index=True, comment='原始响应哈希(flow_payloads.hash)')
+    raw_response = deferred(db.Column(db.Text, comment='原始响应数据(旧)'))
     
     # 查询状态
     query_status = db.Column(db.SmallInteger, default=1, comment='查询状态: 1-成功, 0-失败')
@@ -59,9 +92,75 @@ class FlowRecord(db.Model):
     # 索引
     __table_args__ = (
         db.Index('idx_account_status_time', 'unicom_account_id', 'query_status', 'created_at'),
+        db.Index('idx_account_time_id', 'unicom_account_id', 'created_at', 'id'),
         db.Index('idx_query_type_time', 'query_type', 'created_at'),
     )
     
+    @staticmethod
+    def numeric_values_from_raw(raw_data):
+        """从原始响应中提取数值字段(MB)，raw_data 可为dict、JSON字符串或 FlowSnapshot"""
+        if isinstance(raw_data, FlowSnapshot):
+            return raw_data.numeric_values()
+        if isinstance(raw_data, (str, bytes)):
+            try:
+                raw_data = json.loads(raw_data)
+            except (json.JSONDecodeError, TypeError, ValueError):
+                return {}
+        if not isinstance(raw_data, dict):
+            return {}
+        return parse_flow_response(raw_data).numeric_values()
+
+    @classmethod
+    def compute_numeric_values(cls, text_values, raw_response=None):
+        """由字符串字段计算数值字段，字符串为空时回退到原始响应
+
+        Args:
+            text_values: {字符串字段名: 值}
+            raw_response: 原始响应(dict、JSON字符串或 FlowSnapshot)
+
+        Returns:
+            dict: {数值字段名: MB数值或None}
+        """
+        values = {numeric: parse_mb(text_values.get(text)) for text, numeric in NUMERIC_FIELDS.items()}
+        if raw_response and any(v is None for v in values.values()):
+            for numeric, value in cls.numeric_values_from_raw(raw_response).items():
+                if values.get(numeric) is None:
+                    values[numeric] = value
+        return values
+
+    def set_raw_data(self, raw_data):
+        """保存原始响应到 flow_payloads 并记录引用（raw_data 为原始响应或 FlowSnapshot）"""
+        if isinstance(raw_data, FlowSnapshot):
+            self._snapshot = raw_data
+            raw_data = raw_data.raw
+        self.payload_hash = FlowPayload.store(raw_data) if raw_data else None
+        self._raw_data = raw_data or None
+
+    def get_raw_data(self):
+        """获取原始响应(dict)，兼容仍保存在 raw_response 中的旧记录"""
+        raw_data = getattr(self, '_raw_data', None)
+        if raw_data is not None:
+            return raw_data
+        if self.payload_hash:
+            with db.session.no_autoflush:
+                return FlowPayload.load(self.payload_hash)
+        if self.raw_response:
+            try:
+                return json.loads(self.raw_response)
+            except (json.JSONDecodeError, TypeError):
+                return None
+        return None
+
+    def fill_numeric_fields(self, overwrite=False):
+        """填充数值字段（默认只填充为空的字段）"""
+        text_values = {text: getattr(self, text) for text in NUMERIC_FIELDS}
+        raw_data = None
+        if any(parse_mb(value) is None for value in text_values.values()):
+            raw_data = getattr(self, '_snapshot', None) or self.get_raw_data()
+        for numeric, value in self.compute_numeric_values(text_values, raw_data).items():
+            if value is not None and (overwrite or getattr(self, numeric) is None):
+                setattr(self, numeric, value)
+
     def calculate_data_change(self, last_record=None):
         """计算流量变化"""
         if not last_record:
@@ -71,6 +170,7 @@ class FlowRecord(db.Model):
             current_used = float(self.used_data or 0)
             last_used = float(last_record.used_data or 0)
             change = current_used - last_used
+            self.data_change_mb = round(change, 2)
             
             if change > 0:
                 self.data_change = f"+{change:.2f}MB"
@@ -86,8 +186,8 @@ class FlowRecord(db.Model):
     def get_flow_summary(self):
         """获取流量摘要"""
         try:
-            if self.raw_response:
-                raw_data = json.loads(self.raw_response)
+            raw_data = self.get_raw_data()
+            if raw_data:
                 return {
                     'total': self.total_data,
                     'used': self.used_data,
@@ -113,6 +213,8 @@ class FlowRecord(db.Model):
     
     def is_significant_change(self, threshold_mb=10):
         """判断是否为显著变化"""
+        if self.data_change_mb is not None:
+            return abs(self.data_change_mb) >= threshold_mb
         if not self.data_change:
             return False
             
@@ -157,3 +259,9 @@ class FlowRecord(db.Model):
     
     def __repr__(self):
         return f'<FlowRecord {self.unicom_account_id} {self.used_data}>'
+
+
+@event.listens_for(FlowRecord, 'before_insert')
+def _fill_numeric_fields_before_insert(mapper, connection, target):
+    """插入前填充数值字段"""
+    target.fill_numeric_fields()
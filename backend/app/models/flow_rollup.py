@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流量用量汇总模型
+按账号、按小时/天预聚合已用流量，插入 FlowRecord 时增量维护（upsert），
+统计与趋势接口直接读取汇总行
+"""
+from datetime import timezone
+
+from sqlalchemy import case, event
+
+from . import db
+from .flow_record import FlowRecord
+from ..utils.timezone_helper import tz
+
+PERIOD_HOUR = 'hour'
+PERIOD_DAY = 'day'
+PERIODS = (PERIOD_HOUR, PERIOD_DAY)
+
+
+def _naive_utc(dt):
+    """统一为不带时区的UTC时间（与数据库存储一致）"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def bucket_start(created_at, period):
+    """时间所在桶的起点（按本地时区切分小时/天，返回数据库UTC时间）"""
+    local = tz.to_local(created_at)
+    if period == PERIOD_DAY:
+        local = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        local = local.replace(minute=0, second=0, microsecond=0)
+    local = tz.get_timezone().localize(local.replace(tzinfo=None))
+    return _naive_utc(local)
+
+
+def _usage_pct(used_mb, total_mb):
+    if used_mb is None or not total_mb:
+        return None
+    return round(used_mb * 100.0 / total_mb, 4)
+
+
+class FlowUsageRollup(db.Model):
+    """按小时/天的流量用量汇总"""
+    __tablename__ = 'flow_usage_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    unicom_account_id = db.Column(db.Integer, db.ForeignKey('unicom_accounts.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False, comment='汇总粒度: hour/day')
+    bucket_start = db.Column(db.DateTime, nullable=False, comment='桶起始时间')
+
+    query_count = db.Column(db.Integer, nullable=False, default=0, comment='记录数')
+    first_at = db.Column(db.DateTime, comment='桶内第一条记录时间')
+    last_at = db.Column(db.DateTime, comment='桶内最后一条记录时间')
+    first_used_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='桶内第一条已用(MB)')
+    last_used_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='桶内最后一条已用(MB)')
+    min_used_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='最小已用(MB)')
+    max_used_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='最大已用(MB)')
+    delta_mb = db.Column(db.Numeric(14, 2, asdecimal=False), nullable=False, default=0,
+                         comment='桶内各记录流量变化量之和(MB)')
+    last_total_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='桶内最后一条总流量(MB)')
+    last_remain_mb = db.Column(db.Numeric(14, 2, asdecimal=False), comment='桶内最后一条剩余(MB)')
+
+    # 使用率（%），平均值 = usage_sum / usage_samples
+    usage_sum = db.Column(db.Float, nullable=False, default=0)
+    usage_samples = db.Column(db.Integer, nullable=False, default=0)
+    min_usage = db.Column(db.Float)
+    max_usage = db.Column(db.Float)
+
+    __table_args__ = (
+        db.UniqueConstraint('unicom_account_id', 'period', 'bucket_start', name='uq_rollup_account_period_bucket'),
+    )
+
+    @staticmethod
+    def values_for(record, period):
+        """单条记录对应的汇总行初始值"""
+        usage = _usage_pct(record.used_mb, record.total_mb)
+        created_at = _naive_utc(record.created_at)
+        return {
+            'unicom_account_id': record.unicom_account_id,
+            'period': period,
+            'bucket_start': bucket_start(record.created_at, period),
+            'query_count': 1,
+            'first_at': created_at,
+            'last_at': created_at,
+            'first_used_mb': record.used_mb,
+            'last_used_mb': record.used_mb,
+            'min_used_mb': record.used_mb,
+            'max_used_mb': record.used_mb,
+            'delta_mb': record.data_change_mb or 0,
+            'last_total_mb': record.total_mb,
+            'last_remain_mb': record.remain_mb,
+            'usage_sum': usage or 0,
+            'usage_samples': 1 if usage is not None else 0,
+            'min_usage': usage,
+            'max_usage': usage,
+        }
+
+    @staticmethod
+    def _upsert_statement(dialect_name, rows):
+        """构造 upsert 语句（MySQL: ON DUPLICATE KEY UPDATE；SQLite/PostgreSQL: ON CONFLICT），其他数据库抛出 NotImplementedError"""
+        table = FlowUsageRollup.__table__
+        if dialect_name == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table).values(rows)
+            new = stmt.inserted
+        elif dialect_name in ('sqlite', 'postgresql'):
+            if dialect_name == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(rows)
+            new = stmt.excluded
+        else:
+            raise NotImplementedError(f"流量汇总 upsert 不支持数据库类型: {dialect_name}（支持 mysql/sqlite/postgresql）")
+
+        old = table.c
+
+        def pick_min(col):
+            return case((new[col].is_(None), old[col]), (old[col].is_(None), new[col]),
+                        (new[col] < old[col], new[col]), else_=old[col])
+
+        def pick_max(col):
+            return case((new[col].is_(None), old[col]), (old[col].is_(None), new[col]),
+                        (new[col] > old[col], new[col]), else_=old[col])
+
+        is_first = new.first_at < old.first_at
+        is_last = new.last_at >= old.last_at
+        # MySQL 按顺序求值 SET，first_at/last_at 必须最后更新
+        updates = [
+            ('query_count', old.query_count + new.query_count),
+            ('first_used_mb', case((is_first, new.first_used_mb), else_=old.first_used_mb)),
+            ('last_used_mb', case((is_last, new.last_used_mb), else_=old.last_used_mb)),
+            ('last_total_mb', case((is_last, new.last_total_mb), else_=old.last_total_mb)),
+            ('last_remain_mb', case((is_last, new.last_remain_mb), else_=old.last_remain_mb)),
+            ('min_used_mb', pick_min('min_used_mb')),
+            ('max_used_mb', pick_max('max_used_mb')),
+            ('delta_mb', old.delta_mb + new.delta_mb),
+            ('usage_sum', old.usage_sum + new.usage_sum),
+            ('usage_samples', old.usage_samples + new.usage_samples),
+            ('min_usage', pick_min('min_usage')),
+            ('max_usage', pick_max('max_usage')),
+            ('first_at', case((is_first, new.first_at), else_=old.first_at)),
+            ('last_at', case((is_last, new.last_at), else_=old.last_at)),
+        ]
+        if dialect_name == 'mysql':
+            return stmt.on_duplicate_key_update(updates)
+        return stmt.on_conflict_do_update(
+            index_elements=['unicom_account_id', 'period', 'bucket_start'],
+            set_=dict(updates)
+        )
+
+    @staticmethod
+    def accumulate(buckets, record):
+        """把一条记录合并进内存中的 {(账号, 粒度, 桶): 汇总值}"""
+        if record.used_mb is None or record.created_at is None:
+            return
+        for period in PERIODS:
+            values = FlowUsageRollup.values_for(record, period)
+            key = (values['unicom_account_id'], period, values['bucket_start'])
+            current = buckets.get(key)
+            buckets[key] = values if current is None else _merge(current, values)
+
+    @staticmethod
+    def apply_records(connection, records, batch_size=500):
+        """把一批流量记录先在内存中按桶合并，再批量累加到汇总（在插入记录的同一事务内执行）"""
+        buckets = {}
+        for record in records:
+            FlowUsageRollup.accumulate(buckets, record)
+        rows = list(buckets.values())
+        for i in range(0, len(rows), batch_size):
+            connection.execute(FlowUsageRollup._upsert_statement(connection.dialect.name, rows[i:i + batch_size]))
+
+    @staticmethod
+    def apply_record(connection, record):
+        """把一条流量记录累加到小时/天汇总"""
+        FlowUsageRollup.apply_records(connection, [record])
+
+    @staticmethod
+    def rebuild(account_id=None, since=None, batch_size=2000):
+        """根据 flow_records 重建汇总
+
+        Args:
+            account_id: 只重建指定账号，None 为全部
+            since: 只重建该时间所在天及之后的桶，None 为全部
+
+        Returns:
+            int: 处理的记录数
+        """
+        if since is not None:
+            since = bucket_start(since, PERIOD_DAY)
+
+        delete_query = FlowUsageRollup.query
+        if account_id is not None:
+            delete_query = delete_query.filter(FlowUsageRollup.unicom_account_id == account_id)
+        if since is not None:
+            delete_query = delete_query.filter(FlowUsageRollup.bucket_start >= since)
+        delete_query.delete(synchronize_session=False)
+
+        columns = (FlowRecord.id, FlowRecord.unicom_account_id, FlowRecord.created_at, FlowRecord.used_mb,
+                   FlowRecord.total_mb, FlowRecord.remain_mb, FlowRecord.data_change_mb)
+        buckets = {}
+        last_id = 0
+        processed = 0
+        dialect_name = db.session.get_bind().dialect.name
+        while True:
+            query = db.session.query(*columns).filter(
+                FlowRecord.id > last_id, FlowRecord.used_mb.isnot(None)
+            )
+            if account_id is not None:
+                query = query.filter(FlowRecord.unicom_account_id == account_id)
+            if since is not None:
+                query = query.filter(FlowRecord.created_at >= since)
+            chunk = query.order_by(FlowRecord.id).limit(batch_size).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            processed += len(chunk)
+            for record in chunk:
+                FlowUsageRollup.accumulate(buckets, record)
+
+        rows = list(buckets.values())
+        for i in range(0, len(rows), 500):
+            db.session.execute(FlowUsageRollup._upsert_statement(dialect_name, rows[i:i + 500]))
+        db.session.commit()
+        return processed
+
+    def to_dict(self):
+        """转换为字典"""
+        from ..utils.timezone_helper import from_db_time
+        return {
+            'bucket_start': from_db_time(self.bucket_start).isoformat() if self.bucket_start else None,
+            'period': self.period,
+            'query_count': self.query_count,
+            'first_used_mb': self.first_used_mb,
+            'last_used_mb': self.last_used_mb,
+            'min_used_mb': self.min_used_mb,
+            'max_used_mb': self.max_used_mb,
+            'delta_mb': self.delta_mb,
+            'total_mb': self.last_total_mb,
+            'remain_mb': self.last_remain_mb,
+            'avg_usage_percentage': round(self.usage_sum / self.usage_samples, 2) if self.usage_samples else None,
+        }
+
+    def __repr__(self):
+        return f'<FlowUsageRollup {self.unicom_account_id} {self.period} {self.bucket_start}>'
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def _merge(current, new):
+    """合并同一桶内的两组汇总值（重建与批量写入时在内存中使用）"""
+    merged = dict(current)
+    merged['query_count'] += new['query_count']
+    merged['delta_mb'] = round(merged['delta_mb'] + new['delta_mb'], 2)
+    merged['usage_sum'] += new['usage_sum']
+    merged['usage_samples'] += new['usage_samples']
+    for key in ('min_used_mb', 'min_usage'):
+        merged[key] = _min(merged[key], new[key])
+    for key in ('max_used_mb', 'max_usage'):
+        merged[key] = _max(merged[key], new[key])
+    if new['first_at'] < merged['first_at']:
+        merged['first_at'], merged['first_used_mb'] = new['first_at'], new['first_used_mb']
+    if new['last_at'] >= merged['last_at']:
+        merged['last_at'] = new['last_at']
+        for key in ('last_used_mb', 'last_total_mb', 'last_remain_mb'):
+            merged[key] = new[key]
+    return merged
+
+
+@event.listens_for(FlowRecord, 'after_insert')
+def _apply_rollup_after_insert(mapper, connection, target):
+    """插入流量记录后增量更新汇总"""
+    FlowUsageRollup.apply_record(connection, target)
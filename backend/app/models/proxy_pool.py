@@ -7,6 +7,11 @@ from datetime import datetime
 from . import db
 from ..utils.timezone_helper import get_db_time
 
+# 状态判定：请求数达到 FAILED_MIN_REQUESTS 且成功率低于 FAILED_RATE 标记失效，成功率不低于 RECOVERED_RATE 恢复可用
+FAILED_RATE = 0.3
+FAILED_MIN_REQUESTS = 10
+RECOVERED_RATE = 0.7
+
 class ProxyPool(db.Model):
     """代理池模型"""
     __tablename__ = 'proxy_pools'
@@ -72,36 +77,14 @@ class ProxyPool(db.Model):
         }
     
     def update_stats(self, success=True, response_time=None, error_msg=None):
-        """更新统计信息"""
-        self.total_requests += 1
-        self.last_check_at = get_db_time()
-
-        if success:
-            self.success_requests += 1
-            self.last_success_at = get_db_time()
-            self.last_error = None
-            if response_time is not None:
-                self.response_time = response_time
-        else:
-            self.last_error = error_msg
-            
-        # 计算成功率
-        if self.total_requests > 0:
-            self.success_rate = self.success_requests / self.total_requests
-            
-        # 根据成功率调整状态
-        if self.success_rate < 0.3 and self.total_requests >= 10:
-            self.status = -1  # 标记为失效
-        elif self.success_rate >= 0.7:
-            self.status = 1   # 标记为可用
-            
-        db.session.commit()
+        """记录一次请求结果（进入统计缓冲，成功率与状态在批量刷写时计算）"""
+        from ..services.proxy_stats import proxy_stats
+        proxy_stats.record_result(self.id, success=success, response_time=response_time, error_msg=error_msg)
     
     def mark_used(self):
-        """标记为已使用"""
-        self.usage_count += 1
-        self.last_used_at = get_db_time()
-        db.session.commit()
+        """标记为已使用（进入统计缓冲，批量刷写）"""
+        from ..services.proxy_stats import proxy_stats
+        proxy_stats.record_use(self.id)
     
     def is_available(self):
         """检查是否可用"""
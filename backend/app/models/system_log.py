@@ -58,9 +58,11 @@ class SystemLog(db.Model):
                    ip_address=None, user_agent=None, request_method=None, 
                    request_url=None, request_params=None, response_time=None,
                    extra_data=None, level='INFO', module=None):
-        """记录操作日志"""
+        """记录操作日志（放入异步写入队列，不提交调用方的会话），返回是否已接收"""
+        from ..services.audit_writer import audit_writer
+
         try:
-            log = SystemLog(
+            return audit_writer.submit(
                 user_id=user_id,
                 unicom_account_id=unicom_account_id,
                 action=action,
@@ -78,13 +80,9 @@ class SystemLog(db.Model):
                 extra_data=extra_data,
                 level=level
             )
-            db.session.add(log)
-            db.session.commit()
-            return log
         except Exception as e:
-            db.session.rollback()
             print(f"记录日志失败: {e}")
-            return None
+            return False
     
     @staticmethod
     def log_login(user_id, success=True, ip_address=None, user_agent=None, error_msg=None):
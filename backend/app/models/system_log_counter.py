@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+系统日志计数模型
+配置为 aggregate 策略的高频例行操作（如 flow_query）按 (用户, 操作, 结果, 分钟) 聚合为计数行，
+由 audit_writer 在内存中合并后批量 upsert，代替逐条写入 system_logs
+"""
+from datetime import timezone
+
+from sqlalchemy import case
+
+from . import db
+
+
+def minute_start(dt):
+    """时间所在分钟的起点（不带时区的UTC时间，与数据库存储一致）"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.replace(second=0, microsecond=0)
+
+
+class SystemLogCounter(db.Model):
+    """按分钟聚合的操作计数"""
+    __tablename__ = 'system_log_counters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, default=0, comment='用户ID(0为匿名)')
+    action = db.Column(db.String(50), nullable=False, comment='操作类型')
+    result = db.Column(db.SmallInteger, nullable=False, default=1, comment='操作结果: 1-成功, 0-失败')
+    bucket_start = db.Column(db.DateTime, nullable=False, comment='分钟起始时间')
+
+    count = db.Column(db.Integer, nullable=False, default=0, comment='次数')
+    response_time_sum = db.Column(db.Float, nullable=False, default=0, comment='响应时间合计(秒)')
+    response_time_count = db.Column(db.Integer, nullable=False, default=0, comment='带响应时间的次数')
+    response_time_max = db.Column(db.Float, comment='最大响应时间(秒)')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'action', 'result', 'bucket_start', name='uq_log_counter_bucket'),
+        db.Index('idx_log_counter_action_time', 'action', 'bucket_start'),
+    )
+
+    @staticmethod
+    def accumulate(counters, row):
+        """把一条日志行合并进内存中的 {(用户, 操作, 结果, 分钟): 计数值}"""
+        key = (row.get('user_id') or 0, row['action'], row.get('result', 1), minute_start(row['created_at']))
+        response_time = row.get('response_time')
+        current = counters.get(key)
+        if current is None:
+            counters[key] = {
+                'user_id': key[0],
+                'action': key[1],
+                'result': key[2],
+                'bucket_start': key[3],
+                'count': 1,
+                'response_time_sum': response_time or 0,
+                'response_time_count': 1 if response_time is not None else 0,
+                'response_time_max': response_time,
+            }
+            return
+        current['count'] += 1
+        if response_time is not None:
+            current['response_time_sum'] += response_time
+            current['response_time_count'] += 1
+            if current['response_time_max'] is None or response_time > current['response_time_max']:
+                current['response_time_max'] = response_time
+
+    @staticmethod
+    def merge(counters, values):
+        """把另一份计数值合并回内存（写入失败时保留，下次重试）"""
+        key = (values['user_id'], values['action'], values['result'], values['bucket_start'])
+        current = counters.get(key)
+        if current is None:
+            counters[key] = values
+            return
+        current['count'] += values['count']
+        current['response_time_sum'] += values['response_time_sum']
+        current['response_time_count'] += values['response_time_count']
+        if values['response_time_max'] is not None and (
+                current['response_time_max'] is None or values['response_time_max'] > current['response_time_max']):
+            current['response_time_max'] = values['response_time_max']
+
+    @staticmethod
+    def _upsert_statement(dialect_name, rows):
+        """构造 upsert 语句（MySQL: ON DUPLICATE KEY UPDATE；SQLite/PostgreSQL: ON CONFLICT）"""
+        table = SystemLogCounter.__table__
+        if dialect_name == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table).values(rows)
+            new = stmt.inserted
+        elif dialect_name in ('sqlite', 'postgresql'):
+            if dialect_name == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(rows)
+            new = stmt.excluded
+        else:
+            raise NotImplementedError(f"系统日志计数 upsert 不支持数据库类型: {dialect_name}（支持 mysql/sqlite/postgresql）")
+
+        old = table.c
+        updates = [
+            ('count', old.count + new.count),
+            ('response_time_sum', old.response_time_sum + new.response_time_sum),
+            ('response_time_count', old.response_time_count + new.response_time_count),
+            ('response_time_max', case(
+                (new.response_time_max.is_(None), old.response_time_max),
+                (old.response_time_max.is_(None), new.response_time_max),
+                (new.response_time_max > old.response_time_max, new.response_time_max),
+                else_=old.response_time_max)),
+        ]
+        if dialect_name == 'mysql':
+            return stmt.on_duplicate_key_update(updates)
+        return stmt.on_conflict_do_update(
+            index_elements=['user_id', 'action', 'result', 'bucket_start'],
+            set_=dict(updates)
+        )
+
+    @staticmethod
+    def apply(connection, rows, batch_size=500):
+        """把合并后的计数值批量累加到计数表"""
+        for i in range(0, len(rows), batch_size):
+            connection.execute(SystemLogCounter._upsert_statement(connection.dialect.name, rows[i:i + batch_size]))
+
+    def to_dict(self):
+        """转换为字典"""
+        from ..utils.timezone_helper import from_db_time
+        return {
+            'user_id': self.user_id or None,
+            'action': self.action,
+            'result': self.result,
+            'bucket_start': from_db_time(self.bucket_start).isoformat() if self.bucket_start else None,
+            'count': self.count,
+            'avg_response_time': (round(self.response_time_sum / self.response_time_count, 4)
+                                  if self.response_time_count else None),
+            'response_time_max': self.response_time_max,
+        }
+
+    def __repr__(self):
+        return f'<SystemLogCounter {self.action} {self.result} {self.bucket_start} x{self.count}>'
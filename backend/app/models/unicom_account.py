@@ -5,9 +5,14 @@
 """
 from datetime import datetime, timedelta
 import json
+from sqlalchemy import and_, func
+from sqlalchemy.orm import joinedload, selectinload
 from . import db
 from ..utils.timezone_helper import get_db_time, from_db_time
 
+# to_dict 未传入最新记录时按需查询
+_NOT_LOADED = object()
+
 class UnicomAccount(db.Model):
     """联通账号模型"""
     __tablename__ = 'unicom_accounts'
@@ -86,6 +91,52 @@ class UnicomAccount(db.Model):
         from .flow_record import FlowRecord
         latest_record = self.flow_records.filter_by(query_status=1).order_by(FlowRecord.created_at.desc()).first()
         return latest_record.to_dict() if latest_record else None
+
+    @staticmethod
+    def eager_options():
+        """列表序列化用到的关联（设备指纹及其代理、监控配置）的预加载选项"""
+        from .device_fingerprint import DeviceFingerprint
+        return (
+            selectinload(UnicomAccount.device_fingerprint).joinedload(DeviceFingerprint.proxy),
+            selectinload(UnicomAccount.monitor_config),
+        )
+
+    @staticmethod
+    def latest_flow_records(account_ids):
+        """批量获取各账号最新一条成功记录（分组取最大时间，一次查询），返回 {账号ID: FlowRecord}"""
+        from .flow_record import FlowRecord
+        if not account_ids:
+            return {}
+        latest = db.session.query(
+            FlowRecord.unicom_account_id,
+            func.max(FlowRecord.created_at).label('created_at')
+        ).filter(
+            FlowRecord.unicom_account_id.in_(list(account_ids)),
+            FlowRecord.query_status == 1
+        ).group_by(FlowRecord.unicom_account_id).subquery()
+        records = FlowRecord.query.join(latest, and_(
+            FlowRecord.unicom_account_id == latest.c.unicom_account_id,
+            FlowRecord.created_at == latest.c.created_at
+        )).filter(FlowRecord.query_status == 1).all()
+
+        result = {}
+        for record in records:
+            # 同一时间多条时取id最大的
+            current = result.get(record.unicom_account_id)
+            if current is None or record.id > current.id:
+                result[record.unicom_account_id] = record
+        return result
+
+    @classmethod
+    def to_dict_many(cls, accounts, include_sensitive=False):
+        """批量序列化：最新记录与原始响应各一次查询（关联对象请用 eager_options() 预加载）"""
+        from .flow_payload import FlowPayload
+        latest = cls.latest_flow_records([account.id for account in accounts])
+        payloads = FlowPayload.load_many([record.payload_hash for record in latest.values()])
+        for record in latest.values():
+            if record.payload_hash in payloads:
+                record._raw_data = payloads[record.payload_hash]
+        return [account.to_dict(include_sensitive, latest_record=latest.get(account.id)) for account in accounts]
     
     def get_cookies_dict(self):
         """获取Cookie字典"""
@@ -112,8 +163,12 @@ class UnicomAccount(db.Model):
         else:
             self.cookies = str(cookie_dict)
     
-    def to_dict(self, include_sensitive=False):
-        """转换为字典"""
+    def to_dict(self, include_sensitive=False, latest_record=_NOT_LOADED):
+        """转换为字典（latest_record 为批量预取的最新记录，未传入时单独查询）"""
+        if latest_record is _NOT_LOADED:
+            latest_flow = self.get_latest_flow_data()
+        else:
+            latest_flow = latest_record.to_dict() if latest_record else None
         data = {
             'id': self.id,
             'phone': self.phone,
@@ -130,7 +185,7 @@ class UnicomAccount(db.Model):
             'status': self.status,
             'created_at': from_db_time(self.created_at).isoformat() if self.created_at else None,
             'device_info': self.device_fingerprint.to_dict() if self.device_fingerprint else None,
-            'latest_flow': self.get_latest_flow_data(),
+            'latest_flow': latest_flow,
             'monitor_config': self.monitor_config.to_dict() if self.monitor_config else None
         }
 
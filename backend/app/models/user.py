@@ -5,6 +5,7 @@
 """
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import case, func, select
 from . import db
 from ..utils.timezone_helper import get_db_time, from_db_time
 
@@ -44,13 +45,60 @@ class User(db.Model):
         """获取联通账号数量"""
         return self.unicom_accounts.filter_by(status=1).count()
     
+    @staticmethod
+    def account_stats(user_ids):
+        """批量统计用户的有效联通账号数、开启监控账号数与最近查询时间（一次分组查询）
+
+        Returns:
+            dict: {用户ID: {'unicom_account_count', 'monitored_account_count', 'last_query_at'}}，
+            没有有效账号的用户不在结果中
+        """
+        from .unicom_account import UnicomAccount
+        from .flow_record import FlowRecord
+        if not user_ids:
+            return {}
+        user_ids = list(user_ids)
+        # 先按账号取最近记录时间（走 账号+时间 索引），再按用户汇总
+        last_query = select(
+            FlowRecord.unicom_account_id,
+            func.max(FlowRecord.created_at).label('last_at')
+        ).where(
+            FlowRecord.unicom_account_id.in_(
+                select(UnicomAccount.id).where(UnicomAccount.user_id.in_(user_ids))
+            )
+        ).group_by(FlowRecord.unicom_account_id).subquery()
+
+        rows = db.session.execute(
+            select(
+                UnicomAccount.user_id,
+                func.count(UnicomAccount.id),
+                func.sum(case((UnicomAccount.monitor_enabled.is_(True), 1), else_=0)),
+                func.max(last_query.c.last_at)
+            ).outerjoin(
+                last_query, last_query.c.unicom_account_id == UnicomAccount.id
+            ).where(
+                UnicomAccount.user_id.in_(user_ids),
+                UnicomAccount.status == 1
+            ).group_by(UnicomAccount.user_id)
+        ).all()
+        return {
+            user_id: {
+                'unicom_account_count': count,
+                'monitored_account_count': int(monitored or 0),
+                'last_query_at': last_at
+            }
+            for user_id, count, monitored, last_at in rows
+        }
+
     def can_add_unicom_account(self):
         """是否可以添加联通账号"""
         from ..core.config import Config
         return self.get_unicom_account_count() < Config.MAX_UNICOM_ACCOUNTS_PER_USER
     
-    def to_dict(self, include_sensitive=False):
-        """转换为字典"""
+    def to_dict(self, include_sensitive=False, account_count=None):
+        """转换为字典（account_count 为批量统计的账号数，未传入时单独查询）"""
+        if account_count is None:
+            account_count = self.get_unicom_account_count()
         data = {
             'id': self.id,
             'username': self.username,
@@ -58,7 +106,7 @@ class User(db.Model):
             'nickname': self.nickname,
             'avatar_url': self.avatar_url,
             'status': self.status,
-            'unicom_account_count': self.get_unicom_account_count(),
+            'unicom_account_count': account_count,
             'created_at': from_db_time(self.created_at).isoformat() if self.created_at else None,
             'last_login_at': from_db_time(self.last_login_at).isoformat() if self.last_login_at else None
         }
@@ -3,6 +3,9 @@
 """
 用户设置模型：存储用户级全局设置（含缓存配置）
 """
+import hashlib
+import json
+import uuid
 from datetime import datetime
 from . import db
 from sqlalchemy.dialects.mysql import JSON as MySQLJSON
@@ -46,6 +49,15 @@ DEFAULT_SETTINGS = {
     }
 }
 
+# 设置缓存版本：DEFAULT_SETTINGS 变化后旧的合并结果自动失效
+SETTINGS_CACHE_VERSION = hashlib.md5(
+    json.dumps(DEFAULT_SETTINGS, sort_keys=True).encode('utf-8')
+).hexdigest()[:8]
+SETTINGS_CACHE_TTL = 3600  # 共享缓存兜底过期时间(秒)，保存设置时主动失效
+# 每个用户的设置版本号（保存设置时更换），缓存键带版本号：
+# 读取方在保存前取到的旧数据只会写到旧版本的键上，不会覆盖新版本
+SETTINGS_VERSION_KEY = 'user_settings_version:{user_id}'
+
 class UserSettings(db.Model):
     __tablename__ = 'user_settings'
 
@@ -78,3 +90,48 @@ class UserSettings(db.Model):
             db.session.commit()
         return obj
 
+    @staticmethod
+    def get_cache_key(user_id: int):
+        """当前版本的缓存键（尚无版本号时生成一个，相当于缓存为空）"""
+        from ..utils.cache_manager import cache_manager
+
+        version_key = SETTINGS_VERSION_KEY.format(user_id=user_id)
+        version = cache_manager.get(version_key)
+        if not version:
+            version = uuid.uuid4().hex[:12]
+            cache_manager.set(version_key, version)
+        return f"user_settings:{SETTINGS_CACHE_VERSION}:{user_id}:{version}"
+
+    @staticmethod
+    def get_settings_dict(user_id: int):
+        """获取已合并默认值的用户设置（只读）
+
+        同一请求/监控轮次内只解析一次（flask.g），跨进程通过缓存共享，
+        缓存未命中时才查库并合并默认值。
+        """
+        from flask import g, has_app_context
+        from ..utils.cache_manager import cache_manager
+
+        memo = g.setdefault('_user_settings', {}) if has_app_context() else None
+        if memo is not None and user_id in memo:
+            return memo[user_id]
+
+        cache_key = UserSettings.get_cache_key(user_id)
+        settings = cache_manager.get(cache_key)
+        if not isinstance(settings, dict):
+            settings = UserSettings.get_or_create(user_id).to_dict()
+            cache_manager.set(cache_key, settings, expire=SETTINGS_CACHE_TTL)
+
+        if memo is not None:
+            memo[user_id] = settings
+        return settings
+
+    @staticmethod
+    def invalidate_cache(user_id: int):
+        """设置变更后更换版本号，旧版本的缓存不再被读取（到期自动清除）"""
+        from flask import g, has_app_context
+        from ..utils.cache_manager import cache_manager
+
+        if has_app_context():
+            g.setdefault('_user_settings', {}).pop(user_id, None)
+        return cache_manager.set(SETTINGS_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex[:12])
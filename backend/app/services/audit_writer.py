@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+系统日志异步批量写入
+SystemLog.log_action 只把日志行放入进程内有界队列，由后台线程按条数或时间阈值
+用一条 executemany INSERT 批量写入（独立连接，不提交调用方的会话）。
+队列写满时按 SYSTEM_LOG_OVERFLOW 处理：
+- drop_oldest：丢弃最早的一条，保留最新日志（默认）
+- drop_new：丢弃新日志
+- block：最多等待 SYSTEM_LOG_BLOCK_TIMEOUT 秒，仍无空间则丢弃新日志
+丢弃条数在下次刷写时汇总记录到应用日志；进程退出前写出剩余队列。
+刷写线程在本进程首次提交时启动，fork 出的子进程（如 gunicorn --preload 的 worker）各自启动。
+批量写入失败时：连接类错误整批放回队首下次重试；数据类错误逐条重试，仍失败的行
+最多重试 SYSTEM_LOG_MAX_RETRIES 次，之后写入应用日志并保留在 dead_letters 中，不再阻塞后续日志。
+
+按操作配置记录策略（SYSTEM_LOG_POLICIES，默认为空即全部逐条记录，
+可按需开启如 "flow_query=aggregate,monitor_check=sample:0.1"）：
+- full：逐条记录（未配置的操作默认）
+- sample:<比例>：按比例抽样记录，extra_data 中带 sample_rate 便于按比例还原
+- aggregate：只在内存中按 (用户, 操作, 结果, 分钟) 计数，刷写时 upsert 到 system_log_counters
+失败、WARN/ERROR 级别与 admin 模块的日志始终逐条记录。
+"""
+import atexit
+import os
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+from flask import current_app
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from ..models import db
+from ..models.system_log import SystemLog
+from ..models.system_log_counter import SystemLogCounter
+from ..utils.timezone_helper import get_db_time
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_new', 'block')
+
+POLICY_FULL = 'full'
+POLICY_SAMPLE = 'sample'
+POLICY_AGGREGATE = 'aggregate'
+ALWAYS_FULL_LEVELS = ('WARN', 'WARNING', 'ERROR')
+ALWAYS_FULL_MODULES = ('admin',)
+DEAD_LETTER_SIZE = 100
+_ATTEMPTS = '_attempts'
+
+
+def is_transient(error) -> bool:
+    """连接中断、数据库不可用等与具体数据行无关的错误"""
+    return isinstance(error, (OperationalError, InterfaceError)) or (
+        isinstance(error, DBAPIError) and error.connection_invalidated)
+
+
+def parse_policies(spec) -> Dict[str, Tuple[str, float]]:
+    """解析 "action=policy,..." 为 {操作: (策略, 抽样比例)}，无法识别的项忽略"""
+    if isinstance(spec, dict):
+        spec = ','.join(f'{action}={policy}' for action, policy in spec.items())
+    policies = {}
+    for item in (spec or '').split(','):
+        action, _, policy = item.partition('=')
+        action, policy = action.strip(), policy.strip().lower()
+        if not action:
+            continue
+        if policy == POLICY_AGGREGATE:
+            policies[action] = (POLICY_AGGREGATE, 0.0)
+        elif policy.startswith(POLICY_SAMPLE + ':'):
+            try:
+                rate = float(policy.split(':', 1)[1])
+            except ValueError:
+                continue
+            policies[action] = (POLICY_SAMPLE, min(max(rate, 0.0), 1.0))
+        elif policy == POLICY_FULL:
+            policies[action] = (POLICY_FULL, 1.0)
+    return policies
+
+
+class AuditLogWriter:
+    """SystemLog 异步批量写入队列"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.queue_size = 10000
+        self.batch_size = 200
+        self.flush_interval = 1.0
+        self.overflow = 'drop_oldest'
+        self.block_timeout = 0.05
+        self.max_retries = 3
+        self.dead_letters = deque(maxlen=DEAD_LETTER_SIZE)
+        self._registered = False
+        self._reset_state()
+        self.policies: Dict[str, Tuple[str, float]] = {}
+        self._defaults = {
+            c.key: c.default.arg if c.default is not None and c.default.is_scalar else None
+            for c in SystemLog.__table__.columns if c.key != 'id'
+        }
+
+    def _reset_state(self):
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._dropped = 0
+        self._counters: Dict[tuple, Dict[str, Any]] = {}
+
+    def _after_fork(self):
+        """fork 出的子进程不继承父进程的队列与线程"""
+        self._reset_state()
+
+    def init_app(self, app):
+        """读取配置（刷写线程在首次提交时启动）"""
+        self.app = app
+        self.enabled = bool(app.config.get('SYSTEM_LOG_ASYNC', True))
+        self.queue_size = max(1, int(app.config.get('SYSTEM_LOG_QUEUE_SIZE', 10000)))
+        self.batch_size = max(1, int(app.config.get('SYSTEM_LOG_BATCH_SIZE', 200)))
+        self.flush_interval = float(app.config.get('SYSTEM_LOG_FLUSH_INTERVAL', 1.0))
+        self.block_timeout = float(app.config.get('SYSTEM_LOG_BLOCK_TIMEOUT', 0.05))
+        self.max_retries = max(1, int(app.config.get('SYSTEM_LOG_MAX_RETRIES', 3)))
+        overflow = app.config.get('SYSTEM_LOG_OVERFLOW', 'drop_oldest')
+        if overflow not in OVERFLOW_POLICIES:
+            app.logger.warning(f"未知的系统日志溢出策略 {overflow}，使用 drop_oldest")
+            overflow = 'drop_oldest'
+        self.overflow = overflow
+        self.policies = parse_policies(app.config.get('SYSTEM_LOG_POLICIES', ''))
+
+        if self.enabled and not self._registered:
+            self._registered = True
+            os.register_at_fork(after_in_child=self._after_fork)
+            atexit.register(self.close)
+
+    def _ensure_started(self):
+        """本进程首次提交时启动刷写线程"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._flush_loop, name='audit-writer', daemon=True)
+                thread.start()
+                self._thread = thread
+
+    # ---------------------- 写入 ----------------------
+
+    def _row(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """补齐列默认值，created_at 取提交时刻"""
+        row = dict(self._defaults)
+        row.update((key, value) for key, value in values.items() if value is not None)
+        if row['created_at'] is None:
+            row['created_at'] = get_db_time().replace(tzinfo=None)
+        return row
+
+    def policy_for(self, row: Dict[str, Any]) -> Tuple[str, float]:
+        """日志行适用的记录策略（失败、告警级别与管理操作始终逐条记录）"""
+        policy = self.policies.get(row['action'])
+        if (policy is None or row['result'] == 0 or row['level'] in ALWAYS_FULL_LEVELS
+                or row['module'] in ALWAYS_FULL_MODULES):
+            return POLICY_FULL, 1.0
+        return policy
+
+    def submit(self, **values) -> bool:
+        """提交一条日志，返回是否已接收（抽样未选中也视为已接收；未启用队列时立即写入）"""
+        row = self._row(values)
+        policy, rate = self.policy_for(row)
+        if policy == POLICY_AGGREGATE:
+            return self._count(row)
+        if policy == POLICY_SAMPLE:
+            if random.random() >= rate:
+                return True
+            row['extra_data'] = dict(row['extra_data'] or {}, sample_rate=rate)
+
+        if not self.enabled:
+            self._write_rows([row])
+            return True
+
+        self._ensure_started()
+        with self._not_full:
+            if len(self._queue) >= self.queue_size:
+                if self.overflow == 'drop_oldest':
+                    self._queue.popleft()
+                    self._dropped += 1
+                elif self.overflow == 'block':
+                    self._wakeup.set()
+                    self._not_full.wait_for(lambda: len(self._queue) < self.queue_size, self.block_timeout)
+                if len(self._queue) >= self.queue_size:
+                    self._dropped += 1
+                    return False
+            self._queue.append(row)
+            full = len(self._queue) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return True
+
+    def _count(self, row: Dict[str, Any]) -> bool:
+        """聚合策略：只累加内存计数"""
+        if not self.enabled:
+            counters = {}
+            SystemLogCounter.accumulate(counters, row)
+            self._write_counters(list(counters.values()))
+            return True
+        self._ensure_started()
+        with self._lock:
+            SystemLogCounter.accumulate(self._counters, row)
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue) + len(self._counters)
+
+    # ---------------------- 刷写 ----------------------
+
+    def _write_rows(self, rows: List[Dict[str, Any]]):
+        """独立连接中批量插入，不影响调用方会话中的事务"""
+        rows = [row if _ATTEMPTS not in row else {k: v for k, v in row.items() if k != _ATTEMPTS} for row in rows]
+        with db.engine.begin() as connection:
+            connection.execute(SystemLog.__table__.insert(), rows)
+
+    def _dead_letter(self, row: Dict[str, Any], error):
+        """放弃写入的日志行记录到应用日志"""
+        row = {k: v for k, v in row.items() if k != _ATTEMPTS}
+        self.dead_letters.append(row)
+        current_app.logger.error(
+            f"系统日志写入多次失败已放弃: action={row.get('action')} user_id={row.get('user_id')} "
+            f"created_at={row.get('created_at')} - {error}"
+        )
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """放回队首（队列空间不足的部分计入丢弃）"""
+        with self._not_full:
+            room = max(0, self.queue_size - len(self._queue))
+            self._dropped += max(0, len(rows) - room)
+            self._queue.extendleft(reversed(rows[:room]))
+
+    def _write_each(self, batch: List[Dict[str, Any]]) -> int:
+        """整批写入失败后逐条写入，返回写入条数；失败行计数重试，超过上限的放弃"""
+        written = 0
+        retry = []
+        for row in batch:
+            try:
+                self._write_rows([row])
+                written += 1
+            except Exception as e:
+                if is_transient(e):
+                    retry.append(row)
+                    continue
+                attempts = row.get(_ATTEMPTS, 0) + 1
+                if attempts >= self.max_retries:
+                    self._dead_letter(row, e)
+                else:
+                    row[_ATTEMPTS] = attempts
+                    retry.append(row)
+        self._requeue(retry)
+        return written
+
+    def _write_counters(self, rows: List[Dict[str, Any]]):
+        with db.engine.begin() as connection:
+            SystemLogCounter.apply(connection, rows)
+
+    def _flush_counters(self):
+        """写出内存计数（连接类错误合并回内存下次重试，数据类错误逐条写入并放弃失败的计数）"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+        if not counters:
+            return
+        try:
+            self._write_counters(list(counters.values()))
+            return
+        except Exception as e:
+            current_app.logger.error(f"写入系统日志计数失败: {e}")
+            if is_transient(e):
+                retry = list(counters.values())
+            else:
+                retry = []
+                for values in counters.values():
+                    try:
+                        self._write_counters([values])
+                    except Exception as row_error:
+                        if is_transient(row_error):
+                            retry.append(values)
+                        else:
+                            current_app.logger.error(
+                                f"系统日志计数写入失败已放弃: action={values['action']} "
+                                f"count={values['count']} - {row_error}"
+                            )
+        with self._lock:
+            for values in retry:
+                SystemLogCounter.merge(self._counters, values)
+
+    def flush(self) -> int:
+        """写出当前队列与计数，返回写入的日志条数（失败处理见模块说明）"""
+        written = 0
+        with self._flush_lock:
+            self._flush_counters()
+            while True:
+                with self._not_full:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    dropped, self._dropped = self._dropped, 0
+                    self._not_full.notify_all()
+                if dropped:
+                    current_app.logger.warning(f"系统日志队列已满，丢弃 {dropped} 条")
+                if not batch:
+                    return written
+                try:
+                    self._write_rows(batch)
+                except Exception as e:
+                    current_app.logger.error(f"批量写入系统日志失败: {e}")
+                    if is_transient(e):
+                        self._requeue(batch)
+                    else:
+                        written += self._write_each(batch)
+                    # 失败的行已放回队首，留到下一轮再试
+                    return written
+                written += len(batch)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self.pending():
+                continue
+            with self.app.app_context():
+                self.flush()
+
+    def close(self):
+        """进程退出前写出剩余队列"""
+        if not self.enabled or self.app is None:
+            return
+        with self.app.app_context():
+            self.flush()
+
+
+audit_writer = AuditLogWriter()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流量记录历史数据回填
+- 数值字段：扫描 used_mb 为空的记录，从字符串字段/原始响应解析出数值
+- 原始响应：把 raw_response 迁入 flow_payloads（压缩去重），记录只保留哈希
+- 均按主键分块（keyset）顺序处理，每块以流式游标读取后批量更新并提交
+- 通过 start_id 断点续跑；每块完成后返回/打印最后处理的 id
+"""
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+
+from ..models import db
+from ..models.flow_payload import FlowPayload
+from ..models.flow_record import FlowRecord, NUMERIC_FIELDS
+
+_TEXT_COLUMNS = [getattr(FlowRecord, name) for name in NUMERIC_FIELDS]
+
+
+def backfill_numeric_fields(batch_size: int = 1000, start_id: int = 0,
+                            max_batches: Optional[int] = None,
+                            progress: Optional[Callable[[int, int, int], None]] = None) -> dict:
+    """回填 FlowRecord 数值字段
+
+    Args:
+        batch_size: 每块行数
+        start_id: 从该 id 之后开始（断点续跑）
+        max_batches: 最多处理的块数，None 为不限
+        progress: 每块完成后回调 progress(last_id, scanned, updated)
+
+    Returns:
+        dict: {'last_id', 'scanned', 'updated', 'finished'}
+    """
+    last_id = start_id
+    scanned = updated = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        stmt = (
+            select(FlowRecord.id, FlowRecord.payload_hash, FlowRecord.raw_response, *_TEXT_COLUMNS)
+            .where(FlowRecord.id > last_id, FlowRecord.used_mb.is_(None))
+            .order_by(FlowRecord.id)
+            .limit(batch_size)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        chunk = db.session.execute(stmt).all()
+        payloads = FlowPayload.load_many([row.payload_hash for row in chunk])
+        params = []
+        rows = 0
+        for row in chunk:
+            rows += 1
+            last_id = row.id
+            values = FlowRecord.compute_numeric_values(
+                {text: getattr(row, text) for text in NUMERIC_FIELDS},
+                payloads.get(row.payload_hash) or row.raw_response
+            )
+            if any(v is not None for v in values.values()):
+                values['id'] = row.id
+                params.append(values)
+
+        if not rows:
+            db.session.commit()
+            return {'last_id': last_id, 'scanned': scanned, 'updated': updated, 'finished': True}
+
+        if params:
+            db.session.execute(update(FlowRecord), params)
+        db.session.commit()
+
+        scanned += rows
+        updated += len(params)
+        batches += 1
+        if progress:
+            progress(last_id, scanned, updated)
+
+    return {'last_id': last_id, 'scanned': scanned, 'updated': updated, 'finished': False}
+
+
+def migrate_raw_payloads(batch_size: int = 500, start_id: int = 0,
+                         max_batches: Optional[int] = None,
+                         progress: Optional[Callable[[int, int, int], None]] = None) -> dict:
+    """把 raw_response 迁入 flow_payloads，并清空原字段
+
+    Returns:
+        dict: {'last_id', 'scanned', 'updated', 'finished'}
+    """
+    last_id = start_id
+    scanned = updated = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        stmt = (
+            select(FlowRecord.id, FlowRecord.raw_response)
+            .where(FlowRecord.id > last_id, FlowRecord.raw_response.isnot(None))
+            .order_by(FlowRecord.id)
+            .limit(batch_size)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        chunk = db.session.execute(stmt).all()
+        if not chunk:
+            db.session.commit()
+            return {'last_id': last_id, 'scanned': scanned, 'updated': updated, 'finished': True}
+
+        params = []
+        for row in chunk:
+            last_id = row.id
+            try:
+                digest = FlowPayload.store(row.raw_response) if row.raw_response.strip() else None
+            except (ValueError, TypeError):
+                continue  # 非JSON内容保留原样
+            params.append({'id': row.id, 'payload_hash': digest, 'raw_response': None})
+
+        if params:
+            db.session.execute(update(FlowRecord), params)
+        db.session.commit()
+
+        scanned += len(chunk)
+        updated += len(params)
+        batches += 1
+        if progress:
+            progress(last_id, scanned, updated)
+
+    return {'last_id': last_id, 'scanned': scanned, 'updated': updated, 'finished': False}
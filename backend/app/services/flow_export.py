@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流量历史导出
+通过服务端游标（stream_results + yield_per）分批读取 flow_records，
+逐批编码为 CSV 文本或 Parquet 行组后立即输出，内存占用与导出总量无关。
+Parquet 需要可选依赖 pyarrow。
+"""
+import csv
+import io
+from datetime import timedelta
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from ..models import db
+from ..models.flow_record import FlowRecord
+from ..models.unicom_account import UnicomAccount
+from ..utils.timezone_helper import tz
+
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+FORMATS = (FORMAT_CSV, FORMAT_PARQUET)
+
+MIMETYPES = {
+    FORMAT_CSV: 'text/csv; charset=utf-8',
+    FORMAT_PARQUET: 'application/vnd.apache.parquet',
+}
+
+# (导出列名, 查询列, Parquet 类型名)
+EXPORT_COLUMNS = [
+    ('id', FlowRecord.id, 'int64'),
+    ('account_id', FlowRecord.unicom_account_id, 'int64'),
+    ('phone', UnicomAccount.phone, 'string'),
+    ('created_at', FlowRecord.created_at, 'timestamp'),
+    ('query_type', FlowRecord.query_type, 'string'),
+    ('query_source', FlowRecord.query_source, 'string'),
+    ('query_status', FlowRecord.query_status, 'int8'),
+    ('is_cached', FlowRecord.is_cached, 'bool'),
+    ('query_time', FlowRecord.query_time, 'float64'),
+    ('package_name', FlowRecord.package_name, 'string'),
+    ('end_date', FlowRecord.end_date, 'string'),
+    ('total_mb', FlowRecord.total_mb, 'float64'),
+    ('used_mb', FlowRecord.used_mb, 'float64'),
+    ('remain_mb', FlowRecord.remain_mb, 'float64'),
+    ('free_mb', FlowRecord.free_mb, 'float64'),
+    ('used_general_mb', FlowRecord.used_general_mb, 'float64'),
+    ('used_special_mb', FlowRecord.used_special_mb, 'float64'),
+    ('used_other_mb', FlowRecord.used_other_mb, 'float64'),
+    ('remain_general_mb', FlowRecord.remain_general_mb, 'float64'),
+    ('remain_special_mb', FlowRecord.remain_special_mb, 'float64'),
+    ('remain_other_mb', FlowRecord.remain_other_mb, 'float64'),
+    ('data_change_mb', FlowRecord.data_change_mb, 'float64'),
+    ('error_message', FlowRecord.error_message, 'string'),
+    ('payload_hash', FlowRecord.payload_hash, 'string'),
+]
+COLUMN_NAMES = [name for name, _, _ in EXPORT_COLUMNS]
+
+
+class ExportUnavailable(RuntimeError):
+    """导出格式所需依赖未安装"""
+
+
+def parse_range(start: Optional[str], end: Optional[str]):
+    """解析本地时间范围为数据库UTC时间 [start, end)；仅日期的结束时间包含当天
+
+    Raises:
+        ValueError: 时间格式无法解析
+    """
+    bounds = []
+    for value, is_end in ((start, False), (end, True)):
+        if not value:
+            bounds.append(None)
+            continue
+        parsed = tz.to_utc(value)
+        if parsed is None:
+            raise ValueError(f"无效的时间: {value}")
+        if is_end and len(value.strip()) == 10:
+            parsed += timedelta(days=1)
+        bounds.append(parsed.replace(tzinfo=None))
+    return bounds[0], bounds[1]
+
+
+def export_statement(account_ids: List[int], start=None, end=None):
+    """导出查询（按账号、时间、id 排序，使用 idx_account_time_id 索引）"""
+    stmt = select(*[column for _, column, _ in EXPORT_COLUMNS]).join(
+        UnicomAccount, UnicomAccount.id == FlowRecord.unicom_account_id
+    ).where(FlowRecord.unicom_account_id.in_(account_ids))
+    if start is not None:
+        stmt = stmt.where(FlowRecord.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(FlowRecord.created_at < end)
+    return stmt.order_by(FlowRecord.unicom_account_id, FlowRecord.created_at, FlowRecord.id)
+
+
+def iter_batches(account_ids: List[int], start=None, end=None, batch_size: int = 5000) -> Iterator[list]:
+    """服务端游标分批读取，每批为行元组列表（时间已转换为本地时间）"""
+    if not account_ids:
+        return
+    result = db.session.execute(
+        export_statement(account_ids, start, end).execution_options(stream_results=True, yield_per=batch_size)
+    )
+    try:
+        created_index = COLUMN_NAMES.index('created_at')
+        for partition in result.partitions():
+            batch = []
+            for row in partition:
+                row = list(row)
+                row[created_index] = tz.to_local(row[created_index]) if row[created_index] else None
+                batch.append(row)
+            yield batch
+    finally:
+        result.close()
+
+
+def iter_csv(batches: Iterable[list]) -> Iterator[bytes]:
+    """编码为 CSV（UTF-8 BOM，便于 Excel 直接打开），每批输出一次"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(COLUMN_NAMES)
+    for batch in batches:
+        for row in batch:
+            writer.writerow(['' if value is None else value.isoformat() if hasattr(value, 'isoformat') else value
+                             for value in row])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """只写的类文件对象，写入的字节由生成器取走"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    types = {
+        'int64': pa.int64(), 'int8': pa.int8(), 'bool': pa.bool_(), 'float64': pa.float64(),
+        'string': pa.string(), 'timestamp': pa.timestamp('us', tz=tz.get_timezone().zone),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in EXPORT_COLUMNS])
+
+
+def iter_parquet(batches: Iterable[list]) -> Iterator[bytes]:
+    """编码为 Parquet（带类型的列），每批写一个行组并输出已产生的字节"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable('Parquet 导出需要安装 pyarrow')
+
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for batch in batches:
+            columns = list(zip(*batch)) if batch else [() for _ in COLUMN_NAMES]
+            arrays = []
+            for values, (_, _, kind), field in zip(columns, EXPORT_COLUMNS, schema):
+                if kind == 'float64':
+                    values = [None if v is None else float(v) for v in values]
+                arrays.append(pa.array(list(values), type=field.type))
+            table = pa.Table.from_arrays(arrays, schema=schema)
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def check_format(fmt: str):
+    """校验导出格式及其依赖
+
+    Raises:
+        ValueError: 不支持的格式
+        ExportUnavailable: 依赖未安装
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if fmt == FORMAT_PARQUET:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportUnavailable('Parquet 导出需要安装 pyarrow')
+
+
+def iter_export(fmt: str, account_ids: List[int], start=None, end=None, batch_size: int = 5000) -> Iterator[bytes]:
+    """按格式流式输出导出内容"""
+    batches = iter_batches(account_ids, start, end, batch_size)
+    if fmt == FORMAT_PARQUET:
+        return iter_parquet(batches)
+    return iter_csv(batches)
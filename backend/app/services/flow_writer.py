@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流量记录写缓冲（write-behind）
+监控任务产生的 FlowRecord 先进入进程内缓冲，达到条数或时间阈值后批量写入：
+- 一条 executemany INSERT 写入整批记录，原始响应按哈希去重后一次写入
+- 小时/天汇总在内存中按桶合并后一次 upsert，耗尽预测按账号合并后一次更新
+  （批量插入不触发 ORM 事件，由这里代为维护）
+- 每条记录入缓冲前追加到本进程的日志文件（instance/flow_journal/journal-<pid>.jsonl），
+  刷写成功后截断；进程异常退出后，下次启动时回放遗留日志（按账号+时间去重）
+- last_record() 优先返回缓冲中尚未落库的最新读数，保证相邻两次监控的变化量计算连续
+- 批量写入失败时：连接类错误保留缓冲下次重试；数据类错误逐条重试，仍失败的记录最多重试
+  FLOW_WRITE_MAX_RETRIES 次，之后移出缓冲与日志，追加到 dead-letter.jsonl 并写入应用日志；
+  缓冲超过 FLOW_WRITE_MAX_BUFFER 条（数据库长时间不可用）时最早的记录同样转入 dead-letter.jsonl
+- 刷写线程与日志文件在本进程首次写入时创建，fork 出的子进程（如 gunicorn --preload 的 worker）
+  丢弃继承的缓冲并各自启动
+"""
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+
+from ..models import db
+from ..models.flow_payload import FlowPayload
+from ..models.flow_record import FlowRecord, NUMERIC_FIELDS
+from ..models.flow_rollup import FlowUsageRollup
+from ..models.flow_forecast import FlowForecast
+from ..utils.flow_parser import FlowSnapshot
+from ..utils.timezone_helper import get_db_time
+from .audit_writer import is_transient
+
+_PAYLOAD_KEY = '_payload'
+_ATTEMPTS = '_attempts'
+DEAD_LETTER_FILE = 'dead-letter.jsonl'
+# journal-<pid>.jsonl，回放中为 journal-<pid>.jsonl.replay-<回放进程pid>
+_JOURNAL_NAME = re.compile(r'^journal-(\d+)\.jsonl(?:\.replay-(\d+))?$')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _dumps(row: Dict[str, Any]) -> str:
+    return json.dumps(row, ensure_ascii=False, default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o))
+
+
+def _loads(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    if row.get('created_at'):
+        row['created_at'] = datetime.fromisoformat(row['created_at'])
+    return row
+
+
+class FlowRecordWriter:
+    """FlowRecord 批量写缓冲"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 500
+        self.flush_interval = 2.0
+        self.fsync = False
+        self.max_retries = 3
+        self.max_buffer = 100000
+        self.journal_dir = None
+        self._registered = False
+        self._reset_state()
+        self._columns = [c.key for c in FlowRecord.__table__.columns if c.key != 'id']
+
+    def _reset_state(self):
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._journal = None
+        self._journal_path = None
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _after_fork(self):
+        """fork 出的子进程不继承父进程的缓冲、日志文件与线程（父进程仍负责写出自己的缓冲）"""
+        self._reset_state()
+
+    def init_app(self, app):
+        """读取配置并回放遗留日志（刷写线程在首次写入时启动）"""
+        self.app = app
+        self.enabled = bool(app.config.get('FLOW_WRITE_BEHIND', True))
+        self.batch_size = max(1, int(app.config.get('FLOW_WRITE_BATCH_SIZE', 500)))
+        self.flush_interval = float(app.config.get('FLOW_WRITE_FLUSH_INTERVAL', 2.0))
+        self.fsync = bool(app.config.get('FLOW_WRITE_FSYNC', False))
+        self.max_retries = max(1, int(app.config.get('FLOW_WRITE_MAX_RETRIES', 3)))
+        self.max_buffer = max(self.batch_size, int(app.config.get('FLOW_WRITE_MAX_BUFFER', 100000)))
+        self.journal_dir = app.config.get('FLOW_WRITE_JOURNAL_DIR') or os.path.join(app.instance_path, 'flow_journal')
+        os.makedirs(self.journal_dir, exist_ok=True)
+
+        with app.app_context():
+            try:
+                replayed = self.replay_journals()
+                if replayed:
+                    app.logger.info(f"✅ 已回放未落库的流量记录 {replayed} 条")
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"回放流量记录日志失败: {e}")
+            finally:
+                db.session.remove()
+
+        if self.enabled and not self._registered:
+            self._registered = True
+            os.register_at_fork(after_in_child=self._after_fork)
+            atexit.register(self.close)
+
+    def _ensure_started(self):
+        """本进程首次写入时打开日志文件并启动刷写线程"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._journal_path = os.path.join(self.journal_dir, f'journal-{os.getpid()}.jsonl')
+            self._journal = open(self._journal_path, 'a', encoding='utf-8')
+            thread = threading.Thread(target=self._flush_loop, name='flow-writer', daemon=True)
+            thread.start()
+            self._thread = thread
+
+    # ---------------------- 写入 ----------------------
+
+    def _record_row(self, record: FlowRecord, raw_data) -> Dict[str, Any]:
+        """把未保存的 FlowRecord 转为插入行（补齐列默认值与数值字段）"""
+        row = {}
+        for column in FlowRecord.__table__.columns:
+            if column.key == 'id':
+                continue
+            value = getattr(record, column.key)
+            if value is None and column.default is not None and column.default.is_scalar:
+                value = column.default.arg
+            row[column.key] = value
+        if row['created_at'] is None:
+            row['created_at'] = get_db_time().replace(tzinfo=None)
+
+        text_values = {text: row[text] for text in NUMERIC_FIELDS}
+        for numeric, value in FlowRecord.compute_numeric_values(text_values, raw_data).items():
+            if row.get(numeric) is None:
+                row[numeric] = value
+
+        raw = raw_data.raw if isinstance(raw_data, FlowSnapshot) else raw_data
+        if raw:
+            row['payload_hash'], row[_PAYLOAD_KEY] = FlowPayload.digest(raw)
+        return row
+
+    def add(self, record: FlowRecord, raw_data=None):
+        """提交一条流量记录（未启用写缓冲时立即写入）
+
+        Args:
+            record: 未保存的 FlowRecord（不要调用 set_raw_data）
+            raw_data: 联通原始响应或已解析的 FlowSnapshot
+        """
+        if not self.enabled:
+            record.set_raw_data(raw_data)
+            db.session.add(record)
+            db.session.commit()
+            return
+
+        row = self._record_row(record, raw_data)
+        self._ensure_started()
+        with self._lock:
+            self._journal.write(_dumps(row) + '\n')
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def last_record(self, account_id: int, query_status: Optional[int] = None):
+        """账号最近一条记录：优先取缓冲中尚未落库的读数（id 为 None），否则查询数据库"""
+        with self._lock:
+            for row in reversed(self._buffer):
+                if row['unicom_account_id'] == account_id and query_status in (None, row['query_status']):
+                    values = {k: v for k, v in row.items() if k != _PAYLOAD_KEY}
+                    return SimpleNamespace(id=None, **values)
+        query = FlowRecord.query.filter_by(unicom_account_id=account_id)
+        if query_status is not None:
+            query = query.filter_by(query_status=query_status)
+        return query.order_by(FlowRecord.created_at.desc()).first()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    # ---------------------- 刷写 ----------------------
+
+    def _write_rows(self, rows: List[Dict[str, Any]]):
+        """在一个事务中批量写入记录、原始响应与汇总"""
+        payloads = {row['payload_hash']: row[_PAYLOAD_KEY] for row in rows if row.get(_PAYLOAD_KEY)}
+        records = [{k: row.get(k) for k in self._columns} for row in rows]
+        FlowPayload.store_many(payloads)
+        db.session.execute(FlowRecord.__table__.insert(), records)
+        connection = db.session.connection()
+        namespaces = [SimpleNamespace(**r) for r in records]
+        FlowUsageRollup.apply_records(connection, namespaces)
+        FlowForecast.apply_records(connection, namespaces)
+        db.session.commit()
+
+    def _dead_letter(self, rows: List[Dict[str, Any]], reason):
+        """放弃写入的记录追加到 dead-letter.jsonl（可修正后手工导入）并写入应用日志"""
+        path = os.path.join(self.journal_dir, DEAD_LETTER_FILE)
+        with open(path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(_dumps({k: v for k, v in row.items() if k != _ATTEMPTS}) + '\n')
+        current_app.logger.error(f"流量记录 {len(rows)} 条未能写入，已转存 {path}: {reason}")
+
+    def _write_each(self, rows: List[Dict[str, Any]], max_retries: int):
+        """整批写入失败后逐条写入，返回 (写入条数, 可移出缓冲的记录)；失败记录计数重试，达到上限的放弃"""
+        written = 0
+        done = []
+        for row in rows:
+            try:
+                self._write_rows([row])
+            except Exception as e:
+                db.session.rollback()
+                if is_transient(e):
+                    break
+                row[_ATTEMPTS] = row.get(_ATTEMPTS, 0) + 1
+                if row[_ATTEMPTS] >= max_retries:
+                    self._dead_letter([row], f"账号 {row['unicom_account_id']} {row['created_at']} - {e}")
+                    done.append(row)
+                continue
+            written += 1
+            done.append(row)
+        return written, done
+
+    def _discard(self, rows: List[Dict[str, Any]]):
+        """已写入或已放弃的记录移出缓冲与日志"""
+        if not rows:
+            return
+        ids = {id(row) for row in rows}
+        with self._lock:
+            self._buffer = [row for row in self._buffer if id(row) not in ids]
+            self._rewrite_journal()
+
+    def _spill_overflow(self):
+        """缓冲超过上限时把最早的记录转存 dead-letter（批量转存，摊薄日志重写）"""
+        with self._lock:
+            excess = len(self._buffer) - self.max_buffer
+            if excess <= 0:
+                return
+            spilled = self._buffer[:excess + self.batch_size]
+        self._dead_letter(spilled, f"写缓冲超过 {self.max_buffer} 条")
+        self._discard(spilled)
+
+    def flush(self) -> int:
+        """把当前缓冲写入数据库，返回写入条数（失败处理见模块说明）"""
+        if not self.enabled:
+            return 0
+        written = 0
+        with self._flush_lock:
+            self._spill_overflow()
+            with self._lock:
+                batch = list(self._buffer)
+            for i in range(0, len(batch), self.batch_size):
+                chunk = batch[i:i + self.batch_size]
+                try:
+                    self._write_rows(chunk)
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f"批量写入流量记录失败: {e}")
+                    if is_transient(e):
+                        break
+                    count, done = self._write_each(chunk, self.max_retries)
+                    written += count
+                    self._discard(done)
+                    continue
+                written += len(chunk)
+                self._discard(chunk)
+        return written
+
+    def _rewrite_journal(self):
+        """日志只保留仍在缓冲中的记录（调用方持有 _lock）"""
+        self._journal.close()
+        tmp_path = self._journal_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row in self._buffer:
+                f.write(_dumps(row) + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self._journal_path)
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self.pending():
+                continue
+            with self.app.app_context():
+                try:
+                    self.flush()
+                finally:
+                    db.session.remove()
+
+    def close(self):
+        """进程退出前写出剩余缓冲"""
+        if not self.enabled or self.app is None:
+            return
+        with self.app.app_context():
+            try:
+                self.flush()
+            finally:
+                db.session.remove()
+
+    # ---------------------- 回放 ----------------------
+
+    def replay_journals(self) -> int:
+        """回放已退出进程遗留的日志（同一账号同一时间的记录已存在则跳过）"""
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, 'journal-*'))):
+            match = _JOURNAL_NAME.match(os.path.basename(path))
+            if not match:
+                continue
+            owner = int(match.group(2) or match.group(1))
+            if owner != os.getpid() and _pid_alive(owner):
+                continue
+            # 先改名认领，避免多个进程同时回放
+            claimed = os.path.join(self.journal_dir, f'journal-{match.group(1)}.jsonl.replay-{os.getpid()}')
+            try:
+                if path != claimed:
+                    os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, encoding='utf-8') as f:
+                rows = [_loads(line) for line in f if line.strip()]
+            rows = [row for row in rows if not FlowRecord.query.filter_by(
+                unicom_account_id=row['unicom_account_id'], created_at=row['created_at']
+            ).first()]
+            for i in range(0, len(rows), self.batch_size):
+                chunk = rows[i:i + self.batch_size]
+                try:
+                    self._write_rows(chunk)
+                except Exception as e:
+                    db.session.rollback()
+                    if is_transient(e):
+                        raise
+                    # 回放不再重试：逐条写入，失败的直接转存
+                    _, done = self._write_each(chunk, max_retries=1)
+                    if len(done) < len(chunk):
+                        raise RuntimeError('数据库连接中断，保留日志留待下次回放')
+            os.remove(claimed)
+            replayed += len(rows)
+        return replayed
+
+
+flow_writer = FlowRecordWriter()
@@ -23,133 +23,18 @@ from ..models.user import User
 from ..models.user_settings import UserSettings
 from ..models.unicom_account import UnicomAccount
 from ..models.flow_record import FlowRecord
+from ..models.flow_forecast import FlowForecast
 from ..utils.cache_manager import cache_manager
+from ..utils.flow_parser import parse_flow_response, parse_mb
 from ..utils.unicom_api import unicom_api
-from ..utils.timezone_helper import now, format_local
+from ..utils.timezone_helper import now, format_local, from_db_time
+from .flow_writer import flow_writer
 from .notification_service import NotificationService
 
 _scheduler: Optional[BackgroundScheduler] = None
 
 # ---------------------- 工具函数 ----------------------
 
-def _parse_mb(value) -> Optional[float]:
-    """将带单位的字符串转为 MB 浮点数（不合法返回None）"""
-    if value is None:
-        return None
-    try:
-        if isinstance(value, (int, float)):
-            return float(value)
-        s = str(value).strip().upper()
-        if not s:
-            return None
-        if s.endswith('GB'):
-            return float(s[:-2].strip()) * 1024
-        if s.endswith('MB'):
-            return float(s[:-2].strip())
-        # 纯数字默认MB
-        return float(s)
-    except Exception:
-        return None
-
-
-def _extract_flow_by_type(raw_data: Dict[str, Any]) -> Dict[str, float]:
-    """从联通原始响应中提取各类总量/剩余/已用（粗粒度）
-    返回：{
-        'total_all_mb', 'remain_all_mb', 'used_all_mb',
-        'general_total_mb', 'general_remain_mb', 'used_general_mb',
-        'special_total_mb', 'special_remain_mb', 'used_free_mb'
-    }
-    """
-    result = {
-        'total_all_mb': None,
-        'remain_all_mb': None,
-        'used_all_mb': None,
-        'general_total_mb': None,
-        'general_remain_mb': None,
-        'used_general_mb': None,
-        'special_total_mb': None,
-        'special_remain_mb': None,
-        'used_free_mb': None,
-    }
-    try:
-        data = raw_data or {}
-        result['total_all_mb'] = _parse_mb(data.get('sum'))
-        # 剩余流量：优先canUseFlowAll，备选canUseValueAll
-        result['remain_all_mb'] = _parse_mb(data.get('canUseFlowAll') or data.get('canUseValueAll'))
-        result['used_all_mb'] = _parse_mb(data.get('allUserFlow'))
-
-        # 从flowSumList中提取通用和专用流量的使用量和剩余量
-        flow_sum_list = data.get('flowSumList') or []
-        for item in flow_sum_list:
-            flow_type = str(item.get('flowtype', '')).strip()
-            used_value = _parse_mb(item.get('xusedvalue'))
-            remain_value = _parse_mb(item.get('xcanusevalue'))
-
-            if flow_type == '1':  # 通用流量
-                result['used_general_mb'] = used_value
-                result['general_remain_mb'] = remain_value
-            elif flow_type == '2':  # 专用流量
-                result['used_free_mb'] = used_value
-                result['special_remain_mb'] = remain_value
-
-        # 资源维度
-        def walk_resources(arr):
-            gt_total = 0.0
-            gt_remain = 0.0
-            sp_total = 0.0
-            sp_remain = 0.0
-            for it in arr or []:
-                # 资源明细有时在 it['details']
-                details = it.get('details') if isinstance(it, dict) else None
-                if isinstance(details, list) and details:
-                    for d in details:
-                        ftype = str(d.get('flowType') or d.get('type') or '').strip()
-                        total_mb = _parse_mb(d.get('total'))
-                        remain_mb = _parse_mb(d.get('remain'))
-                        if ftype == '1':  # 通用
-                            if total_mb: gt_total += total_mb
-                            if remain_mb is not None: gt_remain += max(0.0, remain_mb)
-                        if ftype == '2':  # 免流/专用
-                            if total_mb: sp_total += total_mb
-                            if remain_mb is not None: sp_remain += max(0.0, remain_mb)
-            return gt_total, gt_remain, sp_total, sp_remain
-
-        # 从resources提取
-        resources = data.get('resources') if isinstance(data.get('resources'), list) else []
-        gt_total1, gt_remain1, sp_total1, sp_remain1 = walk_resources(resources)
-
-        # 从unshared提取
-        unshared = data.get('unshared') if isinstance(data.get('unshared'), list) else []
-        gt_total2, gt_remain2, sp_total2, sp_remain2 = walk_resources(unshared)
-
-        # 从TwResources提取套外流量
-        tw = data.get('TwResources') if isinstance(data.get('TwResources'), list) else []
-        gt_total3, gt_remain3, sp_total3, sp_remain3 = walk_resources(tw)
-
-        # 合并总量数据
-        g_total = (gt_total1 + gt_total2 + gt_total3) or None
-        s_total = (sp_total1 + sp_total2 + sp_total3) or None
-
-        # 剩余量优先使用flowSumList的数据，备选使用resources计算
-        if result['general_remain_mb'] is None:
-            g_remain = (gt_remain1 + gt_remain2 + gt_remain3) or None
-            if g_remain is not None:
-                result['general_remain_mb'] = g_remain
-
-        if result['special_remain_mb'] is None:
-            s_remain = (sp_remain1 + sp_remain2 + sp_remain3) or None
-            if s_remain is not None:
-                result['special_remain_mb'] = s_remain
-
-        if g_total:
-            result['general_total_mb'] = g_total
-        if s_total:
-            result['special_total_mb'] = s_total
-    except Exception:
-        pass
-    return result
-
-
 def _now_ts() -> int:
     return int(time.time())
 
@@ -175,8 +60,7 @@ def _should_run_user(user_id: int, freq_seconds: int) -> bool:
 
 
 def _get_settings(user_id: int) -> Dict[str, Any]:
-    us = UserSettings.get_or_create(user_id)
-    return us.to_dict()
+    return UserSettings.get_settings_dict(user_id)
 
 
 def _format_change_mb(change_mb: float) -> str:
@@ -185,6 +69,17 @@ def _format_change_mb(change_mb: float) -> str:
     return f"{change_mb:+.2f}MB"
 
 
+def _format_depletion(forecast: Optional[FlowForecast], kind: str) -> str:
+    """告警中的耗尽预测文案，无预测返回空串"""
+    if forecast is None:
+        return ''
+    rate = getattr(forecast, f'{kind}_rate')
+    depletion_at = getattr(forecast, f'{kind}_depletion_at')
+    if not depletion_at or not rate:
+        return ''
+    return f"按近期日均 {rate * 24:.0f}MB，预计 {format_local(from_db_time(depletion_at))} 耗尽\n"
+
+
 def _calc_jump_buckets(baseline_used_mb: float, current_used_mb: float, threshold_mb: float) -> Tuple[int, float]:
     """返回跨越的桶数和新的基线值推进量"""
     if baseline_used_mb is None or current_used_mb is None or threshold_mb <= 0:
@@ -265,34 +160,32 @@ def _process_account(user: User, account: UnicomAccount, settings: Dict[str, Any
         is_cached=bool(q.get('is_cached')),
         query_time=q.get('query_time')
     )
+    # 一次解析，记录与告警共用
+    snapshot = parse_flow_response(raw)
     try:
-        # 一些常见字段（允许为空）
-        fr.total_data = str(raw.get('sum') or '')
-        fr.remain_data = str(raw.get('canUseFlowAll') or '')
-        fr.used_data = str(raw.get('allUserFlow') or '')
-        fr.package_name = str(raw.get('packageName') or '')
+        for field, value in snapshot.record_fields().items():
+            setattr(fr, field, value)
         fr.end_date = str(raw.get('endDate') or '')
-        import json
-        fr.raw_response = json.dumps(raw, ensure_ascii=False)
 
-        # 取上一条记录计算变化
-        last = account.flow_records.filter_by(query_status=1).order_by(FlowRecord.created_at.desc()).first()
+        # 取上一条记录计算变化（含写缓冲中尚未落库的读数）
+        last = flow_writer.last_record(account.id, query_status=1)
         if last:
             fr.last_used_data = last.used_data
             fr.last_free_data = last.free_data
             fr.last_total_data = last.total_data
             fr.calculate_data_change(last)
-        db.session.add(fr)
-        db.session.commit()
+        # 写入缓冲，按条数/时间阈值批量落库
+        flow_writer.add(fr, snapshot)
     except Exception as e:
         current_app.logger.warning(f"[monitor] 保存FlowRecord失败: {e}")
         db.session.rollback()
 
-    # 解析数据结构化
-    metrics = _extract_flow_by_type(raw)
+    # 结构化指标
+    metrics = snapshot.metrics()
 
     # -------- 低余量（只通知一次，按配置版本） --------
     low_cfg = alerts.get('low') or {}
+    forecast = None
     for tname in ['general', 'special']:
         tcfg = low_cfg.get(tname) or {}
         if not tcfg.get('enabled'):
@@ -325,9 +218,12 @@ def _process_account(user: User, account: UnicomAccount, settings: Dict[str, Any
         # 发通知
         title = "低余量提醒"
         current_time = now()
+        if forecast is None:
+            forecast = FlowForecast.query.filter_by(unicom_account_id=account.id).first()
         content = (
             f"账号：{account.phone}\n"
             f"通用流量剩余 {remain_mb/1024:.2f}GB/共{total_mb/1024:.2f}GB\n"
+            f"{_format_depletion(forecast, tname)}"
             f"时间：{format_local(current_time)}"
         )
         _send_notifications(settings, title, content)
@@ -348,10 +244,10 @@ def _process_account(user: User, account: UnicomAccount, settings: Dict[str, Any
         baseline_used_mb = base.get('baseline_used_mb')
         # 当前已用（优先按通用/专用解析，其次总已用）
         current_used_mb = None
-        used_all_mb = _parse_mb(metrics.get('used_all_mb')) if metrics.get('used_all_mb') is not None else None
+        used_all_mb = parse_mb(metrics.get('used_all_mb')) if metrics.get('used_all_mb') is not None else None
         # 这里由于原始返回对通用/专用已用拆分不稳定，先用总已用代替，保证“每累计NMB就发”
         # 跳点只检测通用流量变化
-        current_used_mb = _parse_mb(metrics.get('used_general_mb')) if metrics.get('used_general_mb') is not None else None
+        current_used_mb = parse_mb(metrics.get('used_general_mb')) if metrics.get('used_general_mb') is not None else None
         if current_used_mb is None:
             print(f"[跳点] 账号 {account.phone} - 无法获取通用流量数据，跳过")
             continue
@@ -456,6 +352,24 @@ def monitor_tick():
         except Exception as e:
             print(f"[监控] 监控任务异常: {e}")
             current_app.logger.error(f"[monitor] tick 异常: {e}")
+        finally:
+            # 本轮剩余的缓冲记录立即落库，不等待定时刷写
+            flow_writer.flush()
+
+
+def retention_tick():
+    """数据保留维护任务（每日执行）"""
+    app = getattr(monitor_tick, '_app', None)
+    if not app:
+        return
+    with app.app_context():
+        try:
+            from .retention import run_maintenance
+            run_maintenance()
+        except Exception as e:
+            current_app.logger.error(f"[retention] 维护任务异常: {e}")
+        finally:
+            db.session.remove()
 
 
 # ---------------------- 初始化 ----------------------
@@ -476,6 +390,13 @@ def init_monitor_scheduler(app):
     # 每30秒tick一次，由内部根据每个用户配置的 frequencySeconds 判定是否执行
     _scheduler.add_job(monitor_tick, 'interval', seconds=30, id='monitor_tick', max_instances=1, coalesce=True)
 
+    # 每天凌晨执行分区维护与过期数据清理
+    _scheduler.add_job(
+        retention_tick, 'cron',
+        hour=app.config.get('RETENTION_MAINTENANCE_HOUR', 3), minute=30,
+        id='retention_tick', max_instances=1, coalesce=True
+    )
+
     # 尝试使用Redis获取一个“实例锁”，避免多进程重复启动（简单保护）
     try:
         lock_key = 'scheduler:instance_lock'
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+代理使用统计缓冲
+代理的使用次数、请求成功/失败与响应时间先在进程内按代理累加，由后台线程定时
+（或累计条数达到阈值时）批量刷写到 proxy_pools：
+- 每个代理一条 UPDATE，计数用 col = col + n 累加，多进程同时刷写不会互相覆盖
+- 成功率与状态（失效/可用）在同一条 UPDATE 中按累加后的计数计算，管理员禁用的代理不改状态
+- 刷写失败时把增量合并回缓冲，下次重试；进程退出前写出剩余缓冲
+- 刷写线程在本进程首次记录时启动，fork 出的子进程（如 gunicorn --preload 的 worker）各自启动
+"""
+import atexit
+import os
+import threading
+from typing import Dict
+
+from flask import current_app
+from sqlalchemy import and_, case, func
+
+from ..models import db
+from ..models.proxy_pool import ProxyPool, FAILED_RATE, FAILED_MIN_REQUESTS, RECOVERED_RATE
+from ..utils.timezone_helper import get_db_time
+
+
+def _latest(current, value):
+    if value is None:
+        return current
+    return value if current is None or value > current else current
+
+
+class _ProxyDelta:
+    """单个代理待刷写的增量"""
+    __slots__ = ('usage', 'requests', 'successes', 'response_time_sum', 'response_time_count',
+                 'last_used_at', 'last_check_at', 'last_success_at', 'last_error', 'last_error_at')
+
+    def __init__(self):
+        self.usage = 0
+        self.requests = 0
+        self.successes = 0
+        self.response_time_sum = 0.0
+        self.response_time_count = 0
+        self.last_used_at = None
+        self.last_check_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.last_error_at = None
+
+    def merge(self, other: '_ProxyDelta'):
+        self.usage += other.usage
+        self.requests += other.requests
+        self.successes += other.successes
+        self.response_time_sum += other.response_time_sum
+        self.response_time_count += other.response_time_count
+        self.last_used_at = _latest(self.last_used_at, other.last_used_at)
+        self.last_check_at = _latest(self.last_check_at, other.last_check_at)
+        self.last_success_at = _latest(self.last_success_at, other.last_success_at)
+        if other.last_error_at is not None and (self.last_error_at is None or other.last_error_at > self.last_error_at):
+            self.last_error, self.last_error_at = other.last_error, other.last_error_at
+
+    def error_is_current(self) -> bool:
+        """最后一次结果是否为失败（成功后清空错误信息，与逐条更新时一致）"""
+        return self.last_error_at is not None and (
+            self.last_success_at is None or self.last_error_at > self.last_success_at)
+
+
+class ProxyStatsBuffer:
+    """代理统计批量刷写缓冲"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.flush_interval = 10.0
+        self.max_pending = 1000
+        self._registered = False
+        self._reset_state()
+
+    def _reset_state(self):
+        self._deltas: Dict[int, _ProxyDelta] = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _after_fork(self):
+        """fork 出的子进程不继承父进程的缓冲与线程"""
+        self._reset_state()
+
+    def init_app(self, app):
+        """读取配置（刷写线程在首次记录时启动）"""
+        self.app = app
+        self.enabled = bool(app.config.get('PROXY_STATS_BUFFERED', True))
+        self.flush_interval = float(app.config.get('PROXY_STATS_FLUSH_INTERVAL', 10.0))
+        self.max_pending = max(1, int(app.config.get('PROXY_STATS_MAX_PENDING', 1000)))
+
+        if self.enabled and not self._registered:
+            self._registered = True
+            os.register_at_fork(after_in_child=self._after_fork)
+            atexit.register(self.close)
+
+    def _ensure_started(self):
+        """本进程首次记录时启动刷写线程"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._flush_loop, name='proxy-stats', daemon=True)
+                thread.start()
+                self._thread = thread
+
+    # ---------------------- 记录 ----------------------
+
+    def _record(self, proxy_id: int, apply):
+        delta = _ProxyDelta()
+        apply(delta)
+        if not self.enabled:
+            self._write({proxy_id: delta})
+            return
+        self._ensure_started()
+        with self._lock:
+            current = self._deltas.get(proxy_id)
+            if current is None:
+                self._deltas[proxy_id] = delta
+            else:
+                current.merge(delta)
+            self._events += 1
+            full = self._events >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def record_use(self, proxy_id: int):
+        """记录一次使用"""
+        now = get_db_time().replace(tzinfo=None)
+
+        def apply(delta):
+            delta.usage = 1
+            delta.last_used_at = now
+        self._record(proxy_id, apply)
+
+    def record_result(self, proxy_id: int, success=True, response_time=None, error_msg=None):
+        """记录一次请求结果"""
+        now = get_db_time().replace(tzinfo=None)
+
+        def apply(delta):
+            delta.requests = 1
+            delta.last_check_at = now
+            if success:
+                delta.successes = 1
+                delta.last_success_at = now
+                if response_time is not None:
+                    delta.response_time_sum = response_time
+                    delta.response_time_count = 1
+            else:
+                delta.last_error = error_msg
+                delta.last_error_at = now
+        self._record(proxy_id, apply)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._deltas)
+
+    # ---------------------- 刷写 ----------------------
+
+    def _update_statement(self, proxy_id: int, delta: _ProxyDelta):
+        """单个代理的累加 UPDATE（成功率与状态由累加后的计数算出）"""
+        c = ProxyPool.__table__.c
+        total = func.coalesce(c.total_requests, 0) + delta.requests
+        successes = func.coalesce(c.success_requests, 0) + delta.successes
+        rate = successes * 1.0 / total
+
+        # MySQL 按顺序求值 SET 且使用已更新的值，依赖旧计数的列必须先于计数列更新
+        values = []
+        if delta.requests:
+            values += [
+                # 只在可用(1)与失效(-1)之间切换，管理员禁用(0)的代理保持禁用
+                (c.status, case((c.status == 0, c.status),
+                                (and_(total >= FAILED_MIN_REQUESTS, rate < FAILED_RATE), -1),
+                                (rate >= RECOVERED_RATE, 1),
+                                else_=c.status)),
+                (c.success_rate, rate),
+                (c.total_requests, total),
+                (c.success_requests, successes),
+                (c.last_check_at, delta.last_check_at),
+            ]
+        if delta.last_success_at is not None:
+            values.append((c.last_success_at, delta.last_success_at))
+        if delta.response_time_count:
+            values.append((c.response_time, delta.response_time_sum / delta.response_time_count))
+        if delta.error_is_current():
+            values.append((c.last_error, delta.last_error))
+        elif delta.last_success_at is not None:
+            values.append((c.last_error, None))
+        if delta.usage:
+            values += [
+                (c.usage_count, func.coalesce(c.usage_count, 0) + delta.usage),
+                (c.last_used_at, delta.last_used_at),
+            ]
+        values.append((c.updated_at, get_db_time().replace(tzinfo=None)))
+        return ProxyPool.__table__.update().where(c.id == proxy_id).ordered_values(*values)
+
+    def _write(self, deltas: Dict[int, _ProxyDelta]):
+        """独立连接中一个事务写入全部代理的增量"""
+        with db.engine.begin() as connection:
+            for proxy_id, delta in sorted(deltas.items()):
+                connection.execute(self._update_statement(proxy_id, delta))
+
+    def flush(self) -> int:
+        """把当前缓冲写入数据库，返回更新的代理数（失败时合并回缓冲，下次重试）"""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._deltas = self._deltas, {}
+                self._events = 0
+            if not deltas:
+                return 0
+            try:
+                self._write(deltas)
+            except Exception as e:
+                current_app.logger.error(f"写入代理统计失败: {e}")
+                with self._lock:
+                    for proxy_id, delta in deltas.items():
+                        current = self._deltas.get(proxy_id)
+                        if current is None:
+                            self._deltas[proxy_id] = delta
+                        else:
+                            delta.merge(current)
+                            self._deltas[proxy_id] = delta
+                return 0
+            return len(deltas)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self.pending():
+                continue
+            with self.app.app_context():
+                self.flush()
+
+    def close(self):
+        """进程退出前写出剩余缓冲"""
+        if not self.enabled or self.app is None:
+            return
+        with self.app.app_context():
+            self.flush()
+
+
+proxy_stats = ProxyStatsBuffer()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史数据分区与保留策略
+- MySQL：flow_records / system_logs 按月 RANGE COLUMNS(created_at) 分区，
+  维护任务预建未来月份分区、按保留天数整块 DROP PARTITION（仅元数据操作）
+- 未分区的表（SQLite 或尚未转换的 MySQL 表）：按主键分块 DELETE 过期数据
+- 过期记录清理后顺带清理不再被引用的 flow_payloads、过期的小时汇总与系统日志计数
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import text
+
+from ..models import db
+from ..models.flow_payload import FlowPayload
+from ..models.flow_record import FlowRecord
+from ..models.flow_rollup import FlowUsageRollup, PERIOD_HOUR
+from ..models.system_log import SystemLog
+from ..models.system_log_counter import SystemLogCounter
+from ..utils.timezone_helper import get_db_time
+
+# 表名 -> (模型, 保留天数配置项, 默认天数)，默认不清理
+RETENTION_TABLES = {
+    'flow_records': (FlowRecord, 'FLOW_RECORD_RETENTION_DAYS', 0),
+    'system_logs': (SystemLog, 'SYSTEM_LOG_RETENTION_DAYS', 0),
+}
+
+_PARTITION_NAME = re.compile(r'^p(\d{4})(\d{2})$')
+MAX_PARTITION = 'pmax'
+
+
+def _month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    month = dt.month - 1 + months
+    return datetime(dt.year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_name(month: datetime) -> str:
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def _partition_clause(month: datetime) -> str:
+    """分区 pYYYYMM 存放该月数据（上界为下月1日）"""
+    upper = _add_months(month, 1)
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN ('{upper:%Y-%m-%d}')"
+
+
+def _is_mysql() -> bool:
+    return db.engine.dialect.name == 'mysql'
+
+
+def _now_naive() -> datetime:
+    return get_db_time().replace(tzinfo=None)
+
+
+def retention_cutoff(table: str) -> Optional[datetime]:
+    """表的保留截止时间（早于该时间的数据过期），保留天数<=0 表示不清理"""
+    _, key, default = RETENTION_TABLES[table]
+    days = int(current_app.config.get(key, default) or 0)
+    if days <= 0:
+        return None
+    return _now_naive() - timedelta(days=days)
+
+
+def list_partitions(table: str) -> List[str]:
+    """MySQL 表的分区名列表（未分区返回空列表）"""
+    if not _is_mysql():
+        return []
+    rows = db.session.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {'table': table}).fetchall()
+    return [row[0] for row in rows]
+
+
+def convert_to_partitioned(table: str, dry_run: bool = False) -> List[str]:
+    """一次性把 MySQL 表转换为按月分区表
+
+    MySQL 分区表要求分区列包含在所有唯一键中且不支持外键，因此会：
+    删除该表外键、created_at 改为 NOT NULL、主键改为 (id, created_at)。
+    大表上为耗时的表重建操作，请在维护窗口执行。
+
+    Returns:
+        list: 执行（或 dry_run 时将执行）的SQL
+    """
+    if not _is_mysql():
+        raise RuntimeError('仅 MySQL 支持分区表')
+    if list_partitions(table):
+        return []
+
+    statements = []
+    foreign_keys = db.session.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+    ), {'table': table}).fetchall()
+    for (name,) in foreign_keys:
+        statements.append(f"ALTER TABLE {table} DROP FOREIGN KEY `{name}`")
+
+    statements.append(f"UPDATE {table} SET created_at = NOW() WHERE created_at IS NULL")
+    statements.append(f"ALTER TABLE {table} MODIFY created_at DATETIME NOT NULL")
+    statements.append(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)")
+
+    oldest = db.session.execute(text(f"SELECT MIN(created_at) FROM {table}")).scalar()
+    current = _month_start(_now_naive())
+    month = _month_start(oldest) if oldest else current
+    ahead = int(current_app.config.get('PARTITION_PRECREATE_MONTHS', 2))
+    clauses = []
+    while month <= _add_months(current, ahead):
+        clauses.append(_partition_clause(month))
+        month = _add_months(month, 1)
+    clauses.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    statements.append(f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS(created_at) ({', '.join(clauses)})")
+
+    if not dry_run:
+        for sql in statements:
+            db.session.execute(text(sql))
+            db.session.commit()
+    return statements
+
+
+def ensure_future_partitions(table: str, dry_run: bool = False) -> List[str]:
+    """预建当前月之后 PARTITION_PRECREATE_MONTHS 个月的分区（从 pmax 拆分）"""
+    partitions = list_partitions(table)
+    if not partitions:
+        return []
+    existing = {name for name in partitions if _PARTITION_NAME.match(name)}
+    current = _month_start(_now_naive())
+    ahead = int(current_app.config.get('PARTITION_PRECREATE_MONTHS', 2))
+
+    missing = []
+    for i in range(ahead + 1):
+        month = _add_months(current, i)
+        if _partition_name(month) not in existing:
+            missing.append(month)
+    if not missing or MAX_PARTITION not in partitions:
+        return []
+
+    # 只能在已有最大月份分区之后追加
+    latest = max(existing) if existing else None
+    missing = [m for m in missing if latest is None or _partition_name(m) > latest]
+    if not missing:
+        return []
+
+    clauses = [_partition_clause(m) for m in missing]
+    clauses.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    sql = f"ALTER TABLE {table} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(clauses)})"
+    if not dry_run:
+        db.session.execute(text(sql))
+        db.session.commit()
+    return [sql]
+
+
+def drop_expired_partitions(table: str, cutoff: datetime, dry_run: bool = False) -> List[str]:
+    """删除整月早于截止时间的分区（分区上界 <= 截止时间所在月1日）"""
+    cutoff_month = _month_start(cutoff)
+    expired = []
+    for name in list_partitions(table):
+        match = _PARTITION_NAME.match(name)
+        if not match:
+            continue
+        month = datetime(int(match.group(1)), int(match.group(2)), 1)
+        if _add_months(month, 1) <= cutoff_month:
+            expired.append(name)
+    if not expired:
+        return []
+    sql = f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}"
+    if not dry_run:
+        db.session.execute(text(sql))
+        db.session.commit()
+    return [sql]
+
+
+def delete_expired_rows(model, cutoff: datetime, batch_size: int = 5000,
+                        dry_run: bool = False) -> int:
+    """未分区表：按主键分块删除过期数据，避免长事务锁表"""
+    query = db.session.query(model.id).filter(model.created_at < cutoff)
+    if dry_run:
+        return query.count()
+    deleted = 0
+    while True:
+        ids = [row.id for row in query.order_by(model.id).limit(batch_size).all()]
+        if not ids:
+            break
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+    return deleted
+
+
+def cleanup_orphan_payloads(batch_size: int = 1000, dry_run: bool = False) -> int:
+    """清理不再被任何流量记录引用的原始响应（只处理1天前写入的，避开正在写入的记录）"""
+    orphan_query = db.session.query(FlowPayload.hash).filter(
+        FlowPayload.created_at < _now_naive() - timedelta(days=1),
+        ~db.session.query(FlowRecord.id).filter(FlowRecord.payload_hash == FlowPayload.hash).exists()
+    )
+    if dry_run:
+        return orphan_query.count()
+    deleted = 0
+    while True:
+        hashes = [row.hash for row in orphan_query.limit(batch_size).all()]
+        if not hashes:
+            break
+        FlowPayload.query.filter(FlowPayload.hash.in_(hashes)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(hashes)
+    return deleted
+
+
+def run_maintenance(dry_run: bool = False) -> Dict[str, dict]:
+    """执行一次分区维护与过期清理
+
+    Returns:
+        dict: 每张表的执行结果
+    """
+    report = {}
+    for table, (model, _, _) in RETENTION_TABLES.items():
+        item = {'partitioned': False, 'statements': [], 'deleted_rows': 0}
+        try:
+            item['partitioned'] = bool(list_partitions(table))
+            if item['partitioned']:
+                item['statements'] += ensure_future_partitions(table, dry_run)
+            cutoff = retention_cutoff(table)
+            if cutoff is not None:
+                item['cutoff'] = cutoff.isoformat()
+                if item['partitioned']:
+                    item['statements'] += drop_expired_partitions(table, cutoff, dry_run)
+                # 分区只能整月删除，截止时间所在月的过期部分仍按行删除（分区表上只扫描该月分区）
+                item['deleted_rows'] = delete_expired_rows(model, cutoff, dry_run=dry_run)
+        except Exception as e:
+            db.session.rollback()
+            item['error'] = str(e)
+            current_app.logger.error(f"数据保留维护失败 {table}: {e}")
+        report[table] = item
+
+    try:
+        cutoff = retention_cutoff('flow_records')
+        if cutoff is not None:
+            hourly = FlowUsageRollup.query.filter(
+                FlowUsageRollup.period == PERIOD_HOUR,
+                FlowUsageRollup.bucket_start < cutoff
+            )
+            report['flow_usage_rollups'] = {'deleted_rows': hourly.count() if dry_run else hourly.delete(synchronize_session=False)}
+            if not dry_run:
+                db.session.commit()
+        cutoff = retention_cutoff('system_logs')
+        if cutoff is not None:
+            counters = SystemLogCounter.query.filter(SystemLogCounter.bucket_start < cutoff)
+            report['system_log_counters'] = {'deleted_rows': counters.count() if dry_run else counters.delete(synchronize_session=False)}
+            if not dry_run:
+                db.session.commit()
+        report['flow_payloads'] = {'deleted_rows': cleanup_orphan_payloads(dry_run=dry_run)}
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"清理汇总/原始响应失败: {e}")
+
+    current_app.logger.info(f"数据保留维护完成: {report}")
+    return report
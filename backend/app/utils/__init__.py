@@ -8,10 +8,14 @@ from .device_generator import DeviceGenerator
 from .unicom_api import UnicomAPI
 from .cache_manager import CacheManager
 from .auth_manager import AuthManager
+from .rate_limiter import RateLimiter
+from .cache_stats import CacheStats
 
 __all__ = [
     'DeviceGenerator',
     'UnicomAPI', 
     'CacheManager',
-    'AuthManager'
+    'AuthManager',
+    'RateLimiter',
+    'CacheStats'
 ]
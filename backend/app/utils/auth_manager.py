@@ -6,9 +6,13 @@
 from flask import request, jsonify, current_app
 from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from functools import wraps
+import hmac
+import ipaddress
 import re
 from datetime import datetime, timedelta
 
+from .cache_manager import cache_manager
+
 class AuthManager:
     """认证管理器"""
     
@@ -249,18 +253,78 @@ class AuthManager:
             current_app.logger.error(f"令牌刷新失败: {e}")
             return {'success': False, 'message': '令牌刷新失败'}
 
+# 已认证用户的缓存（Redis 共享，内存兜底），状态变更/登出/注销时立即失效
+PRINCIPAL_CACHE_KEY = 'auth:principal:{user_id}'
+PRINCIPAL_FIELDS = ('id', 'username', 'status', 'is_admin')
+
+
+class Principal:
+    """缓存的已认证用户
+
+    id/username/status/is_admin 来自缓存；访问其他属性或方法时才加载 User（每个请求最多一次），
+    需要 ORM 对象本身时（如 db.session.delete）使用 .user
+    """
+    __slots__ = PRINCIPAL_FIELDS + ('_user',)
+
+    def __init__(self, values, user=None):
+        for field in PRINCIPAL_FIELDS:
+            object.__setattr__(self, field, values.get(field))
+        object.__setattr__(self, '_user', user)
+
+    @property
+    def user(self):
+        if self._user is None:
+            from ..models import User
+            object.__setattr__(self, '_user', User.query.get(self.id))
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.user, name, value)
+        if name in PRINCIPAL_FIELDS:
+            object.__setattr__(self, name, value)
+
+
+def load_principal(user_id):
+    """按用户ID获取已认证用户（先查缓存），用户不存在返回None"""
+    from ..models import User
+
+    cache_key = PRINCIPAL_CACHE_KEY.format(user_id=user_id)
+    values = cache_manager.get(cache_key)
+    if values:
+        return Principal(values)
+    user = User.query.get(user_id)
+    if not user:
+        return None
+    values = {
+        'id': user.id,
+        'username': user.username,
+        'status': user.status,
+        'is_admin': bool(getattr(user, 'is_admin', False)),
+    }
+    ttl = int(current_app.config.get('AUTH_PRINCIPAL_CACHE_TTL', 60))
+    if ttl > 0:
+        cache_manager.set(cache_key, values, ttl)
+    return Principal(values, user)
+
+
+def invalidate_principal(user_id):
+    """用户状态或权限变化后使缓存失效"""
+    cache_manager.delete(PRINCIPAL_CACHE_KEY.format(user_id=user_id))
+
+
 def login_required(f):
     """登录装饰器"""
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        from ..models import User
-        
         try:
             current_user_id = get_jwt_identity()
             # 确保user_id是整数类型
             user_id = int(current_user_id) if current_user_id else None
-            current_user = User.query.get(user_id) if user_id else None
+            current_user = load_principal(user_id) if user_id else None
             
             if not current_user or current_user.status != 1:
                 return jsonify({
@@ -285,8 +349,6 @@ def admin_required(f):
     @jwt_required()
     def decorated_function(*args, **kwargs):
         try:
-            from ..models.user import User
-
             # 获取当前用户ID
             current_user_id = get_jwt_identity()
             if not current_user_id:
@@ -297,11 +359,11 @@ def admin_required(f):
 
             # 查询用户信息 (确保user_id是整数类型)
             user_id = int(current_user_id)
-            user = User.query.get(user_id)
-            if not user:
+            user = load_principal(user_id)
+            if not user or user.status != 1:
                 return jsonify({
                     'success': False,
-                    'message': '用户不存在'
+                    'message': '用户不存在或已被禁用'
                 }), 401
 
             # 检查管理员权限
@@ -311,7 +373,7 @@ def admin_required(f):
                     'message': '需要管理员权限'
                 }), 403
 
-            return f(*args, **kwargs)
+            return f(user, *args, **kwargs)
 
         except Exception as e:
             current_app.logger.error(f"管理员权限检查失败: {e}")
@@ -324,3 +386,35 @@ def admin_required(f):
 
 # 创建全局实例
 auth_manager = AuthManager()
+
+def _ip_allowed(address, allowed):
+    """address 是否在逗号分隔的 IP/网段列表中（无法解析的项忽略）"""
+    try:
+        ip = ipaddress.ip_address(address or '')
+    except ValueError:
+        return False
+    for item in (allowed or '').split(','):
+        try:
+            if item.strip() and ip in ipaddress.ip_network(item.strip(), strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+def metrics_access_required(f):
+    """指标接口访问控制：携带 METRICS_TOKEN（Authorization: Bearer）或来源 IP 在 METRICS_ALLOWED_IPS 内"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config.get('METRICS_TOKEN') or ''
+        authorization = request.headers.get('Authorization', '')
+        if token and authorization.startswith('Bearer ') and hmac.compare_digest(
+                authorization[len('Bearer '):].encode('utf-8'), token.encode('utf-8')):
+            return f(*args, **kwargs)
+        if _ip_allowed(request.remote_addr, current_app.config.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1')):
+            return f(*args, **kwargs)
+        return jsonify({
+            'success': False,
+            'message': '无权访问指标接口'
+        }), 403
+
+    return decorated_function
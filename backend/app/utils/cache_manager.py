@@ -6,45 +6,267 @@
 import redis
 import json
 import pickle
+import threading
+import time
 from datetime import datetime, timedelta
 from flask import current_app
 
+from .cache_stats import CacheStats
+from .rate_limiter import RateLimiter, FIXED_WINDOW
+
+# 触发熔断计数的连接类错误（MasterNotFoundError 为 ConnectionError 子类）
+_CONNECTION_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError,
+                      redis.exceptions.ClusterDownError)
+
 class CacheManager:
     """缓存管理器"""
 
+    # 故障恢复后需要从内存回写到Redis的命名空间；内存模式下写入或删除过的其余键在Redis中删除
+    DEFAULT_FAILBACK_SYNC = ('alert_once', 'jump_base', 'monitor:last_scan', 'flow_data')
+
     def __init__(self, app=None):
-        self.redis_client = None
+        self._client = None  # 已配置的Redis客户端（熔断时仍保留，用于后台重连）
+        self._circuit_open = False
+        self._circuit_lock = threading.Lock()
+        self._failure_times = []
+        self._reconnect_thread = None
+        self._redis_mode = None
+        self._redis_status = {'opened_at': None, 'last_error': None, 'failbacks': 0, 'synced_keys': 0}
+        self._logger = None
+        self.app = None
         self.memory_cache = {}  # 内存缓存作为fallback
+        self._memory_lock = threading.Lock()  # 内存模式下的 single-flight 锁
+        self._touched_keys = set()  # 内存模式下写入或删除过的键，Redis恢复时据此同步
+        self.stats = CacheStats()  # 按命名空间的命中/延迟统计
+        self.rate_limiter = RateLimiter(self)
         if app is not None:
             self.init_app(app)
-    
+
+    @property
+    def redis_client(self):
+        """当前可用的Redis客户端；熔断期间返回None，调用方自动走内存缓存"""
+        if self._circuit_open:
+            if self._client is not None:
+                self._ensure_reconnector()
+            return None
+        return self._client
+
+    @redis_client.setter
+    def redis_client(self, client):
+        with self._circuit_lock:
+            self._client = client
+            self._circuit_open = False
+            self._failure_times = []
+
     def init_app(self, app):
         """初始化应用"""
+        self.app = app
+        self._logger = app.logger
         try:
-            redis_url = app.config.get('REDIS_URL')
-            redis_host = app.config.get('REDIS_HOST', 'localhost')
-            redis_port = app.config.get('REDIS_PORT', 6379)
-            redis_password = app.config.get('REDIS_PASSWORD')
+            self.redis_client = self._create_client(app)
+        except Exception as e:
+            app.logger.warning(f"Redis客户端创建失败: {e}")
+            self.redis_client = None
+            return
+
+        try:
+            # 测试连接
+            self._client.ping()
+            app.logger.info(f"Redis连接成功({self._redis_mode})")
+        except Exception as e:
+            app.logger.warning(f"Redis连接失败，使用内存缓存并在后台重连: {e}")
+            self._open_circuit(e)
 
+    def _create_client(self, app):
+        """根据配置创建Redis客户端（单机/Sentinel/Cluster），带连接健康检查"""
+        redis_url = app.config.get('REDIS_URL')
+        redis_password = app.config.get('REDIS_PASSWORD')
+        options = {
+            'decode_responses': False,
+            'socket_timeout': app.config.get('REDIS_SOCKET_TIMEOUT', 2),
+            'socket_connect_timeout': app.config.get('REDIS_CONNECT_TIMEOUT', 2),
+            'health_check_interval': app.config.get('REDIS_HEALTH_CHECK_INTERVAL', 30),
+            'retry_on_timeout': True,
+        }
+
+        sentinels = app.config.get('REDIS_SENTINELS')
+        if sentinels:
+            from redis.sentinel import Sentinel
+            if isinstance(sentinels, str):
+                sentinels = [item.strip() for item in sentinels.split(',') if item.strip()]
+            nodes = []
+            for item in sentinels:
+                if isinstance(item, str):
+                    host, _, port = item.rpartition(':')
+                    item = (host or item, int(port or 26379))
+                nodes.append(tuple(item))
+            sentinel_password = app.config.get('REDIS_SENTINEL_PASSWORD')
+            sentinel = Sentinel(
+                nodes,
+                sentinel_kwargs={'password': sentinel_password} if sentinel_password else None,
+                socket_timeout=options['socket_timeout']
+            )
+            self._redis_mode = 'sentinel'
+            return sentinel.master_for(
+                app.config.get('REDIS_SENTINEL_MASTER', 'mymaster'),
+                db=app.config.get('REDIS_DB', 0),
+                password=redis_password,
+                **options
+            )
+
+        if app.config.get('REDIS_CLUSTER'):
+            from redis.cluster import RedisCluster
+            options.pop('health_check_interval')
+            self._redis_mode = 'cluster'
             if redis_url:
-                self.redis_client = redis.from_url(redis_url, decode_responses=False)
-            else:
-                self.redis_client = redis.Redis(
-                    host=redis_host,
-                    port=redis_port,
-                    db=app.config.get('REDIS_DB', 0),
-                    password=redis_password,
-                    decode_responses=False
-                )
+                return RedisCluster.from_url(redis_url, **options)
+            return RedisCluster(
+                host=app.config.get('REDIS_HOST', 'localhost'),
+                port=app.config.get('REDIS_PORT', 6379),
+                password=redis_password,
+                **options
+            )
 
-            # 测试连接
-            self.redis_client.ping()
-            app.logger.info(f"Redis连接成功: {redis_host}:{redis_port}")
+        options['max_connections'] = app.config.get('REDIS_MAX_CONNECTIONS', 50)
+        self._redis_mode = 'standalone'
+        if redis_url:
+            return redis.from_url(redis_url, **options)
+        return redis.Redis(
+            host=app.config.get('REDIS_HOST', 'localhost'),
+            port=app.config.get('REDIS_PORT', 6379),
+            db=app.config.get('REDIS_DB', 0),
+            password=redis_password,
+            **options
+        )
+
+    def _config(self, key, default):
+        return self.app.config.get(key, default) if self.app is not None else default
+
+    def _log(self, level, message):
+        logger = self._logger
+        if logger is None:
+            try:
+                logger = current_app.logger
+            except RuntimeError:
+                return
+        getattr(logger, level)(message)
+
+    # 熔断与故障恢复
+    def record_redis_failure(self, error):
+        """记录一次Redis调用失败，短时间内连接类错误达到阈值则熔断到内存模式"""
+        if not isinstance(error, _CONNECTION_ERRORS):
+            return
+        threshold = self._config('REDIS_FAILURE_THRESHOLD', 3)
+        window = self._config('REDIS_FAILURE_WINDOW', 10)
+        current = time.monotonic()
+        with self._circuit_lock:
+            self._failure_times = [t for t in self._failure_times if current - t < window]
+            self._failure_times.append(current)
+            if len(self._failure_times) < threshold or self._circuit_open:
+                return
+        self._open_circuit(error)
+
+    def _open_circuit(self, error=None):
+        with self._circuit_lock:
+            if self._circuit_open or self._client is None:
+                return
+            self._circuit_open = True
+            self._failure_times = []
+            self._redis_status['opened_at'] = time.time()
+            self._redis_status['last_error'] = str(error) if error else None
+        self._log('warning', f"Redis熔断，切换到内存缓存: {error}")
+        self._ensure_reconnector()
+
+    def _ensure_reconnector(self):
+        """确保后台重连线程在运行（fork后的子进程中会重新创建）"""
+        thread = self._reconnect_thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._circuit_lock:
+            thread = self._reconnect_thread
+            if not self._circuit_open or (thread is not None and thread.is_alive()):
+                return
+            thread = threading.Thread(target=self._reconnect_loop, name='redis-reconnect', daemon=True)
+            self._reconnect_thread = thread
+        thread.start()
+
+    def _reconnect_loop(self):
+        interval = self._config('REDIS_RECONNECT_INTERVAL', 5)
+        max_interval = self._config('REDIS_RECONNECT_MAX_INTERVAL', 60)
+        delay = interval
+        while self._circuit_open and self._client is not None:
+            time.sleep(delay)
+            client = self._client
+            if client is None:
+                return
+            try:
+                client.ping()
+            except Exception as e:
+                self._redis_status['last_error'] = str(e)
+                delay = min(delay * 2, max_interval)
+                continue
+            self._failback(client)
+            return
+
+    def _failback(self, client):
+        """Redis恢复：把内存模式期间写入或删除过的键同步到Redis后切回
+
+        关键命名空间中仍有效的键覆盖写入Redis，其余键（已删除、已过期或不需回写的命名空间）
+        在Redis中删除，避免恢复后读到故障前的旧值。先同步再切回，切回时再补同步一次
+        同步期间仍写入内存的键。
+        """
+        synced, removed = self._sync_touched(client)
+        with self._circuit_lock:
+            self._circuit_open = False
+            self._failure_times = []
+            self._redis_status['opened_at'] = None
+            self._redis_status['failbacks'] += 1
+        more_synced, more_removed = self._sync_touched(client)
+        synced += more_synced
+        removed += more_removed
+        with self._memory_lock:
+            self.memory_cache.clear()
+
+        self._redis_status['synced_keys'] = synced
+        self._log('info', f"Redis已恢复，切回Redis缓存（回写 {synced} 个键，删除 {removed} 个键）")
+
+    def _sync_touched(self, client):
+        """把内存模式下改动过的键同步到Redis，返回 (回写数, 删除数)"""
+        sync_namespaces = set(self._config('REDIS_FAILBACK_SYNC', self.DEFAULT_FAILBACK_SYNC))
+        from .timezone_helper import now
+        current_time = now()
+        with self._memory_lock:
+            touched, self._touched_keys = self._touched_keys, set()
+            items = {key: self.memory_cache.get(key) for key in touched}
+
+        synced = removed = 0
+        for key, item in items.items():
+            ttl = None
+            if item is not None and item['expire_time']:
+                ttl = int((item['expire_time'] - current_time).total_seconds())
+            try:
+                if item is not None and (ttl is None or ttl > 0) and self.stats.namespace_of(key) in sync_namespaces:
+                    client.set(key, self._serialize(item['value']), ex=ttl)
+                    synced += 1
+                else:
+                    client.delete(key)
+                    removed += 1
+            except Exception as e:
+                self._log('warning', f"Redis恢复时同步缓存失败 {key}: {e}")
+        return synced, removed
+
+    def get_redis_status(self):
+        """Redis连接与熔断状态"""
+        with self._circuit_lock:
+            status = dict(self._redis_status)
+            status.update({
+                'configured': self._client is not None,
+                'mode': self._redis_mode,
+                'circuit': 'open' if self._circuit_open else 'closed',
+                'recent_failures': len(self._failure_times),
+            })
+        return status
 
-        except Exception as e:
-            app.logger.warning(f"Redis连接失败: {e}")
-            self.redis_client = None
-    
     def ping(self):
         """检查Redis连接"""
         try:
@@ -58,47 +280,79 @@ class CacheManager:
         """检查缓存是否可用"""
         return True  # 总是可用，因为有内存缓存fallback
 
+    def _set_memory(self, key, value, expire=None):
+        """写入内存缓存"""
+        expire_time = None
+        if expire:
+            from .timezone_helper import now
+            expire_time = now() + timedelta(seconds=expire)
+
+        self.memory_cache[key] = {
+            'value': value,
+            'expire_time': expire_time
+        }
+        self._touched_keys.add(key)
+        return True
+
+    def _delete_memory(self, key):
+        """删除内存缓存（记录改动，Redis恢复时同步删除）"""
+        self._touched_keys.add(key)
+        return self.memory_cache.pop(key, None) is not None
+
+    def _get_memory(self, key):
+        """读取内存缓存（过期则删除），未命中返回None"""
+        cache_item = self.memory_cache.get(key)
+        if cache_item is None:
+            return None
+
+        # 检查是否过期
+        if cache_item['expire_time']:
+            from .timezone_helper import now
+            if now() > cache_item['expire_time']:
+                self.memory_cache.pop(key, None)
+                return None
+
+        return cache_item
+
+    @staticmethod
+    def _serialize(value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return pickle.dumps(value)
+
     def set(self, key, value, expire=None):
         """设置缓存"""
+        self.stats.incr(key, 'sets')
         try:
             if self.redis_client:
                 # 使用Redis缓存
-                if isinstance(value, (dict, list)):
-                    serialized_value = json.dumps(value, ensure_ascii=False)
-                else:
-                    serialized_value = pickle.dumps(value)
+                try:
+                    serialized_value = self._serialize(value)
+                except Exception:
+                    self.stats.incr(key, 'serialization_errors')
+                    raise
 
-                if expire:
-                    return self.redis_client.setex(key, expire, serialized_value)
-                else:
-                    return self.redis_client.set(key, serialized_value)
+                started = time.perf_counter()
+                try:
+                    if expire:
+                        return self.redis_client.setex(key, expire, serialized_value)
+                    else:
+                        return self.redis_client.set(key, serialized_value)
+                finally:
+                    self.stats.observe_latency(key, time.perf_counter() - started)
             else:
                 # 使用内存缓存
-                expire_time = None
-                if expire:
-                    from .timezone_helper import now
-                    expire_time = now() + timedelta(seconds=expire)
-
-                self.memory_cache[key] = {
-                    'value': value,
-                    'expire_time': expire_time
-                }
-                return True
+                self.stats.incr(key, 'fallbacks')
+                return self._set_memory(key, value, expire)
 
         except Exception as e:
             current_app.logger.error(f"设置缓存失败: {e}")
+            self.record_redis_failure(e)
+            self.stats.incr(key, 'errors')
             # 降级到内存缓存
             try:
-                expire_time = None
-                if expire:
-                    from .timezone_helper import now
-                    expire_time = now() + timedelta(seconds=expire)
-
-                self.memory_cache[key] = {
-                    'value': value,
-                    'expire_time': expire_time
-                }
-                return True
+                self.stats.incr(key, 'fallbacks')
+                return self._set_memory(key, value, expire)
             except:
                 return False
 
@@ -107,10 +361,16 @@ class CacheManager:
         try:
             if self.redis_client:
                 # 从Redis获取
-                value = self.redis_client.get(key)
+                started = time.perf_counter()
+                try:
+                    value = self.redis_client.get(key)
+                finally:
+                    self.stats.observe_latency(key, time.perf_counter() - started)
                 if value is None:
+                    self.stats.incr(key, 'misses')
                     return None
 
+                self.stats.incr(key, 'hits')
                 # 尝试JSON反序列化
                 try:
                     return json.loads(value.decode('utf-8'))
@@ -119,45 +379,47 @@ class CacheManager:
                     try:
                         return pickle.loads(value)
                     except:
+                        self.stats.incr(key, 'serialization_errors')
                         return value.decode('utf-8') if isinstance(value, bytes) else value
             else:
                 # 从内存缓存获取
-                cache_item = self.memory_cache.get(key)
+                self.stats.incr(key, 'fallbacks')
+                cache_item = self._get_memory(key)
                 if cache_item is None:
+                    self.stats.incr(key, 'misses')
                     return None
 
-                # 检查是否过期
-                if cache_item['expire_time']:
-                    from .timezone_helper import now
-                    if now() > cache_item['expire_time']:
-                        del self.memory_cache[key]
-                        return None
-
+                self.stats.incr(key, 'hits')
                 return cache_item['value']
 
         except Exception as e:
             current_app.logger.error(f"获取缓存失败: {e}")
+            self.record_redis_failure(e)
+            self.stats.incr(key, 'errors')
             return None
     
     def delete(self, key):
         """删除缓存"""
+        self.stats.incr(key, 'deletes')
         try:
             if self.redis_client:
-                return self.redis_client.delete(key)
+                started = time.perf_counter()
+                try:
+                    return self.redis_client.delete(key)
+                finally:
+                    self.stats.observe_latency(key, time.perf_counter() - started)
             else:
                 # 从内存缓存删除
-                if key in self.memory_cache:
-                    del self.memory_cache[key]
-                    return True
-                return False
+                self.stats.incr(key, 'fallbacks')
+                return self._delete_memory(key)
         except Exception as e:
             current_app.logger.error(f"删除缓存失败: {e}")
+            self.record_redis_failure(e)
+            self.stats.incr(key, 'errors')
             # 降级到内存缓存
             try:
-                if key in self.memory_cache:
-                    del self.memory_cache[key]
-                    return True
-                return False
+                self.stats.incr(key, 'fallbacks')
+                return self._delete_memory(key)
             except:
                 return False
 
@@ -165,23 +427,21 @@ class CacheManager:
         """检查缓存是否存在"""
         try:
             if self.redis_client:
-                return self.redis_client.exists(key)
+                started = time.perf_counter()
+                try:
+                    found = self.redis_client.exists(key)
+                finally:
+                    self.stats.observe_latency(key, time.perf_counter() - started)
             else:
                 # 检查内存缓存
-                cache_item = self.memory_cache.get(key)
-                if cache_item is None:
-                    return False
-
-                # 检查是否过期
-                if cache_item['expire_time']:
-                    from .timezone_helper import now
-                    if now() > cache_item['expire_time']:
-                        del self.memory_cache[key]
-                        return False
-
-                return True
+                self.stats.incr(key, 'fallbacks')
+                found = self._get_memory(key) is not None
+            self.stats.incr(key, 'hits' if found else 'misses')
+            return found
         except Exception as e:
             current_app.logger.error(f"检查缓存存在性失败: {e}")
+            self.record_redis_failure(e)
+            self.stats.incr(key, 'errors')
             return False
     
     def expire(self, key, seconds):
@@ -238,14 +498,17 @@ class CacheManager:
         return f"flow_data:{unicom_account_id}"
     
     def set_flow_cache(self, unicom_account_id, flow_data, expire=None, user_id=None):
-        """设置流量缓存"""
+        """设置流量缓存
+
+        expire 为软过期时间（新鲜期），超过后在 FLOW_CACHE_STALE_TTL 内仍保留数据，
+        供 stale-while-revalidate 直接返回旧值并后台刷新；超过硬过期后缓存删除。
+        """
         if expire is None:
             # 优先使用用户设置的缓存时间
             if user_id:
                 try:
                     from ..models.user_settings import UserSettings
-                    user_settings = UserSettings.get_or_create(user_id)
-                    settings_dict = user_settings.to_dict()
+                    settings_dict = UserSettings.get_settings_dict(user_id)
                     cache_ttl_minutes = settings_dict.get('cache', {}).get('cacheTtlMinutes', 10)
                     expire = cache_ttl_minutes * 60  # 转换为秒
                     current_app.logger.info(f"使用用户缓存设置: {cache_ttl_minutes}分钟 ({expire}秒)")
@@ -256,6 +519,7 @@ class CacheManager:
                 expire = current_app.config.get('FLOW_CACHE_EXPIRE', 600)  # 默认10分钟
 
         cache_key = self.get_flow_cache_key(unicom_account_id)
+        stale_ttl = max(0, int(current_app.config.get('FLOW_CACHE_STALE_TTL', 1800) or 0))
 
         # 添加缓存时间戳
         from .timezone_helper import now as timezone_now
@@ -263,15 +527,41 @@ class CacheManager:
         cache_data = {
             'data': flow_data,
             'cached_at': current_time.isoformat(),
-            'expires_at': (current_time + timedelta(seconds=expire)).isoformat()
+            'expires_at': (current_time + timedelta(seconds=expire)).isoformat(),
+            'stale_until': (current_time + timedelta(seconds=expire + stale_ttl)).isoformat()
         }
 
-        return self.set(cache_key, cache_data, expire)
+        return self.set(cache_key, cache_data, expire + stale_ttl)
     
     def get_flow_cache(self, unicom_account_id):
         """获取流量缓存"""
         cache_key = self.get_flow_cache_key(unicom_account_id)
         return self.get(cache_key)
+
+    def get_flow_cache_state(self, unicom_account_id):
+        """获取流量缓存及其状态
+
+        Returns:
+            tuple: (cache_data, state)，state 为 'fresh'（软过期前）、
+            'stale'（软过期后、硬过期前）或 None（无缓存/已硬过期）
+        """
+        cache_data = self.get_flow_cache(unicom_account_id)
+        if not isinstance(cache_data, dict):
+            return None, None
+
+        try:
+            from .timezone_helper import parse_datetime, now
+            current_time = now()
+            expires_at = parse_datetime(cache_data.get('expires_at', ''))
+            if expires_at and current_time < expires_at:
+                return cache_data, 'fresh'
+            # 兼容旧缓存（无 stale_until）：视为已硬过期
+            stale_until = parse_datetime(cache_data.get('stale_until', ''))
+            if stale_until and current_time < stale_until:
+                return cache_data, 'stale'
+        except Exception:
+            pass
+        return None, None
     
     def delete_flow_cache(self, unicom_account_id):
         """删除流量缓存"""
@@ -292,29 +582,62 @@ class CacheManager:
             return False
         except:
             return False
+
+    def acquire_flow_refresh_lock(self, unicom_account_id, expire=None):
+        """获取流量后台刷新锁（single-flight），成功返回True"""
+        if expire is None:
+            expire = current_app.config.get('FLOW_REFRESH_LOCK_TTL', 60)
+        lock_key = f"flow_refresh_lock:{unicom_account_id}"
+        try:
+            if self.redis_client:
+                return bool(self.redis_client.set(lock_key, b'1', nx=True, ex=expire))
+        except Exception as e:
+            current_app.logger.error(f"获取刷新锁失败: {e}")
+            self.record_redis_failure(e)
+
+        # 内存模式：检查与写入需在同一把锁内完成
+        from .timezone_helper import now
+        with self._memory_lock:
+            current_time = now()
+            lock_item = self.memory_cache.get(lock_key)
+            if lock_item and lock_item['expire_time'] and current_time < lock_item['expire_time']:
+                return False
+            self.memory_cache[lock_key] = {
+                'value': 1,
+                'expire_time': current_time + timedelta(seconds=expire)
+            }
+            return True
+
+    def release_flow_refresh_lock(self, unicom_account_id):
+        """释放流量后台刷新锁"""
+        lock_key = f"flow_refresh_lock:{unicom_account_id}"
+        try:
+            if self.redis_client:
+                self.redis_client.delete(lock_key)
+        except Exception as e:
+            current_app.logger.error(f"释放刷新锁失败: {e}")
+        with self._memory_lock:
+            self.memory_cache.pop(lock_key, None)
     
     # 频率限制相关方法
     def get_rate_limit_key(self, user_id, action):
         """获取频率限制键"""
         return f"rate_limit:{user_id}:{action}"
     
-    def check_rate_limit(self, user_id, action, limit_seconds):
-        """检查频率限制"""
+    def check_rate_limit(self, user_id, action, limit_seconds, limit=1, mode=FIXED_WINDOW):
+        """检查频率限制（原子操作，通过时同时消耗一次配额）
+
+        Returns:
+            tuple: (是否允许, 需等待秒数)
+        """
         rate_key = self.get_rate_limit_key(user_id, action)
-        
-        if self.exists(rate_key):
-            remaining_time = self.ttl(rate_key)
-            return False, remaining_time
-        
-        # 设置频率限制
-        from .timezone_helper import now
-        self.set(rate_key, now().isoformat(), limit_seconds)
-        return True, 0
+        result = self.rate_limiter.hit(rate_key, limit, limit_seconds, mode=mode)
+        return result.allowed, result.retry_after
     
     def clear_rate_limit(self, user_id, action):
         """清除频率限制"""
         rate_key = self.get_rate_limit_key(user_id, action)
-        return self.delete(rate_key)
+        return self.rate_limiter.reset(rate_key)
     
     # 监控缓存相关方法
     def get_monitor_cache_key(self, unicom_account_id):
@@ -331,65 +654,26 @@ class CacheManager:
         cache_key = self.get_monitor_cache_key(unicom_account_id)
         return self.get(cache_key)
 
-    def can_manual_refresh(self, unicom_account_id, user_id=None):
-        """检查是否可以手动刷新"""
-        try:
-            # 获取上次手动刷新时间
-            cache_key = f"manual_refresh:{unicom_account_id}"
-            last_refresh = self.get(cache_key)
-
-            if not last_refresh:
-                return True
-
-            # 获取用户的刷新冷却配置
-            interval = 60  # 默认60秒
-            if user_id:
-                try:
-                    from ..models.user_settings import UserSettings
-                    user_settings = UserSettings.get_or_create(user_id)
-                    settings_dict = user_settings.to_dict()
-                    interval = settings_dict.get('cache', {}).get('refreshCooldownSeconds', 60)
-                except Exception as e:
-                    current_app.logger.warning(f"获取用户刷新配置失败，使用默认值: {e}")
-                    interval = current_app.config.get('MANUAL_REFRESH_INTERVAL', 60)
-            else:
-                interval = current_app.config.get('MANUAL_REFRESH_INTERVAL', 60)
-
-            # 检查是否超过限制间隔
-            from .timezone_helper import parse_datetime, now
-            from datetime import timedelta
-            last_time = parse_datetime(last_refresh)
-            if last_time:
-                return now() > last_time + timedelta(seconds=interval)
-            return True
-        except Exception as e:
-            current_app.logger.error(f"检查手动刷新限制失败: {e}")
-            return True  # 出错时允许刷新
-
-    def set_manual_refresh_time(self, unicom_account_id, user_id=None):
-        """设置手动刷新时间"""
-        try:
-            from datetime import datetime
-            cache_key = f"manual_refresh:{unicom_account_id}"
+    def get_manual_refresh_interval(self, user_id=None):
+        """获取手动刷新冷却时间(秒)"""
+        if user_id:
+            try:
+                from ..models.user_settings import UserSettings
+                settings_dict = UserSettings.get_settings_dict(user_id)
+                return int(settings_dict.get('cache', {}).get('refreshCooldownSeconds', 60))
+            except Exception as e:
+                current_app.logger.warning(f"获取用户刷新配置失败，使用默认值: {e}")
+        return current_app.config.get('MANUAL_REFRESH_INTERVAL', 60)
 
-            # 获取用户的刷新冷却配置
-            interval = 60  # 默认60秒
-            if user_id:
-                try:
-                    from ..models.user_settings import UserSettings
-                    user_settings = UserSettings.get_or_create(user_id)
-                    settings_dict = user_settings.to_dict()
-                    interval = settings_dict.get('cache', {}).get('refreshCooldownSeconds', 60)
-                except Exception as e:
-                    current_app.logger.warning(f"获取用户刷新配置失败，使用默认值: {e}")
-                    interval = current_app.config.get('MANUAL_REFRESH_INTERVAL', 60)
-            else:
-                interval = current_app.config.get('MANUAL_REFRESH_INTERVAL', 60)
+    def acquire_manual_refresh(self, unicom_account_id, user_id=None):
+        """尝试占用一次手动刷新（冷却期内只允许1次，检查与占用为原子操作）
 
-            from .timezone_helper import now
-            self.set(cache_key, now().isoformat(), expire=interval)
-        except Exception as e:
-            current_app.logger.error(f"设置手动刷新时间失败: {e}")
+        Returns:
+            RateLimitResult: allowed 为 False 时 retry_after 为剩余冷却秒数
+        """
+        interval = self.get_manual_refresh_interval(user_id)
+        cache_key = f"manual_refresh:{unicom_account_id}"
+        return self.rate_limiter.hit(cache_key, 1, interval)
 
 # 创建全局实例
 cache_manager = CacheManager()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存统计
+按键命名空间统计命中/未命中/降级/序列化错误/Redis延迟（进程内计数）
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+
+# 已知命名空间（多段前缀需写全，匹配时取最长前缀）
+KNOWN_NAMESPACES = (
+    'flow_data',
+    'rate_limit',
+    'manual_refresh',
+    'alert_once',
+    'jump_base',
+    'monitor:last_scan',
+    'user_settings',
+    'flow_refresh_lock',
+)
+
+COUNTERS = (
+    'hits',
+    'misses',
+    'sets',
+    'deletes',
+    'errors',
+    'fallbacks',
+    'serialization_errors',
+)
+
+
+class CacheStats:
+    """缓存统计收集器（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces = sorted(KNOWN_NAMESPACES, key=len, reverse=True)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+            self._latency = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+            self.started_at = time.time()
+
+    def namespace_of(self, key):
+        """根据键名解析命名空间，如 monitor:last_scan:3 -> monitor:last_scan"""
+        if isinstance(key, bytes):
+            key = key.decode('utf-8', 'ignore')
+        key = str(key)
+        for known in self._namespaces:
+            if key.startswith(known) and (len(key) == len(known) or key[len(known)] == ':'):
+                return known
+        return key.split(':', 1)[0] or 'other'
+
+    def incr(self, key, counter, amount=1):
+        ns = self.namespace_of(key)
+        with self._lock:
+            self._counters[ns][counter] = self._counters[ns].get(counter, 0) + amount
+
+    def observe_latency(self, key, seconds):
+        ns = self.namespace_of(key)
+        with self._lock:
+            item = self._latency[ns]
+            item['count'] += 1
+            item['total'] += seconds
+            if seconds > item['max']:
+                item['max'] = seconds
+
+    def snapshot(self):
+        """导出统计快照"""
+        with self._lock:
+            namespaces = set(self._counters) | set(self._latency)
+            data = {}
+            for ns in sorted(namespaces):
+                counters = dict(self._counters[ns]) if ns in self._counters else dict.fromkeys(COUNTERS, 0)
+                lat = self._latency.get(ns) or {'count': 0, 'total': 0.0, 'max': 0.0}
+                lookups = counters['hits'] + counters['misses']
+                counters.update({
+                    'hit_rate': round(counters['hits'] / lookups, 4) if lookups else None,
+                    'redis_calls': lat['count'],
+                    'redis_latency_avg_ms': round(lat['total'] / lat['count'] * 1000, 3) if lat['count'] else None,
+                    'redis_latency_max_ms': round(lat['max'] * 1000, 3) if lat['count'] else None
+                })
+                data[ns] = counters
+            return {
+                'pid': os.getpid(),
+                'since': self.started_at,
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'namespaces': data
+            }
+
+    def render_prometheus(self, prefix='unicom_cache'):
+        """导出为 Prometheus 文本格式"""
+        with self._lock:
+            counters = {ns: dict(v) for ns, v in self._counters.items()}
+            latency = {ns: dict(v) for ns, v in self._latency.items()}
+
+        lines = [
+            f'# HELP {prefix}_operations_total Cache operations by namespace and result',
+            f'# TYPE {prefix}_operations_total counter',
+        ]
+        for ns in sorted(counters):
+            for name, value in sorted(counters[ns].items()):
+                lines.append(f'{prefix}_operations_total{{namespace="{ns}",result="{name}"}} {value}')
+
+        lines += [
+            f'# HELP {prefix}_redis_latency_seconds Redis round-trip latency by namespace',
+            f'# TYPE {prefix}_redis_latency_seconds summary',
+        ]
+        for ns in sorted(latency):
+            lines.append(f'{prefix}_redis_latency_seconds_sum{{namespace="{ns}"}} {latency[ns]["total"]:.6f}')
+            lines.append(f'{prefix}_redis_latency_seconds_count{{namespace="{ns}"}} {latency[ns]["count"]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应压缩
+按 Accept-Encoding 对较大的文本类响应（JSON 等）做 brotli（需安装 brotli）或 gzip 压缩。
+流式响应、已编码响应与 304 不处理；压缩后的表示在 ETag 后追加编码后缀，
+条件请求匹配时由 http_cache 去掉后缀比较。
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'text/html', 'application/x-ndjson')
+ENCODING_SUFFIXES = ('-br', '-gzip')
+
+
+class ResponseCompressor:
+    """after_request 压缩钩子"""
+
+    def __init__(self):
+        self.enabled = True
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 5
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('RESPONSE_COMPRESSION', True))
+        self.min_size = int(app.config.get('RESPONSE_COMPRESSION_MIN_SIZE', 1024))
+        self.gzip_level = int(app.config.get('RESPONSE_COMPRESSION_GZIP_LEVEL', 6))
+        self.brotli_quality = int(app.config.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', 5))
+        if self.enabled:
+            app.after_request(self.compress)
+
+    def _choose_encoding(self, accept_encoding):
+        if brotli is not None and accept_encoding['br']:
+            return 'br'
+        if accept_encoding['gzip']:
+            return 'gzip'
+        return None
+
+    def compress(self, response):
+        from flask import request
+
+        if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        return response
+
+
+response_compressor = ResponseCompressor()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间序列降采样
+- lttb: Largest-Triangle-Three-Buckets，保留视觉形状，输出点数等于预算
+- minmax: 每桶保留最小值与最大值，保证峰谷不丢失，输出点数不超过预算
+两者都只返回被选中的下标（升序），调用方据此取出同一行的其他列。
+输入为按 x 升序的列数组（x 为时间戳秒数），单次线性扫描，不构造逐点对象。
+"""
+from typing import List, Sequence
+
+METHOD_LTTB = 'lttb'
+METHOD_MINMAX = 'minmax'
+METHODS = (METHOD_LTTB, METHOD_MINMAX)
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """LTTB 降采样，返回选中点的下标"""
+    n = len(xs)
+    threshold = max(threshold, 3)
+    if threshold >= n:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点作为三角形第三个顶点
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        # 三角形面积 = |(ax-avg_x)(y-ay) - (ax-x)(avg_y-ay)| / 2，常数项提到循环外
+        dx = ax - avg_x
+        dy = avg_y - ay
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def minmax(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """按时间等宽分桶，每桶保留最小与最大值点（首尾点总是保留），返回下标"""
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    buckets = max(1, (threshold - 2) // 2)
+    x0, span = xs[0], (xs[-1] - xs[0]) or 1.0
+    width = span / buckets
+
+    selected = {0, n - 1}
+    current = -1
+    lo = hi = None
+    for i in range(1, n - 1):
+        bucket = min(int((xs[i] - x0) / width), buckets - 1)
+        if bucket != current:
+            if lo is not None:
+                selected.add(lo)
+                selected.add(hi)
+            current, lo, hi = bucket, i, i
+            continue
+        y = ys[i]
+        if y < ys[lo]:
+            lo = i
+        elif y > ys[hi]:
+            hi = i
+    if lo is not None:
+        selected.add(lo)
+        selected.add(hi)
+    return sorted(selected)
+
+
+def downsample(xs: Sequence[float], ys: Sequence[float], threshold: int, method: str = METHOD_LTTB) -> List[int]:
+    """按方法降采样，返回选中点的下标"""
+    if method == METHOD_MINMAX:
+        return minmax(xs, ys, threshold)
+    return lttb(xs, ys, threshold)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+联通流量响应解析
+每个响应只解析一次得到 FlowSnapshot，供流量记录、监控告警、统计基准与接口返回共用：
+- 顶层字段与 flowSumList 在解析时直接转换
+- resources / unshared / TwResources 明细只在首次用到流量包或资源汇总时遍历一次并缓存，
+  监控任务不构造流量包、接口不计算资源汇总
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# flowSumList 中 flowtype -> 分类后缀
+FLOW_TYPES = {'1': 'general', '2': 'special', '3': 'other'}
+
+# flowtype -> (已用文本, 剩余文本, 已用MB, 剩余MB) 属性名
+_FLOW_ATTRS = {
+    code: (f'used_{suffix}', f'remain_{suffix}', f'used_{suffix}_mb', f'remain_{suffix}_mb')
+    for code, suffix in FLOW_TYPES.items()
+}
+
+# 资源明细 flowType -> 汇总位置（通用/专属）
+_TOTAL_SLOTS = {'1': 0, '2': 2}
+
+# 套外流量包中视为无限量的关键词
+_UNLIMITED_KEYWORDS = ('专享', '免费', '大王卡', '定向')
+
+
+def parse_mb(value):
+    """解析流量字符串为MB数值，如 '1,024.5'、'+12.34MB'、'2GB'；无法解析返回None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return round(float(value), 2)  # 纯数字字符串（最常见）
+    except (TypeError, ValueError):
+        pass
+    text = str(value).strip().replace(',', '').upper()
+    if not text:
+        return None
+    factor = 1.0
+    if text.endswith('GB'):
+        factor, text = 1024.0, text[:-2]
+    elif text.endswith('MB'):
+        text = text[:-2]
+    elif text.endswith('KB'):
+        factor, text = 1 / 1024.0, text[:-2]
+    try:
+        return round(float(text) * factor, 2)
+    except ValueError:
+        return None
+
+
+def _is_unlimited(total_value, used_value, remain_value, name=None):
+    """识别无限量流量包：总量为空/0且有使用量、（套外包）关键词且无总量、剩余为负数"""
+    try:
+        if (not total_value or float(total_value) == 0) and used_value and float(used_value) > 0:
+            return True
+        if name and any(keyword in name for keyword in _UNLIMITED_KEYWORDS):
+            return not total_value or float(total_value) == 0
+        if remain_value and float(remain_value) < 0:
+            return True
+    except (ValueError, TypeError):
+        pass
+    return False
+
+
+class FlowSnapshot:
+    """一次流量响应的解析结果"""
+
+    __slots__ = (
+        'raw',
+        # 原始文本（接口返回与 FlowRecord 字符串字段）
+        'total_flow', 'used_flow', 'remaining_flow', 'usage_percentage',
+        'used_general', 'used_special', 'used_other',
+        'remain_general', 'remain_special', 'remain_other',
+        # 数值(MB)，无法解析为None
+        'total_mb', 'used_mb', 'remain_mb',
+        'used_general_mb', 'used_special_mb', 'used_other_mb',
+        'remain_general_mb', 'remain_special_mb', 'remain_other_mb',
+        # 资源明细 [(来源, 条目类型, details)] 及按需计算的结果
+        '_package_name', '_groups', '_packages', '_resource_totals',
+    )
+
+    def __init__(self, raw=None):
+        self.raw = raw
+        self.total_flow = '0'
+        self.used_flow = '0'
+        self.remaining_flow = '0'
+        self.usage_percentage = 0
+        self.used_general = self.used_special = self.used_other = '0'
+        self.remain_general = self.remain_special = self.remain_other = '0'
+        self.total_mb = self.used_mb = self.remain_mb = None
+        self.used_general_mb = self.used_special_mb = self.used_other_mb = None
+        self.remain_general_mb = self.remain_special_mb = self.remain_other_mb = None
+        self._package_name = ''
+        self._groups = []
+        self._packages = None
+        self._resource_totals = None
+
+    # ---------------------- 资源明细（按需计算） ----------------------
+
+    def _build_packages(self):
+        resource_packages = []
+        unshared_packages = []
+        extra_packages = []
+        package_name = self._package_name
+        unshared_name = None
+        for source, item_type, details in self._groups:
+            if source == 'resources' and item_type == 'flow':
+                for detail in details:
+                    if not isinstance(detail, dict):
+                        continue
+                    resource_packages.append(_package(detail, source))
+                    # 如果没有套餐名称，从主要流量包中提取
+                    if not package_name and detail.get('feePolicyName'):
+                        package_name = detail['feePolicyName']
+            elif source == 'unshared' and item_type == 'unsharedFlowList' and not resource_packages:
+                # unshared 仅在 resources 没有流量包时使用
+                for detail in details:
+                    if not isinstance(detail, dict):
+                        continue
+                    unshared_packages.append(_package(detail, source))
+                    # 提取套餐名称（优先主套餐）
+                    fee_policy = detail.get('feePolicyName')
+                    if not unshared_name and fee_policy and ('大王卡' in fee_policy or detail.get('flowType') == '2'):
+                        unshared_name = fee_policy
+            elif source == 'TwResources' and item_type == 'flow':
+                for detail in details:
+                    if not isinstance(detail, dict):
+                        continue
+                    extra_packages.append(_extra_package(detail))
+        self._packages = (resource_packages or unshared_packages, extra_packages,
+                          package_name or unshared_name or '')
+        return self._packages
+
+    def _build_resource_totals(self):
+        totals = [0.0, 0.0, 0.0, 0.0]  # 通用总量、通用剩余、专属总量、专属剩余
+        for _, _, details in self._groups:
+            for detail in details:
+                if not isinstance(detail, dict):
+                    continue
+                ftype = detail.get('flowType') or detail.get('type')
+                slot = _TOTAL_SLOTS.get(ftype)
+                if slot is None and ftype is not None:
+                    slot = _TOTAL_SLOTS.get(str(ftype).strip())
+                if slot is None:
+                    continue
+                total_mb = parse_mb(detail.get('total'))
+                remain_mb = parse_mb(detail.get('remain'))
+                if total_mb:
+                    totals[slot] += total_mb
+                if remain_mb is not None and remain_mb > 0:
+                    totals[slot + 1] += remain_mb
+        self._resource_totals = tuple(value or None for value in totals)
+        return self._resource_totals
+
+    @property
+    def flow_packages(self):
+        return (self._packages or self._build_packages())[0]
+
+    @property
+    def extra_packages(self):
+        return (self._packages or self._build_packages())[1]
+
+    @property
+    def package_name(self):
+        if self._package_name:
+            return self._package_name
+        return (self._packages or self._build_packages())[2]
+
+    @property
+    def resource_totals(self):
+        """资源明细汇总 (通用总量, 通用剩余, 专属总量, 专属剩余)(MB)，无数据为None"""
+        return self._resource_totals or self._build_resource_totals()
+
+    # ---------------------- 各使用方的视图 ----------------------
+
+    def to_flow_info(self):
+        """接口返回的 flow_info"""
+        return {
+            'total_flow': self.total_flow,
+            'used_flow': self.used_flow,
+            'remaining_flow': self.remaining_flow,
+            'usage_percentage': self.usage_percentage,
+            'flow_packages': self.flow_packages,
+            'extra_packages': self.extra_packages,
+            'package_name': self.package_name,
+            'used_general': self.used_general,
+            'used_special': self.used_special,
+            'used_other': self.used_other,
+            'remain_general': self.remain_general,
+            'remain_special': self.remain_special,
+            'remain_other': self.remain_other
+        }
+
+    def record_fields(self):
+        """FlowRecord 的字符串字段"""
+        return {
+            'total_data': self.total_flow,
+            'used_data': self.used_flow,
+            'remain_data': self.remaining_flow,
+            'free_data': self.used_special,  # 专属流量使用量
+            'package_name': self.package_name,
+            'used_general': self.used_general,
+            'used_special': self.used_special,
+            'used_other': self.used_other,
+            'remain_general': self.remain_general,
+            'remain_special': self.remain_special,
+            'remain_other': self.remain_other,
+        }
+
+    def numeric_values(self):
+        """FlowRecord 数值字段(MB)，只含可解析的值"""
+        values = {
+            'total_mb': self.total_mb,
+            'used_mb': self.used_mb,
+            'remain_mb': self.remain_mb,
+            'used_general_mb': self.used_general_mb,
+            'used_special_mb': self.used_special_mb,
+            'used_other_mb': self.used_other_mb,
+            'remain_general_mb': self.remain_general_mb,
+            'remain_special_mb': self.remain_special_mb,
+            'remain_other_mb': self.remain_other_mb,
+            'free_mb': self.used_special_mb,
+        }
+        return {k: v for k, v in values.items() if v is not None}
+
+    def metrics(self):
+        """监控告警使用的各类总量/剩余/已用(MB)"""
+        general_total, general_resource_remain, special_total, special_resource_remain = self.resource_totals
+        # 剩余量优先使用flowSumList的数据，备选使用资源明细汇总
+        general_remain = self.remain_general_mb
+        if general_remain is None:
+            general_remain = general_resource_remain
+        special_remain = self.remain_special_mb
+        if special_remain is None:
+            special_remain = special_resource_remain
+        return {
+            'total_all_mb': self.total_mb,
+            'remain_all_mb': self.remain_mb,
+            'used_all_mb': self.used_mb,
+            'general_total_mb': general_total,
+            'general_remain_mb': general_remain,
+            'used_general_mb': self.used_general_mb,
+            'special_total_mb': special_total,
+            'special_remain_mb': special_remain,
+            'used_free_mb': self.used_special_mb,
+        }
+
+    def usage_totals(self):
+        """统计基准使用的 (通用已用, 专属已用, 总已用)，缺失按0"""
+        return (self.used_general_mb or 0.0, self.used_special_mb or 0.0, self.used_mb or 0.0)
+
+
+def _package(detail, source):
+    """resources/unshared 中的流量包"""
+    total_value = detail.get('total', '0')
+    used_value = detail.get('use', '0')
+    remain_value = detail.get('remain', '0')
+    unlimited = _is_unlimited(total_value, used_value, remain_value)
+    return {
+        'name': detail.get('addUpItemName') or detail.get('feePolicyName', '流量包'),
+        'total': total_value if not unlimited else 'unlimited',
+        'used': used_value,
+        'remaining': remain_value if not unlimited else 'unlimited',
+        'unit': 'MB',
+        'type': detail.get('flowType', '1'),
+        'end_date': detail.get('endDate', ''),
+        'used_percent': detail.get('usedPercent', '0'),
+        'source': source,
+        'is_unlimited': unlimited
+    }
+
+
+def _extra_package(detail):
+    """TwResources 中的套外流量包"""
+    total_value = detail.get('total', '0')
+    used_value = detail.get('use', '0')
+    remain_value = detail.get('remain', '0')
+    unlimited = _is_unlimited(total_value, used_value, remain_value, detail.get('addUpItemName'))
+    return {
+        'name': detail.get('addUpItemName', '套外流量包'),
+        'total': total_value if not unlimited else 'unlimited',
+        'used': used_value,
+        'remaining': remain_value if not unlimited else 'unlimited',
+        'unit': 'MB',
+        'type': detail.get('flowType', '1'),
+        'used_percent': detail.get('usedPercent', '0'),
+        'is_extra': True,
+        'is_unlimited': unlimited,
+        'source': 'TwResources'
+    }
+
+
+def _parse(snapshot, data):
+    snapshot.total_flow = data.get('sum', '0')
+    snapshot.used_flow = data.get('allUserFlow', '0')
+    # 剩余流量：优先canUseFlowAll，备选canUseValueAll
+    snapshot.remaining_flow = data.get('canUseFlowAll') or data.get('canUseValueAll', '0')
+    snapshot.total_mb = parse_mb(data.get('sum'))
+    snapshot.used_mb = parse_mb(data.get('allUserFlow'))
+    snapshot.remain_mb = parse_mb(data.get('canUseFlowAll') or data.get('canUseValueAll'))
+    snapshot._package_name = data.get('packageName') or ''
+
+    for item in data.get('flowSumList') or []:
+        attrs = _FLOW_ATTRS.get(str(item.get('flowtype', '')).strip())
+        if not attrs:
+            continue
+        setattr(snapshot, attrs[0], str(item.get('xusedvalue', '0')))
+        setattr(snapshot, attrs[1], str(item.get('xcanusevalue', '0')))
+        setattr(snapshot, attrs[2], parse_mb(item.get('xusedvalue')))
+        setattr(snapshot, attrs[3], parse_mb(item.get('xcanusevalue')))
+
+    for source in ('resources', 'unshared', 'TwResources'):
+        items = data.get(source)
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            details = item.get('details') if isinstance(item, dict) else None
+            if isinstance(details, list) and details:
+                snapshot._groups.append((source, item.get('type'), details))
+
+    # 使用百分比
+    try:
+        usage_percentage = float(data.get('sumPercent', 0))
+    except (ValueError, TypeError):
+        total_num, used_num = snapshot.total_mb, snapshot.used_mb
+        usage_percentage = (used_num / total_num * 100) if total_num and used_num is not None else 0
+    snapshot.usage_percentage = round(usage_percentage, 2)
+
+
+def parse_flow_response(raw_data):
+    """解析联通流量响应（dict），解析异常时返回只含默认值的快照"""
+    snapshot = FlowSnapshot(raw_data)
+    if not raw_data:
+        return snapshot
+    try:
+        _parse(snapshot, raw_data)
+    except Exception as e:
+        logger.error(f"解析流量数据异常: {e}")
+        snapshot = FlowSnapshot(raw_data)
+    return snapshot
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条件请求（ETag / If-None-Match）
+- 能从版本信息（缓存时间戳等）推出 ETag 的接口，先用 not_modified() 判断，命中时直接返回 304，
+  不构建、不序列化响应
+- 其余接口用 conditional() 按响应内容哈希生成 ETag，命中时返回无正文的 304
+- 正文含相对当前时间的字段（如剩余小时数）时用弱 ETag（W/），表示语义等价而非逐字节相同
+- 压缩后的响应 ETag 带编码后缀（见 compression），比较时忽略后缀
+响应统一带 Cache-Control: private, no-cache，浏览器每次都会携带 If-None-Match 重新验证
+"""
+import hashlib
+
+from flask import current_app, request
+
+from .compression import ENCODING_SUFFIXES
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+def etag_for(*parts) -> str:
+    """由版本信息生成 ETag（不含引号）"""
+    raw = ':'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def client_has(etag: str) -> bool:
+    """If-None-Match 是否包含该 ETag（弱比较，含压缩后追加编码后缀的形式）"""
+    tags = request.if_none_match
+    if not tags:
+        return False
+    return tags.contains_weak(etag) or any(tags.contains_weak(etag + suffix) for suffix in ENCODING_SUFFIXES)
+
+
+def not_modified(etag: str, weak: bool = False):
+    """客户端已持有该版本时返回 304 响应，否则返回None"""
+    if not client_has(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def conditional(response, etag: str = None, weak: bool = False):
+    """为响应设置 ETag（未指定时按内容哈希），客户端已持有时返回 304"""
+    if response.status_code != 200:
+        return response
+    if not etag:
+        etag = hashlib.sha1(response.get_data()).hexdigest()
+    cached = not_modified(etag, weak)
+    if cached is not None:
+        return cached
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游标分页（keyset）
+按 (created_at, id) 倒序分页，用不透明的 next/prev 游标定位，
+每页只做一次带范围条件的索引查询，不使用 COUNT(*) 与 OFFSET
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from .cache_manager import cache_manager
+
+DIRECTION_NEXT = 'next'
+DIRECTION_PREV = 'prev'
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(created_at, record_id, direction):
+    """生成游标：base64(JSON)"""
+    payload = {
+        't': created_at.isoformat() if created_at else None,
+        'i': record_id,
+        'd': direction
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """解析游标，返回 (created_at, id, direction)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = datetime.fromisoformat(payload['t']) if payload.get('t') else None
+        direction = payload.get('d', DIRECTION_NEXT)
+        if direction not in (DIRECTION_NEXT, DIRECTION_PREV):
+            raise ValueError(direction)
+        return created_at, int(payload['i']), direction
+    except Exception as e:
+        raise InvalidCursor(f"无效的分页游标: {e}")
+
+
+def keyset_paginate(query, model, cursor=None, per_page=20):
+    """按 (created_at desc, id desc) 游标分页
+
+    Args:
+        query: 已带过滤条件、未排序的查询
+        model: 含 created_at/id 列的模型
+        cursor: 上一次返回的 next/prev 游标，None 为第一页
+        per_page: 每页条数
+
+    Returns:
+        dict: {'items', 'next_cursor', 'prev_cursor', 'has_next', 'has_prev'}
+    """
+    direction = DIRECTION_NEXT
+    if cursor:
+        created_at, record_id, direction = decode_cursor(cursor)
+        if direction == DIRECTION_NEXT:
+            query = query.filter(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < record_id)
+            ))
+        else:
+            query = query.filter(or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > record_id)
+            ))
+
+    if direction == DIRECTION_NEXT:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+
+    if direction == DIRECTION_NEXT:
+        has_next, has_prev = has_more, bool(cursor)
+    else:
+        items.reverse()
+        has_next, has_prev = True, has_more
+
+    next_cursor = prev_cursor = None
+    if items:
+        if has_next:
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id, DIRECTION_NEXT)
+        if has_prev:
+            prev_cursor = encode_cursor(items[0].created_at, items[0].id, DIRECTION_PREV)
+
+    return {
+        'items': items,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+        'has_next': bool(next_cursor),
+        'has_prev': bool(prev_cursor)
+    }
+
+
+def approximate_total(query, cache_scope, ttl=60):
+    """总数（结果缓存 ttl 秒，翻页期间不重复 COUNT）"""
+    digest = hashlib.md5(cache_scope.encode('utf-8')).hexdigest()
+    cache_key = f"page_total:{digest}"
+    total = cache_manager.get(cache_key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache_manager.set(cache_key, total, ttl)
+    return total
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+频率限制器
+- Redis 端使用 Lua 脚本原子执行，一次往返返回 是否允许/剩余次数/重试等待
+- 支持固定窗口(fixed)、滑动窗口(sliding)、令牌桶(token_bucket)三种模式
+- Redis 不可用时降级到等价的进程内实现
+"""
+import math
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from flask import current_app
+
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'remaining', 'retry_after', 'limit', 'window'])
+RateLimitResult.__doc__ = """频率限制结果：retry_after/window 单位为秒"""
+
+FIXED_WINDOW = 'fixed'
+SLIDING_WINDOW = 'sliding'
+TOKEN_BUCKET = 'token_bucket'
+
+# KEYS[1]=key  ARGV: limit, window_ms, cost, now_ms, member
+_FIXED_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local current = redis.call('INCRBY', KEYS[1], cost)
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+    redis.call('PEXPIRE', KEYS[1], window)
+    ttl = window
+end
+if current > limit then
+    redis.call('DECRBY', KEYS[1], cost)
+    return {0, math.max(limit - current + cost, 0), ttl}
+end
+return {1, limit - current, 0}
+"""
+
+_SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count + cost > limit then
+    local retry = window
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if oldest[2] then
+        retry = tonumber(oldest[2]) + window - now
+    end
+    return {0, math.max(limit - count, 0), retry}
+end
+for i = 1, cost do
+    redis.call('ZADD', KEYS[1], now, ARGV[5] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, limit - count - cost, 0}
+"""
+
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local rate = capacity / window
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = math.ceil((cost - tokens) / rate)
+end
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), retry}
+"""
+
+_SCRIPTS = {
+    FIXED_WINDOW: _FIXED_WINDOW_LUA,
+    SLIDING_WINDOW: _SLIDING_WINDOW_LUA,
+    TOKEN_BUCKET: _TOKEN_BUCKET_LUA,
+}
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class MemoryRateLimiter:
+    """进程内频率限制器（与 Lua 脚本语义一致，用于无 Redis 时的降级）
+
+    每个键记录状态失效时间（与 Redis 键的过期时间一致），每 SWEEP_EVERY 次调用清理一次已失效的键
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._state = {}
+        self._expires = {}
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window_ms, cost=1, mode=FIXED_WINDOW, now_ms=None):
+        """返回 (allowed, remaining, retry_after_ms)"""
+        now_ms = _now_ms() if now_ms is None else now_ms
+        with self._lock:
+            self._calls += 1
+            if self._calls >= self.SWEEP_EVERY:
+                self._calls = 0
+                self._sweep(now_ms)
+            if mode == SLIDING_WINDOW:
+                return self._sliding(key, limit, window_ms, cost, now_ms)
+            if mode == TOKEN_BUCKET:
+                return self._token_bucket(key, limit, window_ms, cost, now_ms)
+            return self._fixed(key, limit, window_ms, cost, now_ms)
+
+    def reset(self, key):
+        with self._lock:
+            self._expires.pop(key, None)
+            return self._state.pop(key, None) is not None
+
+    def _sweep(self, now_ms):
+        """删除已失效的键（调用方持有 _lock）"""
+        expired = [key for key, expires_at in self._expires.items() if expires_at <= now_ms]
+        for key in expired:
+            self._expires.pop(key, None)
+            self._state.pop(key, None)
+
+    def _fixed(self, key, limit, window_ms, cost, now_ms):
+        state = self._state.get(key)
+        if not state or state['reset_at'] <= now_ms:
+            state = {'count': 0, 'reset_at': now_ms + window_ms}
+            self._state[key] = state
+            self._expires[key] = state['reset_at']
+        if state['count'] + cost > limit:
+            return False, max(limit - state['count'], 0), state['reset_at'] - now_ms
+        state['count'] += cost
+        return True, limit - state['count'], 0
+
+    def _sliding(self, key, limit, window_ms, cost, now_ms):
+        hits = [ts for ts in self._state.get(key, []) if ts > now_ms - window_ms]
+        if len(hits) + cost > limit:
+            retry = hits[0] + window_ms - now_ms if hits else window_ms
+            allowed, remaining = False, max(limit - len(hits), 0)
+        else:
+            hits.extend([now_ms] * cost)
+            allowed, remaining, retry = True, limit - len(hits), 0
+        if hits:
+            self._state[key] = hits
+            self._expires[key] = hits[-1] + window_ms
+        else:
+            self._state.pop(key, None)
+            self._expires.pop(key, None)
+        return allowed, remaining, retry
+
+    def _token_bucket(self, key, limit, window_ms, cost, now_ms):
+        rate = limit / float(window_ms)
+        state = self._state.get(key) or {'tokens': float(limit), 'ts': now_ms}
+        tokens = min(float(limit), state['tokens'] + max(0, now_ms - state['ts']) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._state[key] = {'tokens': tokens, 'ts': now_ms}
+        # 桶重新装满后与新键等价
+        self._expires[key] = now_ms + int(math.ceil((limit - tokens) / rate))
+        if allowed:
+            return True, int(math.floor(tokens)), 0
+        return False, int(math.floor(tokens)), int(math.ceil((cost - tokens) / rate))
+
+
+class RateLimiter:
+    """频率限制器：优先使用 Redis Lua 脚本，失败时降级到进程内实现"""
+
+    def __init__(self, cache=None):
+        # cache 为 CacheManager 实例，运行时读取其 redis_client（可能在 init_app 后才可用）
+        self.cache = cache
+        self.memory = MemoryRateLimiter()
+        self._scripts = {}
+        self._scripts_client = None
+
+    def _get_script(self, client, mode):
+        if client is not self._scripts_client:
+            self._scripts = {}
+            self._scripts_client = client
+        script = self._scripts.get(mode)
+        if script is None:
+            script = client.register_script(_SCRIPTS[mode])
+            self._scripts[mode] = script
+        return script
+
+    def hit(self, key, limit, window, cost=1, mode=FIXED_WINDOW):
+        """消耗一次配额
+
+        Args:
+            key: 限制键
+            limit: 窗口内允许的次数（令牌桶为桶容量）
+            window: 窗口长度(秒)（令牌桶为填满整桶所需时间）
+            cost: 本次消耗的次数
+            mode: fixed / sliding / token_bucket
+
+        Returns:
+            RateLimitResult
+        """
+        if mode not in _SCRIPTS:
+            raise ValueError(f"不支持的限流模式: {mode}")
+        limit = max(1, int(limit))
+        window_ms = max(1, int(float(window) * 1000))
+        now_ms = _now_ms()
+
+        client = getattr(self.cache, 'redis_client', None)
+        stats = getattr(self.cache, 'stats', None)
+        allowed = None
+        if client is not None:
+            started = time.perf_counter()
+            try:
+                script = self._get_script(client, mode)
+                allowed, remaining, retry_ms = script(
+                    keys=[key],
+                    args=[limit, window_ms, int(cost), now_ms, uuid.uuid4().hex]
+                )
+            except Exception as e:
+                current_app.logger.error(f"Redis限流脚本执行失败，降级到内存: {e}")
+                allowed = None
+                if hasattr(self.cache, 'record_redis_failure'):
+                    self.cache.record_redis_failure(e)
+                if stats:
+                    stats.incr(key, 'errors')
+            finally:
+                if stats:
+                    stats.observe_latency(key, time.perf_counter() - started)
+
+        if allowed is None:
+            if stats:
+                stats.incr(key, 'fallbacks')
+            allowed, remaining, retry_ms = self.memory.hit(key, limit, window_ms, int(cost), mode, now_ms)
+
+        if stats:
+            stats.incr(key, 'allowed' if allowed else 'denied')
+
+        return RateLimitResult(
+            allowed=bool(allowed),
+            remaining=max(0, int(remaining)),
+            retry_after=int(math.ceil(max(0, int(retry_ms)) / 1000.0)),
+            limit=limit,
+            window=window
+        )
+
+    def reset(self, key):
+        """清除限制状态"""
+        cleared = self.memory.reset(key)
+        client = getattr(self.cache, 'redis_client', None)
+        if client is not None:
+            try:
+                cleared = bool(client.delete(key)) or cleared
+            except Exception as e:
+                current_app.logger.error(f"清除限流状态失败: {e}")
+        return cleared
@@ -10,6 +10,7 @@ import json
 import base64
 import logging
 import random
+import threading
 from datetime import datetime
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_v1_5
@@ -513,11 +514,16 @@ class UnicomAPI:
         try:
             logger.info(f"开始查询流量: {unicom_account.phone}")
 
-            # 检查缓存
+            # 检查缓存（软过期后仍返回旧数据，并触发一次后台刷新）
             if use_cache:
-                cached_data = cache_manager.get_flow_cache(unicom_account.id)
-                if cached_data and cache_manager.is_flow_cache_valid(unicom_account.id):
-                    logger.info(f"使用缓存数据: {unicom_account.phone}")
+                cached_data, cache_state = cache_manager.get_flow_cache_state(unicom_account.id)
+                if cached_data:
+                    is_stale = cache_state == 'stale'
+                    if is_stale:
+                        logger.info(f"使用过期缓存数据并后台刷新: {unicom_account.phone}")
+                        self._schedule_background_refresh(unicom_account, user_id)
+                    else:
+                        logger.info(f"使用缓存数据: {unicom_account.phone}")
                     # 为缓存数据添加当前查询时间
                     from .timezone_helper import now, format_local
                     current_time = now()
@@ -531,6 +537,7 @@ class UnicomAPI:
                         "message": "流量查询成功(缓存)",
                         "data": cache_flow_data,
                         "is_cached": True,
+                        "is_stale": is_stale,
                         "cached_at": cached_data.get('cached_at')
                     }
 
@@ -558,20 +565,32 @@ class UnicomAPI:
 
             # 获取代理配置
             proxies = self._get_proxy_config(device_fingerprint)
+            proxy_id = device_fingerprint.proxy_id if proxies else None
 
             # 设置请求头
             headers = device_fingerprint.generate_request_headers()
             headers['Cookie'] = cookies
 
-            # 发送流量查询请求
-            response = self.session.post(
-                'https://m.client.10010.com/servicequerybusiness/operationservice/queryOcsPackageFlowLeftContentRevisedInJune',
-                headers=headers,
-                proxies=proxies,
-                timeout=30
-            )
+            # 发送流量查询请求（代理统计进入缓冲，定时批量刷写）
+            if proxy_id:
+                from ..services.proxy_stats import proxy_stats
+                proxy_stats.record_use(proxy_id)
+            try:
+                response = self.session.post(
+                    'https://m.client.10010.com/servicequerybusiness/operationservice/queryOcsPackageFlowLeftContentRevisedInJune',
+                    headers=headers,
+                    proxies=proxies,
+                    timeout=30
+                )
+            except requests.RequestException as e:
+                if proxy_id:
+                    proxy_stats.record_result(proxy_id, success=False, error_msg=str(e))
+                raise
 
             query_time = time.time() - start_time
+            if proxy_id:
+                proxy_stats.record_result(proxy_id, success=response.ok, response_time=query_time,
+                                          error_msg=None if response.ok else f'HTTP {response.status_code}')
             logger.info(f"流量查询完成，耗时: {query_time:.3f}秒，状态码: {response.status_code}")
 
             response_text = response.text.strip()
@@ -674,5 +693,36 @@ class UnicomAPI:
             logger.error(f"流量查询异常: {e}")
             return {"success": False, "message": f"流量查询失败: {str(e)}"}
 
+    def _schedule_background_refresh(self, unicom_account, user_id=None):
+        """后台刷新流量缓存（single-flight：同一账号同一时间只有一个刷新任务）"""
+        if not cache_manager.acquire_flow_refresh_lock(unicom_account.id):
+            return False
+
+        app = current_app._get_current_object()
+        account_id = unicom_account.id
+        owner_id = user_id or unicom_account.user_id
+
+        def _refresh():
+            with app.app_context():
+                from ..models import db, UnicomAccount
+                try:
+                    account = UnicomAccount.query.get(account_id)
+                    if not account or account.status != 1:
+                        return
+                    result = self.query_flow(account, use_cache=False, user_id=owner_id)
+                    if result.get('success'):
+                        cache_manager.set_flow_cache(account_id, result['data'], user_id=owner_id)
+                        logger.info(f"后台刷新流量缓存完成: {account.phone}")
+                    else:
+                        logger.warning(f"后台刷新流量缓存失败: {account.phone} - {result.get('message')}")
+                except Exception as e:
+                    logger.error(f"后台刷新流量缓存异常: {e}")
+                finally:
+                    cache_manager.release_flow_refresh_lock(account_id)
+                    db.session.remove()
+
+        threading.Thread(target=_refresh, name=f"flow-refresh-{account_id}", daemon=True).start()
+        return True
+
 # 创建全局实例
 unicom_api = UnicomAPI()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回填 flow_records 数值字段(MB)
+用法: python backfill_flow_numeric.py [--batch-size 1000] [--start-id 0] [--max-batches N]
+中断后使用输出的 last_id 作为 --start-id 继续
+"""
+import argparse
+
+from app import create_app
+from app.services.flow_backfill import backfill_numeric_fields
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回填 flow_records 数值字段')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每批处理行数')
+    parser.add_argument('--start-id', type=int, default=0, help='从该id之后开始（断点续跑）')
+    parser.add_argument('--max-batches', type=int, default=None, help='最多处理批数')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        def progress(last_id, scanned, updated):
+            print(f'  last_id={last_id} 已扫描 {scanned} 行，已更新 {updated} 行')
+
+        result = backfill_numeric_fields(
+            batch_size=args.batch_size,
+            start_id=args.start_id,
+            max_batches=args.max_batches,
+            progress=progress
+        )
+        status = '✅ 回填完成' if result['finished'] else f"⏸️ 已暂停，继续请使用 --start-id {result['last_id']}"
+        print(f"{status}: 扫描 {result['scanned']} 行，更新 {result['updated']} 行")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流量响应解析基准测试：对比重构前各处分别解析（接口 flow_info、监控指标、
+记录数值字段、统计基准各解析一次）与 FlowSnapshot 一次解析后复用
+用法: python bench_flow_parser.py [--rounds 5000] [--packages 8]
+"""
+import argparse
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.utils.flow_parser import parse_flow_response, parse_mb
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------- 重构前的实现（仅用于对比） ----------------------
+
+def _parse_mb(value) -> Optional[float]:
+    """将带单位的字符串转为 MB 浮点数（不合法返回None）"""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return float(value)
+        s = str(value).strip().upper()
+        if not s:
+            return None
+        if s.endswith('GB'):
+            return float(s[:-2].strip()) * 1024
+        if s.endswith('MB'):
+            return float(s[:-2].strip())
+        # 纯数字默认MB
+        return float(s)
+    except Exception:
+        return None
+
+
+def _extract_flow_by_type(raw_data: Dict[str, Any]) -> Dict[str, float]:
+    """从联通原始响应中提取各类总量/剩余/已用（粗粒度）
+    返回：{
+        'total_all_mb', 'remain_all_mb', 'used_all_mb',
+        'general_total_mb', 'general_remain_mb', 'used_general_mb',
+        'special_total_mb', 'special_remain_mb', 'used_free_mb'
+    }
+    """
+    result = {
+        'total_all_mb': None,
+        'remain_all_mb': None,
+        'used_all_mb': None,
+        'general_total_mb': None,
+        'general_remain_mb': None,
+        'used_general_mb': None,
+        'special_total_mb': None,
+        'special_remain_mb': None,
+        'used_free_mb': None,
+    }
+    try:
+        data = raw_data or {}
+        result['total_all_mb'] = _parse_mb(data.get('sum'))
+        # 剩余流量：优先canUseFlowAll，备选canUseValueAll
+        result['remain_all_mb'] = _parse_mb(data.get('canUseFlowAll') or data.get('canUseValueAll'))
+        result['used_all_mb'] = _parse_mb(data.get('allUserFlow'))
+
+        # 从flowSumList中提取通用和专用流量的使用量和剩余量
+        flow_sum_list = data.get('flowSumList') or []
+        for item in flow_sum_list:
+            flow_type = str(item.get('flowtype', '')).strip()
+            used_value = _parse_mb(item.get('xusedvalue'))
+            remain_value = _parse_mb(item.get('xcanusevalue'))
+
+            if flow_type == '1':  # 通用流量
+                result['used_general_mb'] = used_value
+                result['general_remain_mb'] = remain_value
+            elif flow_type == '2':  # 专用流量
+                result['used_free_mb'] = used_value
+                result['special_remain_mb'] = remain_value
+
+        # 资源维度
+        def walk_resources(arr):
+            gt_total = 0.0
+            gt_remain = 0.0
+            sp_total = 0.0
+            sp_remain = 0.0
+            for it in arr or []:
+                # 资源明细有时在 it['details']
+                details = it.get('details') if isinstance(it, dict) else None
+                if isinstance(details, list) and details:
+                    for d in details:
+                        ftype = str(d.get('flowType') or d.get('type') or '').strip()
+                        total_mb = _parse_mb(d.get('total'))
+                        remain_mb = _parse_mb(d.get('remain'))
+                        if ftype == '1':  # 通用
+                            if total_mb: gt_total += total_mb
+                            if remain_mb is not None: gt_remain += max(0.0, remain_mb)
+                        if ftype == '2':  # 免流/专用
+                            if total_mb: sp_total += total_mb
+                            if remain_mb is not None: sp_remain += max(0.0, remain_mb)
+            return gt_total, gt_remain, sp_total, sp_remain
+
+        # 从resources提取
+        resources = data.get('resources') if isinstance(data.get('resources'), list) else []
+        gt_total1, gt_remain1, sp_total1, sp_remain1 = walk_resources(resources)
+
+        # 从unshared提取
+        unshared = data.get('unshared') if isinstance(data.get('unshared'), list) else []
+        gt_total2, gt_remain2, sp_total2, sp_remain2 = walk_resources(unshared)
+
+        # 从TwResources提取套外流量
+        tw = data.get('TwResources') if isinstance(data.get('TwResources'), list) else []
+        gt_total3, gt_remain3, sp_total3, sp_remain3 = walk_resources(tw)
+
+        # 合并总量数据
+        g_total = (gt_total1 + gt_total2 + gt_total3) or None
+        s_total = (sp_total1 + sp_total2 + sp_total3) or None
+
+        # 剩余量优先使用flowSumList的数据，备选使用resources计算
+        if result['general_remain_mb'] is None:
+            g_remain = (gt_remain1 + gt_remain2 + gt_remain3) or None
+            if g_remain is not None:
+                result['general_remain_mb'] = g_remain
+
+        if result['special_remain_mb'] is None:
+            s_remain = (sp_remain1 + sp_remain2 + sp_remain3) or None
+            if s_remain is not None:
+                result['special_remain_mb'] = s_remain
+
+        if g_total:
+            result['general_total_mb'] = g_total
+        if s_total:
+            result['special_total_mb'] = s_total
+    except Exception:
+        pass
+    return result
+
+
+def _parse_flow_data(flow_data):
+    """解析流量数据 - 兼容所有联通API响应格式"""
+    try:
+        # 根据联通API响应格式解析
+        if not flow_data:
+            return {
+                'total_flow': '0',
+                'used_flow': '0',
+                'remaining_flow': '0',
+                'usage_percentage': 0,
+                'flow_packages': [],
+                'extra_packages': [],
+                'package_name': '',
+                'used_general': '0',
+                'used_special': '0',
+                'used_other': '0',
+                'remain_general': '0',
+                'remain_special': '0',
+                'remain_other': '0'
+            }
+
+        # 基础流量信息
+        total_flow = flow_data.get('sum', '0')  # 总流量
+        used_flow = flow_data.get('allUserFlow', '0')  # 已用流量
+
+        # 剩余流量：优先canUseFlowAll，备选canUseValueAll
+        remaining_flow = flow_data.get('canUseFlowAll') or flow_data.get('canUseValueAll', '0')
+
+        # 套餐名称：优先packageName，备选从unshared中提取
+        package_name = flow_data.get('packageName', '')
+
+        # 从flowSumList提取分类使用量和剩余量
+        used_general = '0'
+        used_special = '0'
+        used_other = '0'
+        remain_general = '0'
+        remain_special = '0'
+        remain_other = '0'
+
+        flow_sum_list = flow_data.get('flowSumList', [])
+        for item in flow_sum_list:
+            flow_type = str(item.get('flowtype', '')).strip()
+            used_value = str(item.get('xusedvalue', '0'))
+            remain_value = str(item.get('xcanusevalue', '0'))
+
+            if flow_type == '1':  # 通用流量
+                used_general = used_value
+                remain_general = remain_value
+            elif flow_type == '2':  # 专用流量
+                used_special = used_value
+                remain_special = remain_value
+            elif flow_type == '3':  # 其他流量
+                used_other = used_value
+                remain_other = remain_value
+
+        # 解析流量包详情
+        flow_packages = []
+        extra_packages = []
+
+        # 方法1：从resources提取流量包
+        resources = flow_data.get('resources', [])
+        if resources:
+            for resource in resources:
+                if resource.get('type') == 'flow' and resource.get('details'):
+                    for detail in resource['details']:
+                        # 处理无限量流量包（total为0或空的情况）
+                        total_value = detail.get('total', '0')
+                        used_value = detail.get('use', '0')
+                        remain_value = detail.get('remain', '0')
+
+                        # 识别无限量流量包
+                        is_unlimited = False
+                        try:
+                            # 情况1: total为0或空，且有使用量
+                            if (not total_value or float(total_value) == 0) and used_value and float(used_value) > 0:
+                                is_unlimited = True
+                            # 情况2: remain为负数或异常大的情况（可能是无限量）
+                            elif remain_value and float(remain_value) < 0:
+                                is_unlimited = True
+                        except (ValueError, TypeError):
+                            pass
+
+                        package_info = {
+                            'name': detail.get('addUpItemName') or detail.get('feePolicyName', '流量包'),
+                            'total': total_value if not is_unlimited else 'unlimited',
+                            'used': used_value,
+                            'remaining': remain_value if not is_unlimited else 'unlimited',
+                            'unit': 'MB',
+                            'type': detail.get('flowType', '1'),
+                            'end_date': detail.get('endDate', ''),
+                            'used_percent': detail.get('usedPercent', '0'),
+                            'source': 'resources',
+                            'is_unlimited': is_unlimited
+                        }
+                        flow_packages.append(package_info)
+
+                        # 如果没有套餐名称，从主要流量包中提取
+                        if not package_name and detail.get('feePolicyName'):
+                            package_name = detail['feePolicyName']
+
+        # 方法2：从unshared提取流量包（如果resources为空或无详情）
+        if not flow_packages:
+            unshared = flow_data.get('unshared', [])
+            for item in unshared:
+                if item.get('type') == 'unsharedFlowList' and item.get('details'):
+                    for detail in item['details']:
+                        # 处理无限量流量包（total为0或空的情况）
+                        total_value = detail.get('total', '0')
+                        used_value = detail.get('use', '0')
+                        remain_value = detail.get('remain', '0')
+
+                        # 识别无限量流量包
+                        is_unlimited = False
+                        try:
+                            # 情况1: total为0或空，且有使用量
+                            if (not total_value or float(total_value) == 0) and used_value and float(used_value) > 0:
+                                is_unlimited = True
+                            # 情况2: remain为负数或异常大的情况（可能是无限量）
+                            elif remain_value and float(remain_value) < 0:
+                                is_unlimited = True
+                        except (ValueError, TypeError):
+                            pass
+
+                        package_info = {
+                            'name': detail.get('addUpItemName') or detail.get('feePolicyName', '流量包'),
+                            'total': total_value if not is_unlimited else 'unlimited',
+                            'used': used_value,
+                            'remaining': remain_value if not is_unlimited else 'unlimited',
+                            'unit': 'MB',
+                            'type': detail.get('flowType', '1'),
+                            'end_date': detail.get('endDate', ''),
+                            'used_percent': detail.get('usedPercent', '0'),
+                            'source': 'unshared',
+                            'is_unlimited': is_unlimited
+                        }
+                        flow_packages.append(package_info)
+
+                        # 提取套餐名称（优先主套餐）
+                        if not package_name and detail.get('feePolicyName'):
+                            if '大王卡' in detail['feePolicyName'] or detail.get('flowType') == '2':
+                                package_name = detail['feePolicyName']
+
+        # 解析套外流量包 (TwResources)
+        tw_resources = flow_data.get('TwResources', [])
+        for tw_resource in tw_resources:
+            if tw_resource.get('type') == 'flow' and tw_resource.get('details'):
+                for detail in tw_resource['details']:
+                    # 处理无限量流量包（total为0或空的情况）
+                    total_value = detail.get('total', '0')
+                    used_value = detail.get('use', '0')
+                    remain_value = detail.get('remain', '0')
+
+                    # 识别无限量流量包的多种情况
+                    is_unlimited = False
+                    try:
+                        # 情况1: total为0或空，且有使用量
+                        if (not total_value or float(total_value) == 0) and used_value and float(used_value) > 0:
+                            is_unlimited = True
+                        # 情况2: 包名包含"专享"、"免费"、"大王卡"等关键词，且没有明确总量
+                        elif detail.get('addUpItemName') and any(keyword in detail.get('addUpItemName', '') for keyword in ['专享', '免费', '大王卡', '定向']):
+                            if not total_value or float(total_value) == 0:
+                                is_unlimited = True
+                        # 情况3: remain为负数或异常大的情况（可能是无限量）
+                        elif remain_value and float(remain_value) < 0:
+                            is_unlimited = True
+                    except (ValueError, TypeError):
+                        pass
+
+                    extra_info = {
+                        'name': detail.get('addUpItemName', '套外流量包'),
+                        'total': total_value if not is_unlimited else 'unlimited',
+                        'used': used_value,
+                        'remaining': remain_value if not is_unlimited else 'unlimited',
+                        'unit': 'MB',
+                        'type': detail.get('flowType', '1'),
+                        'used_percent': detail.get('usedPercent', '0'),
+                        'is_extra': True,
+                        'is_unlimited': is_unlimited,
+                        'source': 'TwResources'
+                    }
+                    extra_packages.append(extra_info)
+
+        # 计算使用百分比
+        try:
+            usage_percentage = float(flow_data.get('sumPercent', 0))
+        except (ValueError, AttributeError):
+            try:
+                total_num = float(str(total_flow).replace('MB', '').replace('GB', '').replace(',', ''))
+                used_num = float(str(used_flow).replace('MB', '').replace('GB', '').replace(',', ''))
+                usage_percentage = (used_num / total_num * 100) if total_num > 0 else 0
+            except (ValueError, AttributeError):
+                usage_percentage = 0
+
+        return {
+            'total_flow': total_flow,
+            'used_flow': used_flow,
+            'remaining_flow': remaining_flow,
+            'usage_percentage': round(usage_percentage, 2),
+            'flow_packages': flow_packages,
+            'extra_packages': extra_packages,
+            'package_name': package_name,
+            'used_general': used_general,
+            'used_special': used_special,
+            'used_other': used_other,
+            'remain_general': remain_general,
+            'remain_special': remain_special,
+            'remain_other': remain_other
+        }
+
+    except Exception as e:
+        logger.error(f"解析流量数据异常: {e}")
+        return {
+            'total_flow': '0',
+            'used_flow': '0',
+            'remaining_flow': '0',
+            'usage_percentage': 0,
+            'flow_packages': [],
+            'extra_packages': [],
+            'package_name': '',
+            'used_general': '0',
+            'used_special': '0',
+            'used_other': '0',
+            'remain_general': '0',
+            'remain_special': '0',
+            'remain_other': '0'
+        }
+
+
+def _legacy_numeric_values(raw_data):
+    values = {
+        'total_mb': parse_mb(raw_data.get('sum')),
+        'used_mb': parse_mb(raw_data.get('allUserFlow')),
+        'remain_mb': parse_mb(raw_data.get('canUseFlowAll') or raw_data.get('canUseValueAll')),
+    }
+    for item in raw_data.get('flowSumList') or []:
+        suffix = {'1': 'general', '2': 'special', '3': 'other'}.get(str(item.get('flowtype', '')).strip())
+        if suffix:
+            values[f'used_{suffix}_mb'] = parse_mb(item.get('xusedvalue'))
+            values[f'remain_{suffix}_mb'] = parse_mb(item.get('xcanusevalue'))
+    if 'used_special_mb' in values:
+        values['free_mb'] = values['used_special_mb']
+    return {k: v for k, v in values.items() if v is not None}
+
+
+def _legacy_baseline_totals(flow_data):
+    general_used = 0
+    free_used = 0
+    if flow_data.get('flowSumList'):
+        for item in flow_data['flowSumList']:
+            if item.get('flowtype') == '1':
+                general_used = float(item.get('xusedvalue', 0))
+            elif item.get('flowtype') == '2':
+                free_used = float(item.get('xusedvalue', 0))
+    return general_used, free_used, float(flow_data.get('allUserFlow', 0))
+
+
+# 每个场景：(说明, 重构前, 重构后)
+def _api_legacy(raw):
+    """流量查询接口：flow_info + 基准变化 + 记录数值字段"""
+    return _parse_flow_data(raw), _legacy_baseline_totals(raw), _legacy_numeric_values(raw)
+
+
+def _api_snapshot(raw):
+    snapshot = parse_flow_response(raw)
+    return snapshot.to_flow_info(), snapshot.usage_totals(), snapshot.numeric_values()
+
+
+def _monitor_legacy(raw):
+    """监控任务：告警指标 + 记录数值字段"""
+    return _extract_flow_by_type(raw), _legacy_numeric_values(raw)
+
+
+def _monitor_snapshot(raw):
+    snapshot = parse_flow_response(raw)
+    return snapshot.metrics(), snapshot.numeric_values()
+
+
+def _all_legacy(raw):
+    return _parse_flow_data(raw), _extract_flow_by_type(raw), _legacy_numeric_values(raw), _legacy_baseline_totals(raw)
+
+
+def _all_snapshot(raw):
+    snapshot = parse_flow_response(raw)
+    return snapshot.to_flow_info(), snapshot.metrics(), snapshot.numeric_values(), snapshot.usage_totals()
+
+
+SCENARIOS = [
+    ('流量查询接口', _api_legacy, _api_snapshot),
+    ('监控任务', _monitor_legacy, _monitor_snapshot),
+    ('全部使用方', _all_legacy, _all_snapshot),
+]
+
+
+# ---------------------- 样例数据与计时 ----------------------
+
+def sample_response(packages=8):
+    """构造与联通接口结构一致的样例响应"""
+    def detail(i, flow_type):
+        return {
+            'feePolicyName': '大王卡19元' if i == 0 else f'流量包{i}',
+            'addUpItemName': f'国内流量{i}',
+            'flowType': flow_type,
+            'total': f'{1024 * (i + 1)}.00',
+            'use': f'{100.5 * i:.2f}',
+            'remain': f'{1024 * (i + 1) - 100.5 * i:.2f}',
+            'usedPercent': '10',
+            'endDate': '2099-12-31'
+        }
+    return {
+        'sum': '40960.00', 'allUserFlow': '3456.78', 'canUseFlowAll': '37503.22', 'sumPercent': '8.44',
+        'packageName': '', 'endDate': '2099-12-31',
+        'flowSumList': [
+            {'flowtype': '1', 'xusedvalue': '2345.67', 'xcanusevalue': '18134.33'},
+            {'flowtype': '2', 'xusedvalue': '1111.11', 'xcanusevalue': '19368.89'},
+            {'flowtype': '3', 'xusedvalue': '0.00', 'xcanusevalue': '0.00'},
+        ],
+        'resources': [{'type': 'flow', 'details': [detail(i, '1' if i % 2 else '2') for i in range(packages)]}],
+        'unshared': [{'type': 'unsharedFlowList', 'details': [detail(i, '2') for i in range(packages // 2)]}],
+        'TwResources': [{'type': 'flow', 'details': [detail(i, '1') for i in range(2)]}],
+    }
+
+
+def _timeit(func, raw, rounds, repeat=15):
+    """多次重复取最快一次，单位 µs/次"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func(raw)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / rounds * 1e6
+
+
+def _check(raw):
+    """新旧实现结果一致（数值允许0.01MB舍入误差）"""
+    old, new = _all_legacy(raw), _all_snapshot(raw)
+    assert old[0] == new[0], 'flow_info 不一致'
+    assert all((old[1][k] is None) == (new[1][k] is None) and abs((old[1][k] or 0) - (new[1][k] or 0)) < 0.01
+               for k in old[1]), '监控指标不一致'
+    assert old[2] == new[2], '数值字段不一致'
+    assert all(abs(a - b) < 0.01 for a, b in zip(old[3], new[3])), '基准值不一致'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流量响应解析基准测试')
+    parser.add_argument('--rounds', type=int, default=1000, help="每轮执行次数")
+    parser.add_argument('--packages', type=int, default=8, help='样例响应中的流量包数量')
+    args = parser.parse_args()
+
+    raw = sample_response(args.packages)
+    _check(raw)
+    print(f"{'场景':<10}{'重构前(µs)':>12}{'一次解析(µs)':>14}{'加速比':>8}")
+    for name, legacy_func, snapshot_func in SCENARIOS:
+        legacy_us = _timeit(legacy_func, raw, args.rounds)
+        snapshot_us = _timeit(snapshot_func, raw, args.rounds)
+        print(f'{name:<10}{legacy_us:>12.2f}{snapshot_us:>14.2f}{legacy_us / snapshot_us:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出流量历史(flow_records)为 CSV 或 Parquet
+用法: python export_flow_history.py --output flow.csv [--format csv|parquet]
+          [--account-id ID ...] [--user-id ID] [--start 2024-01-01] [--end 2024-01-31]
+服务端游标分批读取，内存占用与导出总量无关
+"""
+import argparse
+import os
+import sys
+
+from app import create_app
+from app.models import UnicomAccount
+from app.services import flow_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出流量历史')
+    parser.add_argument('--output', required=True, help='输出文件路径，- 为标准输出')
+    parser.add_argument('--format', choices=flow_export.FORMATS, default=None,
+                        help='导出格式，默认按输出文件扩展名判断（其他为csv）')
+    parser.add_argument('--account-id', type=int, action='append', default=None, help='联通账号ID，可重复指定')
+    parser.add_argument('--user-id', type=int, default=None, help='只导出该用户的账号')
+    parser.add_argument('--start', default=None, help='开始时间（本地时间，含）')
+    parser.add_argument('--end', default=None, help='结束时间（本地时间，不含；仅日期时包含当天）')
+    parser.add_argument('--batch-size', type=int, default=None, help='每批读取行数')
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        fmt = flow_export.FORMAT_PARQUET if args.output.endswith('.parquet') else flow_export.FORMAT_CSV
+
+    app = create_app()
+    with app.app_context():
+        try:
+            flow_export.check_format(fmt)
+            start, end = flow_export.parse_range(args.start, args.end)
+        except (ValueError, flow_export.ExportUnavailable) as e:
+            parser.error(str(e))
+
+        query = UnicomAccount.query.with_entities(UnicomAccount.id)
+        if args.account_id:
+            query = query.filter(UnicomAccount.id.in_(args.account_id))
+        if args.user_id is not None:
+            query = query.filter(UnicomAccount.user_id == args.user_id)
+        account_ids = [row.id for row in query.all()]
+
+        batch_size = args.batch_size or app.config.get('FLOW_EXPORT_BATCH_SIZE', 5000)
+        written = 0
+        out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+        try:
+            for chunk in flow_export.iter_export(fmt, account_ids, start, end, batch_size):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+
+        if args.output != '-':
+            print(f'✅ 导出完成: {os.path.abspath(args.output)}（{len(account_ids)} 个账号，{written} 字节）',
+                  file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分区维护与过期数据清理
+用法:
+  python maintain_partitions.py                 执行一次维护（预建分区、删除过期分区/数据）
+  python maintain_partitions.py --dry-run       只打印将执行的操作
+  python maintain_partitions.py --convert       (MySQL) 将 flow_records/system_logs 转换为按月分区表，耗时操作
+"""
+import argparse
+
+from app import create_app
+from app.services.retention import RETENTION_TABLES, convert_to_partitioned, run_maintenance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分区维护与过期数据清理')
+    parser.add_argument('--convert', action='store_true', help='(MySQL) 一次性转换为分区表')
+    parser.add_argument('--dry-run', action='store_true', help='只打印，不执行')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.convert:
+            for table in RETENTION_TABLES:
+                statements = convert_to_partitioned(table, dry_run=args.dry_run)
+                if not statements:
+                    print(f'✅ {table} 已是分区表，跳过')
+                for sql in statements:
+                    print(f'{"[dry-run] " if args.dry_run else "✅ "}{sql}')
+
+        report = run_maintenance(dry_run=args.dry_run)
+        for table, item in report.items():
+            print(f'{table}: {item}')
+
+
+if __name__ == '__main__':
+    main()
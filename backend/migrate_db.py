@@ -16,7 +16,25 @@ def migrate_database():
             'ALTER TABLE flow_records ADD COLUMN used_other VARCHAR(50) COMMENT "已用其他流量"',
             'ALTER TABLE flow_records ADD COLUMN remain_general VARCHAR(50) COMMENT "剩余通用流量"',
             'ALTER TABLE flow_records ADD COLUMN remain_special VARCHAR(50) COMMENT "剩余专属流量"',
-            'ALTER TABLE flow_records ADD COLUMN remain_other VARCHAR(50) COMMENT "剩余其他流量"'
+            'ALTER TABLE flow_records ADD COLUMN remain_other VARCHAR(50) COMMENT "剩余其他流量"',
+            'ALTER TABLE flow_records ADD COLUMN total_mb DECIMAL(14,2) COMMENT "总流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN used_mb DECIMAL(14,2) COMMENT "已用流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN remain_mb DECIMAL(14,2) COMMENT "剩余流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN free_mb DECIMAL(14,2) COMMENT "免费流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN used_general_mb DECIMAL(14,2) COMMENT "已用通用流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN used_special_mb DECIMAL(14,2) COMMENT "已用专属流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN used_other_mb DECIMAL(14,2) COMMENT "已用其他流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN remain_general_mb DECIMAL(14,2) COMMENT "剩余通用流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN remain_special_mb DECIMAL(14,2) COMMENT "剩余专属流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN remain_other_mb DECIMAL(14,2) COMMENT "剩余其他流量(MB)"',
+            'ALTER TABLE flow_records ADD COLUMN data_change_mb DECIMAL(14,2) COMMENT "流量变化量(MB)"',
+            'CREATE TABLE IF NOT EXISTS flow_payloads (hash VARCHAR(64) NOT NULL PRIMARY KEY, encoding VARCHAR(10) NOT NULL DEFAULT "zlib", data MEDIUMBLOB NOT NULL, size INT, created_at DATETIME) DEFAULT CHARSET=utf8mb4',
+            'ALTER TABLE flow_records ADD COLUMN payload_hash VARCHAR(64) COMMENT "原始响应哈希(flow_payloads.hash)"',
+            'CREATE INDEX ix_flow_records_payload_hash ON flow_records (payload_hash)',
+            'CREATE TABLE IF NOT EXISTS flow_usage_rollups (id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, unicom_account_id INT NOT NULL, period VARCHAR(10) NOT NULL, bucket_start DATETIME NOT NULL, query_count INT NOT NULL DEFAULT 0, first_at DATETIME, last_at DATETIME, first_used_mb DECIMAL(14,2), last_used_mb DECIMAL(14,2), min_used_mb DECIMAL(14,2), max_used_mb DECIMAL(14,2), delta_mb DECIMAL(14,2) NOT NULL DEFAULT 0, last_total_mb DECIMAL(14,2), last_remain_mb DECIMAL(14,2), usage_sum DOUBLE NOT NULL DEFAULT 0, usage_samples INT NOT NULL DEFAULT 0, min_usage DOUBLE, max_usage DOUBLE, UNIQUE KEY uq_rollup_account_period_bucket (unicom_account_id, period, bucket_start)) DEFAULT CHARSET=utf8mb4',
+            'CREATE INDEX idx_account_time_id ON flow_records (unicom_account_id, created_at, id)',
+            'CREATE TABLE IF NOT EXISTS flow_forecasts (id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, unicom_account_id INT NOT NULL, last_at DATETIME, samples INT NOT NULL DEFAULT 0, general_used_mb DOUBLE, general_remain_mb DOUBLE, general_rate DOUBLE, general_profile TEXT, general_depletion_at DATETIME, special_used_mb DOUBLE, special_remain_mb DOUBLE, special_rate DOUBLE, special_profile TEXT, special_depletion_at DATETIME, updated_at DATETIME, UNIQUE KEY uq_flow_forecasts_account (unicom_account_id)) DEFAULT CHARSET=utf8mb4',
+            'CREATE TABLE IF NOT EXISTS system_log_counters (id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, user_id INT NOT NULL DEFAULT 0, action VARCHAR(50) NOT NULL, result SMALLINT NOT NULL DEFAULT 1, bucket_start DATETIME NOT NULL, count INT NOT NULL DEFAULT 0, response_time_sum DOUBLE NOT NULL DEFAULT 0, response_time_count INT NOT NULL DEFAULT 0, response_time_max DOUBLE, UNIQUE KEY uq_log_counter_bucket (user_id, action, result, bucket_start), KEY idx_log_counter_action_time (action, bucket_start)) DEFAULT CHARSET=utf8mb4'
         ]
         
         success_count = 0
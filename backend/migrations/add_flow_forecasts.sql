@@ -0,0 +1,23 @@
+-- 账号流量消耗速率（EWMA + 168时段画像）与预计耗尽时间，插入 flow_records 时增量维护
+-- 无需回填：新读数写入后自动建立，约一天后速率趋于稳定
+-- 执行时间：2026-10-19
+
+CREATE TABLE IF NOT EXISTS flow_forecasts (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    unicom_account_id INT NOT NULL,
+    last_at DATETIME COMMENT '最近一次读数时间',
+    samples INT NOT NULL DEFAULT 0 COMMENT '已计入的读数',
+    general_used_mb DOUBLE COMMENT '最近已用通用流量(MB)',
+    general_remain_mb DOUBLE COMMENT '最近剩余通用流量(MB)',
+    general_rate DOUBLE COMMENT '通用流量 EWMA 速率(MB/小时)',
+    general_profile TEXT COMMENT '通用流量168时段速率画像JSON',
+    general_depletion_at DATETIME COMMENT '通用流量预计耗尽时间',
+    special_used_mb DOUBLE COMMENT '最近已用专属流量(MB)',
+    special_remain_mb DOUBLE COMMENT '最近剩余专属流量(MB)',
+    special_rate DOUBLE COMMENT '专属流量 EWMA 速率(MB/小时)',
+    special_profile TEXT COMMENT '专属流量168时段速率画像JSON',
+    special_depletion_at DATETIME COMMENT '专属流量预计耗尽时间',
+    updated_at DATETIME,
+    UNIQUE KEY uq_flow_forecasts_account (unicom_account_id),
+    FOREIGN KEY (unicom_account_id) REFERENCES unicom_accounts (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
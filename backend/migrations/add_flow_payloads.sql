@@ -0,0 +1,14 @@
+-- 原始响应迁出 flow_records：内容寻址、zlib压缩、相同读数共享
+-- 添加后执行 python migrate_flow_payloads.py 迁移历史 raw_response，完成后可 OPTIMIZE TABLE flow_records 回收空间
+-- 执行时间：2026-10-19
+
+CREATE TABLE IF NOT EXISTS flow_payloads (
+    hash VARCHAR(64) NOT NULL PRIMARY KEY COMMENT '规范化JSON的SHA-256',
+    encoding VARCHAR(10) NOT NULL DEFAULT 'zlib' COMMENT '压缩方式',
+    data MEDIUMBLOB NOT NULL COMMENT '压缩后的JSON',
+    size INT COMMENT '原始JSON字节数',
+    created_at DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+ALTER TABLE flow_records ADD COLUMN payload_hash VARCHAR(64) COMMENT '原始响应哈希(flow_payloads.hash)';
+CREATE INDEX ix_flow_records_payload_hash ON flow_records (payload_hash);
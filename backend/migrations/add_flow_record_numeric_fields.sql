@@ -0,0 +1,14 @@
+-- 为FlowRecord表添加数值流量字段(MB)，添加后执行 python backfill_flow_numeric.py 回填历史数据
+-- 执行时间：2026-10-19
+
+ALTER TABLE flow_records ADD COLUMN total_mb DECIMAL(14,2) COMMENT '总流量(MB)';
+ALTER TABLE flow_records ADD COLUMN used_mb DECIMAL(14,2) COMMENT '已用流量(MB)';
+ALTER TABLE flow_records ADD COLUMN remain_mb DECIMAL(14,2) COMMENT '剩余流量(MB)';
+ALTER TABLE flow_records ADD COLUMN free_mb DECIMAL(14,2) COMMENT '免费流量(MB)';
+ALTER TABLE flow_records ADD COLUMN used_general_mb DECIMAL(14,2) COMMENT '已用通用流量(MB)';
+ALTER TABLE flow_records ADD COLUMN used_special_mb DECIMAL(14,2) COMMENT '已用专属流量(MB)';
+ALTER TABLE flow_records ADD COLUMN used_other_mb DECIMAL(14,2) COMMENT '已用其他流量(MB)';
+ALTER TABLE flow_records ADD COLUMN remain_general_mb DECIMAL(14,2) COMMENT '剩余通用流量(MB)';
+ALTER TABLE flow_records ADD COLUMN remain_special_mb DECIMAL(14,2) COMMENT '剩余专属流量(MB)';
+ALTER TABLE flow_records ADD COLUMN remain_other_mb DECIMAL(14,2) COMMENT '剩余其他流量(MB)';
+ALTER TABLE flow_records ADD COLUMN data_change_mb DECIMAL(14,2) COMMENT '流量变化量(MB)';
@@ -0,0 +1,26 @@
+-- 流量用量按小时/天预聚合，插入 flow_records 时增量维护
+-- 创建后执行 python rebuild_flow_rollups.py 根据历史记录生成汇总
+-- 执行时间：2026-10-19
+
+CREATE TABLE IF NOT EXISTS flow_usage_rollups (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    unicom_account_id INT NOT NULL,
+    period VARCHAR(10) NOT NULL COMMENT '汇总粒度: hour/day',
+    bucket_start DATETIME NOT NULL COMMENT '桶起始时间',
+    query_count INT NOT NULL DEFAULT 0 COMMENT '记录数',
+    first_at DATETIME COMMENT '桶内第一条记录时间',
+    last_at DATETIME COMMENT '桶内最后一条记录时间',
+    first_used_mb DECIMAL(14,2) COMMENT '桶内第一条已用(MB)',
+    last_used_mb DECIMAL(14,2) COMMENT '桶内最后一条已用(MB)',
+    min_used_mb DECIMAL(14,2) COMMENT '最小已用(MB)',
+    max_used_mb DECIMAL(14,2) COMMENT '最大已用(MB)',
+    delta_mb DECIMAL(14,2) NOT NULL DEFAULT 0 COMMENT '桶内各记录流量变化量之和(MB)',
+    last_total_mb DECIMAL(14,2) COMMENT '桶内最后一条总流量(MB)',
+    last_remain_mb DECIMAL(14,2) COMMENT '桶内最后一条剩余(MB)',
+    usage_sum DOUBLE NOT NULL DEFAULT 0,
+    usage_samples INT NOT NULL DEFAULT 0,
+    min_usage DOUBLE,
+    max_usage DOUBLE,
+    UNIQUE KEY uq_rollup_account_period_bucket (unicom_account_id, period, bucket_start),
+    FOREIGN KEY (unicom_account_id) REFERENCES unicom_accounts (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
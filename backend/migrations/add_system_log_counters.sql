@@ -0,0 +1,17 @@
+-- 高频例行操作（默认 flow_query）按 (用户, 操作, 结果, 分钟) 聚合计数，不再逐条写入 system_logs
+-- 失败、告警级别与管理操作仍逐条记录；策略见 SYSTEM_LOG_POLICIES
+-- 执行时间：2026-10-19
+
+CREATE TABLE IF NOT EXISTS system_log_counters (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL DEFAULT 0 COMMENT '用户ID(0为匿名)',
+    action VARCHAR(50) NOT NULL COMMENT '操作类型',
+    result SMALLINT NOT NULL DEFAULT 1 COMMENT '操作结果: 1-成功, 0-失败',
+    bucket_start DATETIME NOT NULL COMMENT '分钟起始时间',
+    count INT NOT NULL DEFAULT 0 COMMENT '次数',
+    response_time_sum DOUBLE NOT NULL DEFAULT 0 COMMENT '响应时间合计(秒)',
+    response_time_count INT NOT NULL DEFAULT 0 COMMENT '带响应时间的次数',
+    response_time_max DOUBLE COMMENT '最大响应时间(秒)',
+    UNIQUE KEY uq_log_counter_bucket (user_id, action, result, bucket_start),
+    KEY idx_log_counter_action_time (action, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
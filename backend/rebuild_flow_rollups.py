@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重建流量用量汇总(flow_usage_rollups)
+用法: python rebuild_flow_rollups.py [--account-id ID] [--days N]
+"""
+import argparse
+from datetime import timedelta
+
+from app import create_app
+from app.models.flow_rollup import FlowUsageRollup
+from app.utils.timezone_helper import get_db_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建流量用量汇总')
+    parser.add_argument('--account-id', type=int, default=None, help='只重建指定联通账号')
+    parser.add_argument('--days', type=int, default=None, help='只重建最近N天，默认全部')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        since = get_db_time() - timedelta(days=args.days) if args.days else None
+        processed = FlowUsageRollup.rebuild(account_id=args.account_id, since=since)
+        print(f'✅ 汇总重建完成，处理 {processed} 条流量记录')
+
+
+if __name__ == '__main__':
+    main()